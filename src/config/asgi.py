@@ -13,4 +13,17 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Импорт после инициализации Django (модуль использует модели)
+from vocabulary.events import EVENTS_PATH, version_events_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """
+    Поток событий версий справочников (Server-Sent Events) обслуживается
+    отдельным ASGI-приложением, остальные запросы — Django
+    """
+    if scope["type"] == "http" and scope["path"] == EVENTS_PATH:
+        return await version_events_application(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -42,6 +42,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "vocabulary.instrumentation.ServerTimingMiddleware",
+    "vocabulary.db_router.ReplicaStickinessMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -79,9 +81,23 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "CONN_MAX_AGE": 60,
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# Read replicas are added as aliases listed in VOCABULARY_DATABASE_REPLICAS, e.g.
+# "replica1": {
+#     "ENGINE": "django.db.backends.postgresql",
+#     "NAME": "vocabulary",
+#     "HOST": "replica1",
+#     "CONN_MAX_AGE": 60,
+#     "CONN_HEALTH_CHECKS": True,
+#     "TEST": {"MIRROR": "default"},
+# },
+
+DATABASE_ROUTERS = ["vocabulary.db_router.ReplicaRouter"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -132,3 +148,65 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 10,
 }
+
+
+# Vocabulary
+
+# Seconds a resolved current version is kept in process (changes made by other
+# processes, e.g. import_version, are picked up after it; None - only on signals)
+VOCABULARY_VERSION_CACHE_TTL = 60
+
+# Snapshots of thesaurus version items kept in memory (total items per process)
+VOCABULARY_SNAPSHOT_MAX_ITEMS = 1_000_000
+# Seconds after which a snapshot is reloaded (None - only when the version's last
+# change log entry differs, including changes made by other processes)
+VOCABULARY_SNAPSHOT_TTL = 300
+
+# Default and maximum page size of items with keyset pagination (?pagination=cursor)
+VOCABULARY_CURSOR_PAGE_SIZE = 1000
+VOCABULARY_CURSOR_MAX_PAGE_SIZE = 10000
+
+# Routes served by async views under ASGI, e.g. ["thesaurus-item-list",
+# "thesaurus-version-item-list", "thesaurus-item-validate",
+# "thesaurus-version-item-validate"]
+VOCABULARY_ASYNC_ROUTES = []
+
+# Server-Timing headers and per-route counters (/metrics/, staff users and
+# INTERNAL_IPS only), disabled by default
+VOCABULARY_SERVER_TIMING = False
+# Requests slower than this (ms) are logged with their slowest SQL queries
+VOCABULARY_SLOW_REQUEST_MS = 1000
+
+# Item and thesaurus lists rendered as JSON without per-row serializers
+VOCABULARY_FAST_JSON = True
+
+# Shared cache of rendered list responses: a CACHES alias shared by all workers,
+# None - disabled. The default (per-process) local memory cache is not shared,
+# so enable it only with a shared backend, e.g.
+# CACHES = {
+#     "responses": {
+#         "BACKEND": "django.core.cache.backends.redis.RedisCache",
+#         "LOCATION": "redis://127.0.0.1:6379",
+#     },
+# }
+# VOCABULARY_RESPONSE_CACHE = "responses"
+VOCABULARY_RESPONSE_CACHE = None
+VOCABULARY_RESPONSE_CACHE_TTL = 3600
+
+# Per-version Bloom filters of item codes and values (false positive rate)
+VOCABULARY_BLOOM_FILTER_ERROR_RATE = 0.01
+# Seconds after which a loaded filter is re-read (None - only on item changes)
+VOCABULARY_BLOOM_FILTER_TTL = 300
+
+# Database aliases reads are spread over (round-robin), [] - primary only
+VOCABULARY_DATABASE_REPLICAS = []
+# Seconds reads stay on the primary after a write (per request and client)
+VOCABULARY_REPLICA_STICKY_SECONDS = 5
+# Seconds a replica health check result is kept
+VOCABULARY_REPLICA_HEALTH_CHECK_INTERVAL = 10
+
+# Server-Sent Events of version changes (/api/v1/events/, ASGI only): change
+# log poll interval and keepalive interval (seconds), events kept per client
+VOCABULARY_EVENTS_POLL_INTERVAL = 1
+VOCABULARY_EVENTS_HEARTBEAT = 15
+VOCABULARY_EVENTS_QUEUE_SIZE = 100
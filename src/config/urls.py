@@ -13,26 +13,66 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework import routers
 
-from vocabulary.views import ThesaurusAPIView, ThesaurusItemAPIView
+from vocabulary.async_views import (
+    ThesaurusItemListAsyncView,
+    ThesaurusItemValidateAsyncView,
+)
+from vocabulary.instrumentation import metrics_view
+from vocabulary.views import ChangeLogAPIView, ThesaurusAPIView, ThesaurusItemAPIView
 
 router = routers.DefaultRouter()
 router.register("thesaurus", ThesaurusAPIView, basename="thesaurus")
 router.register(
-    r"thesaurus/(?P<thesaurus>\d+?)/items",
+    r"thesaurus/(?P<thesaurus>[^/.]+?)/items",
     ThesaurusItemAPIView,
     basename="thesaurus-item",
 )
 router.register(
-    r"thesaurus/(?P<thesaurus>\d+?)/(?P<version>\d+?)/items",
+    r"thesaurus/(?P<thesaurus>[^/.]+?)/(?P<version>[^/.]+?)/items",
     ThesaurusItemAPIView,
     basename="thesaurus-version-item",
 )
+router.register("changes", ChangeLogAPIView, basename="changes")
+
+# Асинхронные представления, подменяющие маршруты router (включаются по имени
+# маршрута в settings.VOCABULARY_ASYNC_ROUTES)
+async_routes = [
+    re_path(
+        r"^api/v1/thesaurus/(?P<thesaurus>[^/.]+?)/items/$",
+        ThesaurusItemListAsyncView.as_view(),
+        name="thesaurus-item-list",
+    ),
+    re_path(
+        r"^api/v1/thesaurus/(?P<thesaurus>[^/.]+?)/(?P<version>[^/.]+?)/items/$",
+        ThesaurusItemListAsyncView.as_view(),
+        name="thesaurus-version-item-list",
+    ),
+    re_path(
+        r"^api/v1/thesaurus/(?P<thesaurus>[^/.]+?)/items/validate/$",
+        ThesaurusItemValidateAsyncView.as_view(),
+        name="thesaurus-item-validate",
+    ),
+    re_path(
+        r"^api/v1/thesaurus/(?P<thesaurus>[^/.]+?)/(?P<version>[^/.]+?)/items/validate/$",
+        ThesaurusItemValidateAsyncView.as_view(),
+        name="thesaurus-version-item-validate",
+    ),
+]
 
 urlpatterns = [
+    route
+    for route in async_routes
+    if route.name in getattr(settings, "VOCABULARY_ASYNC_ROUTES", ())
+] + [
     path("admin/", admin.site.urls),
     path("api/v1/", include(router.urls)),
 ]
+
+# Счетчики маршрутов накапливаются только при включенных замерах
+if getattr(settings, "VOCABULARY_SERVER_TIMING", False):
+    urlpatterns.append(path("metrics/", metrics_view, name="metrics"))
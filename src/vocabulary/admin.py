@@ -1,12 +1,59 @@
+import csv
 from datetime import date
 
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db import IntegrityError
+from django.forms.models import BaseInlineFormSet
+from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
 
 from . import models
+from .forms import ThesaurusVersionCloneForm, ThesaurusVersionImportForm
+from .importer import ThesaurusVersionImporter
+from .search import ThesaurusItemSearchIndex
+from .service import ThesaurusService
+
+
+class ThesaurusItemInlineFormSet(BaseInlineFormSet):
+    """
+    Постраничное редактирование элементов версии: в форму попадает только
+    страница page_number (параметр items_page), а не все элементы версии
+    """
+
+    page_var = "items_page"
+    per_page = 50
+    page_number = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk is not None:
+            # Состав версии включает элементы, общие с другими версиями;
+            # их изменение сохраняется новой строкой этой версии
+            self.queryset = ThesaurusService().get_thesaurus_version_elements(
+                self.instance
+            )
+
+    def get_queryset(self):
+        if not hasattr(self, "_queryset"):
+            paginator = Paginator(super().get_queryset(), self.per_page)
+            self.page = paginator.get_page(self.page_number)
+            self._queryset = self.page.object_list
+        return self._queryset
 
 
 class ThesaurusItemInline(admin.TabularInline):
     model = models.ThesaurusItem
+    formset = ThesaurusItemInlineFormSet
+    template = "admin/vocabulary/edit_inline/paginated_tabular.html"
+    extra = 1
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.page_number = request.GET.get(formset.page_var)
+        return formset
 
 
 class ThesaurusAdmin(admin.ModelAdmin):
@@ -22,22 +69,174 @@ class ThesaurusVersionAdmin(admin.ModelAdmin):
     filds = ("thesaurus", "version", "start_date")
     list_display = ("id", "thesaurus", "version", "start_date")
     list_display_links = ("id", "thesaurus", "version")
-    search_fields = ("thesaurus", "version")
+    list_select_related = ("thesaurus",)
+    search_fields = ("=version", "=thesaurus__slug", "^thesaurus__short_name")
     list_filter = ("thesaurus",)
+    autocomplete_fields = ("thesaurus",)
     prepopulated_fields = {"slug": ("version",)}
     inlines = [
         ThesaurusItemInline,
     ]
+    actions = ["clone_version"]
 
     def get_changeform_initial_data(self, request):
         return {"start_date": date.today()}
 
+    def get_urls(self):
+        info = self.opts.app_label, self.opts.model_name
+        return [
+            path(
+                "import/",
+                self.admin_site.admin_view(self.import_view),
+                name="%s_%s_import" % info,
+            ),
+            path(
+                "<path:object_id>/clone/",
+                self.admin_site.admin_view(self.clone_view),
+                name="%s_%s_clone" % info,
+            ),
+        ] + super().get_urls()
+
+    @admin.action(description="Создать новую версию на основе выбранной")
+    def clone_version(self, request, queryset):
+        if len(queryset) != 1:
+            self.message_user(
+                request, "Выберите одну версию справочника", messages.WARNING
+            )
+            return None
+        return redirect(
+            reverse("admin:vocabulary_thesaurusversion_clone", args=[queryset[0].pk])
+        )
+
+    def import_view(self, request):
+        """
+        Создание версии справочника с загрузкой элементов из файла
+        """
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+
+        form = ThesaurusVersionImportForm(request.POST or None, request.FILES or None)
+        if form.is_valid():
+            response = self._import_version(
+                request, form, form.cleaned_data["thesaurus"]
+            )
+            if response is not None:
+                return response
+
+        return self._render_version_form(
+            request, form, "Загрузка версии справочника из файла"
+        )
+
+    def clone_view(self, request, object_id):
+        """
+        Создание версии справочника копированием элементов версии object_id
+        с необязательным файлом изменений
+        """
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+
+        base_version = get_object_or_404(
+            models.ThesaurusVersion.objects.select_related("thesaurus"), pk=object_id
+        )
+        form = ThesaurusVersionCloneForm(request.POST or None, request.FILES or None)
+        if form.is_valid():
+            response = self._import_version(
+                request, form, base_version.thesaurus, base_version
+            )
+            if response is not None:
+                return response
+
+        return self._render_version_form(
+            request, form, f"Новая версия на основе {base_version}", base_version
+        )
+
+    def _import_version(self, request, form, thesaurus, base_version=None):
+        data = form.cleaned_data
+        try:
+            result = ThesaurusVersionImporter().import_version(
+                thesaurus,
+                data["version"],
+                data["start_date"],
+                form.get_rows(),
+                slug=data["slug"] or None,
+                base_version=base_version,
+            )
+        except (ValueError, IntegrityError, csv.Error) as e:
+            form.add_error(None, str(e))
+            return None
+
+        self.message_user(
+            request,
+            f"Версия {result.thesaurus_version} загружена: {result.rows} элементов "
+            f"за {result.seconds:.1f} с",
+            messages.SUCCESS,
+        )
+        return redirect(
+            reverse(
+                "admin:vocabulary_thesaurusversion_change",
+                args=[result.thesaurus_version.pk],
+            )
+        )
+
+    def _render_version_form(self, request, form, title, original=None):
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.opts,
+            "title": title,
+            "form": form,
+            "original": original,
+            "media": self.media + form.media,
+        }
+        return TemplateResponse(
+            request, "admin/vocabulary/thesaurusversion/version_form.html", context
+        )
+
+
+class ThesaurusVersionListFilter(admin.SimpleListFilter):
+    """
+    Фильтр элементов по составу версии, включая элементы, общие с другими
+    версиями справочника
+    """
+
+    title = "версия справочника"
+    parameter_name = "version"
+
+    def lookups(self, request, model_admin):
+        versions = models.ThesaurusVersion.objects.select_related("thesaurus")
+        return [(version.pk, str(version)) for version in versions]
+
+    def queryset(self, request, queryset):
+        if self.value() is None:
+            return queryset
+        return queryset.in_version(self.value())
+
 
 class ThesaurusItemAdmin(admin.ModelAdmin):
     list_display = ("id", "thesaurus_version", "code", "value")
     list_display_links = ("id", "value")
-    search_fields = ("thesaurus_version", "code", "value")
-    list_filter = ("thesaurus_version",)
+    list_select_related = ("thesaurus_version__thesaurus",)
+    list_filter = ("thesaurus_version__thesaurus", ThesaurusVersionListFilter)
+    raw_id_fields = ("thesaurus_version",)
+    search_fields = ("code", "value")
+    search_help_text = "Код элемента или часть значения"
+
+    def delete_queryset(self, request, queryset):
+        # Удаление по одному: общие с другими версиями элементы только
+        # исключаются из своей версии
+        for obj in queryset:
+            obj.delete()
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Поиск по коду (точное совпадение) и по значению через
+        полнотекстовый индекс вместо LIKE по всем элементам
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        by_value = ThesaurusItemSearchIndex().filter_queryset(queryset, search_term)
+        return queryset.filter(code=search_term) | by_value, False
 
 
 admin.site.register(models.Thesaurus, ThesaurusAdmin)
@@ -1,7 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class VocabularyConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "vocabulary"
     verbose_name = "Терминология"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .search import create_search_index
+
+        post_migrate.connect(create_search_index, sender=self)
@@ -0,0 +1,191 @@
+from asyncio import iscoroutine
+from io import BytesIO
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from django.views import View
+
+from rest_framework import exceptions, status
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .instrumentation import timed
+from .models import ThesaurusVersion
+from .serializers import ThesaurusItemBulkValidationSerializer, thesaurus_item_data
+from .service import ThesaurusService
+from .views import (
+    THESAURUS_VERSION_HEADER,
+    ThesaurusItemAPIView,
+    current_version_fingerprint,
+    get_as_of_param,
+    is_normalized_match,
+)
+
+
+class ThesaurusItemAsyncView(View):
+    """
+    Асинхронные представления элементов справочника для работы под ASGI.
+    Ответы совпадают с JSON-ответами ThesaurusItemAPIView; случаи, которые
+    не обслуживаются из снимка версии, передаются синхронному представлению.
+    """
+
+    thesaurus_service = ThesaurusService()
+    renderer = JSONRenderer()
+    sync_view = staticmethod(ThesaurusItemAPIView.as_view({"get": "list"}))
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+            if iscoroutine(response):
+                response = await response
+            return response
+        except Http404:
+            return self.render(
+                {"detail": exceptions.NotFound.default_detail},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except exceptions.APIException as e:
+            return self.render({"detail": e.detail}, status=e.status_code)
+
+    def render(self, data, status: int = status.HTTP_200_OK) -> HttpResponse:
+        response = HttpResponse(
+            self.renderer.render(data),
+            content_type=self.renderer.media_type,
+            status=status,
+        )
+        response["Vary"] = "Accept"
+        response["Allow"] = ", ".join(self._allowed_methods())
+        return response
+
+    async def get_thesaurus_version(
+        self, request, thesaurus_key, thesaurus_version_key
+    ) -> ThesaurusVersion:
+        as_of = get_as_of_param(request.GET)
+        if as_of and thesaurus_version_key:
+            raise exceptions.ValidationError("Parameter 'as_of' is not valid")
+
+        return await self.thesaurus_service.aget_thesaurus_version_by_key(
+            thesaurus_key, thesaurus_version_key, as_of
+        )
+
+
+class ThesaurusItemListAsyncView(ThesaurusItemAsyncView):
+    """
+    Получение и валидация элементов справочника текущей или указанной версии
+    """
+
+    http_method_names = ["get", "head", "options"]
+
+    async def get(self, request, thesaurus, version=None):
+        fingerprint, last_modified = await self._get_fingerprint(request, version)
+        etag = quote_etag("-".join(str(part) for part in fingerprint))
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = await self._list(request, thesaurus, version)
+
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    async def _list(self, request, thesaurus_id, thesaurus_version_id):
+        if request.GET.get("pagination") == "cursor":
+            return await self._sync_list(request, thesaurus_id, thesaurus_version_id)
+
+        thesaurus_version = await self.get_thesaurus_version(
+            request, thesaurus_id, thesaurus_version_id
+        )
+
+        code = request.GET.get("code")
+        value = request.GET.get("value")
+        if code or value:
+            items = await self.thesaurus_service.avalidate_elements_thesaurus_version(
+                thesaurus_version, code, value, is_normalized_match(request.GET)
+            )
+        else:
+            snapshot = await self.thesaurus_service.aget_thesaurus_version_snapshot(
+                thesaurus_version
+            )
+            if snapshot is None:
+                return await self._sync_list(
+                    request, thesaurus_id, thesaurus_version_id
+                )
+            items = snapshot.values
+
+        paginator = LimitOffsetPagination()
+        page = paginator.paginate_queryset(items, Request(request))
+        with timed("serialize"):
+            data = [thesaurus_item_data(item) for item in page]
+        response = self.render(paginator.get_paginated_response(data).data)
+        response[THESAURUS_VERSION_HEADER] = thesaurus_version.pk
+        return response
+
+    async def _sync_list(self, request, thesaurus_id, thesaurus_version_id):
+        kwargs = {"thesaurus": thesaurus_id}
+        if thesaurus_version_id:
+            kwargs["version"] = thesaurus_version_id
+
+        def render():
+            response = self.sync_view(request, **kwargs)
+            if callable(getattr(response, "render", None)):
+                # Ответ из кэша ответов уже отрисован
+                response = response.render()
+            return response
+
+        return await sync_to_async(render)()
+
+    async def _get_fingerprint(self, request, thesaurus_version_id) -> tuple[list, int]:
+        revision = await self.thesaurus_service.aget_revision()
+        fingerprint = [revision.number, self.renderer.format]
+        last_modified = int(revision.updated_at.timestamp())
+        if thesaurus_version_id or get_as_of_param(request.GET):
+            return fingerprint, last_modified
+
+        return current_version_fingerprint(fingerprint, last_modified)
+
+
+class ThesaurusItemValidateAsyncView(ThesaurusItemAsyncView):
+    """
+    Пакетная валидация элементов справочника текущей или указанной версии
+    """
+
+    http_method_names = ["post", "options"]
+
+    async def post(self, request, thesaurus, version=None):
+        data = JSONParser().parse(BytesIO(request.body))
+        serializer = ThesaurusItemBulkValidationSerializer(data=data)
+        if not serializer.is_valid():
+            return self.render(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        items = serializer.validated_data["items"]
+        elements = [(item.get("code"), item.get("value")) for item in items]
+        normalized = is_normalized_match(request.GET)
+
+        thesaurus_version = await self.get_thesaurus_version(
+            request, thesaurus, version
+        )
+        result = await self.thesaurus_service.avalidate_elements_thesaurus_version_bulk(
+            thesaurus_version, elements, normalized
+        )
+        response = self.render(
+            {
+                "results": [
+                    {**item, "valid": valid} for item, valid in zip(items, result)
+                ]
+            }
+        )
+        response[THESAURUS_VERSION_HEADER] = thesaurus_version.pk
+        return response
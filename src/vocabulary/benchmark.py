@@ -0,0 +1,351 @@
+import json
+import random
+from dataclasses import dataclass, asdict
+from datetime import date, timedelta
+from statistics import mean, quantiles
+from time import perf_counter
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .bloom import bloom_filter_cache
+from .models import Thesaurus, ThesaurusVersion, ThesaurusItem
+from .response_cache import response_cache
+from .service import ThesaurusService, thesaurus_version_cache
+from .snapshot import thesaurus_version_snapshot_cache
+
+PROFILES = {
+    # Быстрый прогон для проверки регрессий при разработке
+    "small": {"thesauri": 20, "versions": 5, "items": 100, "large_items": 10_000},
+    # Объемы, сопоставимые с промышленными
+    "production": {
+        "thesauri": 10_000,
+        "versions": 50,
+        "items": 20,
+        "large_items": 1_000_000,
+    },
+}
+
+GENERATOR_CHUNK_SIZE = 10_000
+
+
+class SyntheticDataGenerator:
+    """
+    Детерминированный генератор справочников: одинаковые параметры и seed
+    всегда дают одинаковые данные. Последний справочник («большой») содержит
+    версии по large_items элементов.
+    """
+
+    def __init__(
+        self,
+        thesauri: int,
+        versions: int,
+        items: int,
+        large_items: int,
+        seed: int = 0,
+        first_start_date: date = date(2020, 1, 1),
+    ):
+        self.thesauri = thesauri
+        self.versions = versions
+        self.items = items
+        self.large_items = large_items
+        self.seed = seed
+        self.first_start_date = first_start_date
+
+    def generate(self) -> Thesaurus:
+        """
+        Создание справочников, версий и элементов. Возвращает большой справочник.
+        """
+        rnd = random.Random(self.seed)
+        Thesaurus.objects.bulk_create(
+            Thesaurus(
+                name=f"Справочник {i}",
+                short_name=f"СПР {i}",
+                slug=f"thesaurus-{i}",
+                description=f"Синтетический справочник {i}",
+                is_actual=rnd.random() > 0.1,
+            )
+            for i in range(self.thesauri)
+        )
+        thesauri = list(Thesaurus.objects.order_by("pk"))
+
+        ThesaurusVersion.objects.bulk_create(
+            ThesaurusVersion(
+                thesaurus=thesaurus,
+                version=f"1.0.{j}",
+                slug=f"10{j}",
+                start_date=self.first_start_date
+                + timedelta(days=30 * j + rnd.randrange(30)),
+            )
+            for thesaurus in thesauri
+            for j in range(self.versions)
+        )
+
+        for thesaurus in thesauri:
+            ThesaurusVersion.objects.update_intervals(thesaurus.pk)
+
+        large_thesaurus = thesauri[-1]
+        for version in ThesaurusVersion.objects.order_by("pk").iterator():
+            count = (
+                self.large_items
+                if version.thesaurus_id == large_thesaurus.pk
+                else self.items
+            )
+            self._generate_items(version, count, rnd)
+        return large_thesaurus
+
+    def _generate_items(self, version: ThesaurusVersion, count: int, rnd):
+        offset = rnd.randrange(count or 1)
+        chunk = []
+        for k in range(count):
+            code = str(offset + k)
+            chunk.append(
+                ThesaurusItem(
+                    thesaurus_version=version, code=code, value=f"Элемент {code}"
+                )
+            )
+            if len(chunk) >= GENERATOR_CHUNK_SIZE:
+                ThesaurusItem.objects.bulk_create(chunk)
+                chunk = []
+        ThesaurusItem.objects.bulk_create(chunk)
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    iterations: int
+    queries: int
+    mean_ms: float
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+
+
+class BenchmarkRunner:
+    """
+    Замер времени и количества SQL-запросов методов ThesaurusService
+    и маршрутов API на сгенерированных данных.
+    """
+
+    def __init__(self, iterations: int = 20, warmup: int = 2, cold: bool = False):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.cold = cold
+        self.thesaurus_service = ThesaurusService()
+        self.client = Client(HTTP_ACCEPT="application/json")
+
+    def run(self, thesaurus: Thesaurus) -> list[BenchmarkResult]:
+        return [self.measure(name, func) for name, func in self.cases(thesaurus)]
+
+    def measure(self, name: str, func) -> BenchmarkResult:
+        for _ in range(self.warmup):
+            self._reset()
+            func()
+
+        timings = []
+        queries = 0
+        for _ in range(self.iterations):
+            self._reset()
+            with CaptureQueriesContext(connection) as context:
+                started = perf_counter()
+                func()
+                timings.append((perf_counter() - started) * 1000)
+            queries = max(queries, len(context))
+
+        percentiles = quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+        return BenchmarkResult(
+            name=name,
+            iterations=self.iterations,
+            queries=queries,
+            mean_ms=round(mean(timings), 3),
+            p50_ms=round(percentiles[49], 3),
+            p90_ms=round(percentiles[89], 3),
+            p99_ms=round(percentiles[98], 3),
+        )
+
+    def cases(self, thesaurus: Thesaurus):
+        """
+        Замеряемые сценарии: методы сервиса и маршруты API
+        """
+        service = self.thesaurus_service
+        versions = list(thesaurus.versions.order_by("start_date"))
+        version = versions[-1]
+        item = version.items.order_by("code").first()
+        today = date.today()
+        elements = [(item.code, item.value), ("missing", None)] * 500
+        last_page_offset = max(version.items.count() - 10, 0)
+
+        item_kwargs = {"thesaurus": thesaurus.pk}
+        version_kwargs = {"thesaurus": thesaurus.pk, "version": version.pk}
+        get = self.client.get
+
+        return [
+            ("service.get_thesaurus_list", lambda: list(service.get_thesaurus_list())),
+            (
+                "service.get_thesaurus_list_actual_to",
+                lambda: list(service.get_thesaurus_list_actual_to(today)),
+            ),
+            (
+                "service.get_thesaurus_current_version_elements",
+                lambda: list(
+                    service.get_thesaurus_current_version_elements(thesaurus)[:10]
+                ),
+            ),
+            (
+                "service.validate_elements_thesaurus_current_version",
+                lambda: service.validate_elements_thesaurus_current_version(
+                    thesaurus, item.code, item.value
+                ),
+            ),
+            (
+                "service.get_thesaurus_version_elements",
+                lambda: list(service.get_thesaurus_version_elements(version)[:10]),
+            ),
+            (
+                "service.validate_elements_thesaurus_version",
+                lambda: service.validate_elements_thesaurus_version(
+                    version, item.code, item.value
+                ),
+            ),
+            (
+                "service.validate_elements_thesaurus_version_bulk",
+                lambda: service.validate_elements_thesaurus_version_bulk(
+                    version, elements
+                ),
+            ),
+            (
+                "service.search_elements_thesaurus_version",
+                lambda: service.search_elements_thesaurus_version(version, "мент 1"),
+            ),
+            (
+                "service.get_thesaurus_versions_diff",
+                lambda: service.get_thesaurus_versions_diff(versions[0], version),
+            ),
+            ("api.thesaurus-list", lambda: get(reverse("thesaurus-list"))),
+            (
+                "api.thesaurus-list?actual_to",
+                lambda: get(reverse("thesaurus-list"), {"actual_to": today}),
+            ),
+            (
+                "api.thesaurus-detail",
+                lambda: get(reverse("thesaurus-detail", kwargs={"pk": thesaurus.pk})),
+            ),
+            (
+                "api.thesaurus-diff",
+                lambda: get(
+                    reverse("thesaurus-diff", kwargs={"pk": thesaurus.pk}),
+                    {"from": versions[0].pk, "to": version.pk},
+                ),
+            ),
+            (
+                "api.thesaurus-item-list",
+                lambda: get(reverse("thesaurus-item-list", kwargs=item_kwargs)),
+            ),
+            (
+                "api.thesaurus-item-list?offset",
+                lambda: get(
+                    reverse("thesaurus-item-list", kwargs=item_kwargs),
+                    {"offset": last_page_offset},
+                ),
+            ),
+            (
+                "api.thesaurus-item-list?code",
+                lambda: get(
+                    reverse("thesaurus-item-list", kwargs=item_kwargs),
+                    {"code": item.code},
+                ),
+            ),
+            (
+                "api.thesaurus-version-item-list",
+                lambda: get(
+                    reverse("thesaurus-version-item-list", kwargs=version_kwargs)
+                ),
+            ),
+            (
+                "api.thesaurus-version-item-list?limit=10000",
+                lambda: get(
+                    reverse("thesaurus-version-item-list", kwargs=version_kwargs),
+                    {"limit": 10_000},
+                ),
+            ),
+            (
+                "api.thesaurus-version-item-list?pagination=cursor",
+                lambda: get(
+                    reverse("thesaurus-version-item-list", kwargs=version_kwargs),
+                    {"pagination": "cursor"},
+                ),
+            ),
+            (
+                "api.thesaurus-version-item-list?code&value",
+                lambda: get(
+                    reverse("thesaurus-version-item-list", kwargs=version_kwargs),
+                    {"code": item.code, "value": item.value},
+                ),
+            ),
+            (
+                "api.thesaurus-version-item-validate",
+                lambda: self.client.post(
+                    reverse("thesaurus-version-item-validate", kwargs=version_kwargs),
+                    {"items": [{"code": code} for code, _ in elements]},
+                    "application/json",
+                ),
+            ),
+            (
+                "api.thesaurus-version-item-search",
+                lambda: get(
+                    reverse("thesaurus-version-item-search", kwargs=version_kwargs),
+                    {"q": "мент 1"},
+                ),
+            ),
+            (
+                "api.thesaurus-version-item-export",
+                lambda: b"".join(
+                    get(
+                        reverse("thesaurus-version-item-export", kwargs=version_kwargs)
+                    ).streaming_content
+                ),
+            ),
+        ]
+
+    def _reset(self):
+        if self.cold:
+            thesaurus_version_cache.clear()
+            thesaurus_version_snapshot_cache.clear()
+            response_cache.clear()
+            bloom_filter_cache.clear()
+
+
+def save_baseline(path: str, results: list[BenchmarkResult]):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([asdict(result) for result in results], f, indent=2)
+
+
+def load_baseline(path: str) -> dict[str, BenchmarkResult]:
+    with open(path, encoding="utf-8") as f:
+        return {row["name"]: BenchmarkResult(**row) for row in json.load(f)}
+
+
+def compare_with_baseline(
+    results: list[BenchmarkResult],
+    baseline: dict[str, BenchmarkResult],
+    tolerance: float = 0.2,
+) -> list[str]:
+    """
+    Поиск регрессий: рост медианы времени больше допуска или рост числа запросов
+    """
+    regressions = []
+    for result in results:
+        base = baseline.get(result.name)
+        if base is None:
+            continue
+        if result.queries > base.queries:
+            regressions.append(
+                f"{result.name}: queries {base.queries} -> {result.queries}"
+            )
+        if result.p50_ms > base.p50_ms * (1 + tolerance):
+            regressions.append(
+                f"{result.name}: p50 {base.p50_ms:.3f}ms -> {result.p50_ms:.3f}ms"
+            )
+    return regressions
@@ -0,0 +1,165 @@
+import math
+import struct
+from hashlib import blake2b
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+
+BLOOM_FILTER_MAGIC = b"VBF1"
+BLOOM_FILTER_HEADER = struct.Struct(">4sQB")
+
+BLOOM_FILTER_ERROR_RATE = 0.01
+
+CODE_PREFIX = "c:"
+VALUE_PREFIX = "v:"
+
+
+class BloomFilter:
+    """
+    Фильтр Блума по кодам и значениям элементов версии справочника.
+
+    Формат (для проверки на стороне клиента): заголовок "VBF1", количество
+    бит m (uint64, big-endian) и количество хеш-функций k (uint8), затем
+    m бит (младший бит первого байта — бит 0). Позиции ключа:
+    (h1 + i * h2) mod m для i от 0 до k - 1, где h1 и h2 — первые и вторые
+    8 байт BLAKE2b (digest_size=16) от "c:<код>" или "v:<значение>" в UTF-8
+    как беззнаковые big-endian числа, у h2 устанавливается младший бит.
+    """
+
+    __slots__ = ("size", "hash_count", "_bits")
+
+    def __init__(self, size: int, hash_count: int, bits: bytes = None):
+        self.size = size
+        self.hash_count = hash_count
+        self._bits = bytearray(bits) if bits is not None else bytearray((size + 7) // 8)
+
+    @classmethod
+    def for_capacity(
+        cls, capacity: int, error_rate: float = BLOOM_FILTER_ERROR_RATE
+    ) -> "BloomFilter":
+        capacity = max(capacity, 1)
+        size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        hash_count = max(1, round(size / capacity * math.log(2)))
+        return cls(size, hash_count)
+
+    @classmethod
+    def for_elements(
+        cls, rows, count: int, error_rate: float = BLOOM_FILTER_ERROR_RATE
+    ) -> "BloomFilter":
+        """
+        Построение фильтра по парам (код, значение)
+        """
+        bloom_filter = cls.for_capacity(2 * count, error_rate)
+        for code, value in rows:
+            bloom_filter.add(CODE_PREFIX + code)
+            bloom_filter.add(VALUE_PREFIX + value)
+        return bloom_filter
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BloomFilter":
+        magic, size, hash_count = BLOOM_FILTER_HEADER.unpack_from(data)
+        if magic != BLOOM_FILTER_MAGIC:
+            raise ValueError("Unknown bloom filter format")
+        return cls(size, hash_count, data[BLOOM_FILTER_HEADER.size :])
+
+    def to_bytes(self) -> bytes:
+        header = BLOOM_FILTER_HEADER.pack(
+            BLOOM_FILTER_MAGIC, self.size, self.hash_count
+        )
+        return header + bytes(self._bits)
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+    def may_contain(self, code: str = None, value: str = None) -> bool:
+        """
+        False — элемента с таким кодом и (или) значением в версии точно нет
+        """
+        if code and CODE_PREFIX + code not in self:
+            return False
+        if value and VALUE_PREFIX + value not in self:
+            return False
+        return True
+
+    def _positions(self, key: str):
+        digest = blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+
+class BloomFilterCache:
+    """
+    Кэш загруженных фильтров Блума версий в памяти процесса. Фильтр хранится
+    с отметкой последнего изменения версии (ChangeLog), по которой он
+    построен, и используется только при совпадении отметки с текущей:
+    элементы, добавленные в других процессах, не получают ложноотрицательный
+    ответ. Кроме того, фильтр перечитывается при изменении элементов версии
+    и по истечении времени жизни (VOCABULARY_BLOOM_FILTER_TTL).
+    """
+
+    def __init__(self, ttl: float = None):
+        self._lock = Lock()
+        self._filters = {}
+        self._ttl = ttl
+        self._generation = 0
+
+    @property
+    def ttl(self) -> float | None:
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, "VOCABULARY_BLOOM_FILTER_TTL", None)
+
+    def get(
+        self, thesaurus_version_id: int, change_id: int
+    ) -> tuple[BloomFilter | None, int]:
+        """
+        Фильтр версии, построенный по изменению change_id (или None), и номер
+        поколения для сохранения нового фильтра
+        """
+        with self._lock:
+            entry = self._filters.get(thesaurus_version_id)
+            if entry is not None:
+                bloom_filter, filter_change_id, loaded_at = entry
+                ttl = self.ttl
+                if filter_change_id == change_id and (
+                    ttl is None or monotonic() - loaded_at <= ttl
+                ):
+                    return bloom_filter, self._generation
+            return None, self._generation
+
+    def put(
+        self,
+        thesaurus_version_id: int,
+        bloom_filter: BloomFilter,
+        change_id: int,
+        generation: int,
+    ):
+        with self._lock:
+            if generation == self._generation:
+                self._filters[thesaurus_version_id] = (
+                    bloom_filter,
+                    change_id,
+                    monotonic(),
+                )
+
+    def invalidate(self, thesaurus_version_id: int):
+        with self._lock:
+            self._generation += 1
+            self._filters.pop(thesaurus_version_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._filters.clear()
+
+
+bloom_filter_cache = BloomFilterCache()
@@ -0,0 +1,204 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import count
+from threading import Lock
+from time import monotonic, time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.connection import ConnectionDoesNotExist
+
+PRIMARY_COOKIE = "vocabulary_primary_until"
+
+# Время (Unix time), до которого чтение выполняется из основной базы
+_primary_until: ContextVar[float] = ContextVar("vocabulary_primary_until", default=0)
+
+
+def get_replicas() -> list[str]:
+    return list(getattr(settings, "VOCABULARY_DATABASE_REPLICAS", []))
+
+
+def get_sticky_seconds() -> float:
+    return getattr(settings, "VOCABULARY_REPLICA_STICKY_SECONDS", 5)
+
+
+def pin_primary(seconds: float = None):
+    """
+    Чтение из основной базы в течение заданного времени (по умолчанию
+    VOCABULARY_REPLICA_STICKY_SECONDS), чтобы сразу после записи
+    не читать устаревшие данные реплики
+    """
+    until = time() + (get_sticky_seconds() if seconds is None else seconds)
+    if until > _primary_until.get():
+        _primary_until.set(until)
+
+
+def is_primary_pinned() -> bool:
+    return _primary_until.get() > time()
+
+
+@contextmanager
+def use_primary():
+    """
+    Чтение и запись только в основной базе (загрузка версий, администрирование)
+    """
+    token = _primary_until.set(float("inf"))
+    try:
+        yield
+    finally:
+        _primary_until.reset(token)
+
+
+class ReplicaHealth:
+    """
+    Доступность реплик. Результат проверки соединения хранится
+    VOCABULARY_REPLICA_HEALTH_CHECK_INTERVAL секунд.
+    """
+
+    def __init__(self, interval: float = None):
+        self._lock = Lock()
+        self._status = {}
+        self._interval = interval
+
+    @property
+    def interval(self) -> float:
+        if self._interval is not None:
+            return self._interval
+        return getattr(settings, "VOCABULARY_REPLICA_HEALTH_CHECK_INTERVAL", 10)
+
+    def is_healthy(self, alias: str) -> bool:
+        with self._lock:
+            status = self._status.get(alias)
+        if status is not None and monotonic() < status[1]:
+            return status[0]
+
+        healthy = self._check(alias)
+        self.mark(alias, healthy)
+        return healthy
+
+    def mark(self, alias: str, healthy: bool):
+        with self._lock:
+            self._status[alias] = (healthy, monotonic() + self.interval)
+
+    def clear(self):
+        with self._lock:
+            self._status.clear()
+
+    def _check(self, alias: str) -> bool:
+        try:
+            connection = connections[alias]
+            connection.ensure_connection()
+            return connection.is_usable()
+        except (ConnectionDoesNotExist, DatabaseError):
+            return False
+
+
+replica_health = ReplicaHealth()
+
+
+class ReplicaRouter:
+    """
+    Чтение из реплик VOCABULARY_DATABASE_REPLICAS по кругу (недоступные
+    реплики пропускаются), запись — в основную базу. После записи чтение
+    в течение VOCABULARY_REPLICA_STICKY_SECONDS выполняется из основной
+    базы, также как внутри транзакции основной базы.
+    Без реплик маршрутизация не меняется.
+    """
+
+    def __init__(self):
+        self._counter = count()
+
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if not replicas or is_primary_pinned():
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        start = next(self._counter)
+        for i in range(len(replicas)):
+            alias = replicas[(start + i) % len(replicas)]
+            if replica_health.is_healthy(alias):
+                return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if get_replicas():
+            pin_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db != DEFAULT_DB_ALIAS and db in get_replicas():
+            return False
+        return None
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Перенос привязки к основной базе между запросами клиента: после записи
+    клиент получает cookie, и его следующие запросы в течение
+    VOCABULARY_REPLICA_STICKY_SECONDS читают из основной базы.
+    Включается при заданных VOCABULARY_DATABASE_REPLICAS.
+    Работает и в асинхронном режиме, без переключения асинхронных
+    представлений в поток.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not get_replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        until = self._get_cookie_value(request)
+        token = _primary_until.set(until)
+        try:
+            response = self.get_response(request)
+            written_until = _primary_until.get()
+        finally:
+            _primary_until.reset(token)
+        return self._set_cookie(response, until, written_until)
+
+    async def __acall__(self, request):
+        until = self._get_cookie_value(request)
+        token = _primary_until.set(until)
+        try:
+            response = await self.get_response(request)
+            written_until = _primary_until.get()
+        finally:
+            _primary_until.reset(token)
+        return self._set_cookie(response, until, written_until)
+
+    def _set_cookie(self, response, until: float, written_until: float):
+        if written_until > until:
+            response.set_cookie(
+                PRIMARY_COOKIE,
+                f"{written_until:.3f}",
+                max_age=max(1, round(written_until - time())),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def _get_cookie_value(self, request) -> float:
+        try:
+            until = float(request.COOKIES.get(PRIMARY_COOKIE, 0))
+        except ValueError:
+            return 0
+        # Привязка не дольше окна после записи, даже если cookie подделан
+        return min(until, time() + get_sticky_seconds())
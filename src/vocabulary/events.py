@@ -0,0 +1,262 @@
+import asyncio
+import json
+import logging
+from datetime import date
+from hashlib import blake2b
+from itertools import count
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+
+from .models import ChangeLog, ThesaurusVersion
+
+logger = logging.getLogger(__name__)
+
+EVENTS_PATH = "/api/v1/events/"
+
+VERSION_SAVED = "version_saved"
+VERSION_DELETED = "version_deleted"
+VERSION_ITEMS_CHANGED = "version_items_changed"
+VERSION_EFFECTIVE = "version_effective"
+
+# Изменения журнала, читаемые за один опрос
+POLL_LIMIT = 1000
+
+
+def version_fingerprint(thesaurus_version: ThesaurusVersion, token: int) -> str:
+    """
+    Отпечаток состояния версии: меняется при изменении версии, ее элементов
+    и при вступлении версии в действие
+    """
+    raw = "|".join(
+        str(part)
+        for part in (
+            thesaurus_version.pk,
+            thesaurus_version.version,
+            thesaurus_version.slug,
+            thesaurus_version.start_date,
+            thesaurus_version.end_date,
+            token,
+        )
+    )
+    return blake2b(raw.encode(), digest_size=8).hexdigest()
+
+
+def version_event_data(thesaurus_version: ThesaurusVersion, token: int) -> dict:
+    return {
+        "id": thesaurus_version.pk,
+        "thesaurus_id": thesaurus_version.thesaurus_id,
+        "version": thesaurus_version.version,
+        "slug": thesaurus_version.slug,
+        "start_date": thesaurus_version.start_date.isoformat(),
+        "fingerprint": version_fingerprint(thesaurus_version, token),
+    }
+
+
+class VersionEventBroker:
+    """
+    Рассылка событий версий справочников подписчикам внутри процесса.
+
+    Источник событий — журнал изменений (ChangeLog), который опрашивается
+    одной задачей на процесс раз в VOCABULARY_EVENTS_POLL_INTERVAL секунд,
+    пока есть подписчики; поэтому события видны и для изменений, сделанных
+    в других процессах. При смене даты рассылаются версии, вступившие
+    в действие. Медленный подписчик теряет самые старые события.
+    """
+
+    def __init__(self, queue_size: int = None, poll_interval: float = None):
+        self._queue_size = queue_size
+        self._poll_interval = poll_interval
+        self._subscribers = set()
+        self._sequence = count(1)
+        self._watcher = None
+        self._token = None
+        self._today = None
+
+    @property
+    def queue_size(self) -> int:
+        if self._queue_size is not None:
+            return self._queue_size
+        return getattr(settings, "VOCABULARY_EVENTS_QUEUE_SIZE", 100)
+
+    @property
+    def poll_interval(self) -> float:
+        if self._poll_interval is not None:
+            return self._poll_interval
+        return getattr(settings, "VOCABULARY_EVENTS_POLL_INTERVAL", 1)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(self.queue_size)
+        self._subscribers.add(queue)
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.get_running_loop().create_task(self._watch())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        if not self._subscribers and self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
+            self._token = None
+
+    def publish(self, event_type: str, data: dict):
+        event = (next(self._sequence), event_type, data)
+        for queue in list(self._subscribers):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def poll(self, today: date = None) -> list[tuple[str, dict]]:
+        """
+        События по изменениям журнала после последнего опроса (по одному
+        на версию и тип события) и по версиям, вступившим в действие
+        """
+        today = today or date.today()
+        if self._token is None:
+            self._token = (
+                ChangeLog.objects.order_by("-pk").values_list("pk", flat=True).first()
+                or 0
+            )
+            self._today = today
+            return []
+
+        latest = {}
+        entries = (
+            ChangeLog.objects.filter(pk__gt=self._token)
+            .exclude(object_type=ChangeLog.THESAURUS)
+            .order_by("pk")[:POLL_LIMIT]
+        )
+        for entry in entries:
+            self._token = entry.pk
+            if entry.object_type == ChangeLog.VERSION:
+                event_type = (
+                    VERSION_DELETED
+                    if entry.action == ChangeLog.DELETE
+                    else VERSION_SAVED
+                )
+                key = entry.object_id
+            else:
+                event_type = VERSION_ITEMS_CHANGED
+                key = entry.thesaurus_version_id
+            latest.pop((event_type, key), None)
+            latest[event_type, key] = entry
+
+        versions = ThesaurusVersion.objects.in_bulk(
+            [key for event_type, key in latest if event_type != VERSION_DELETED]
+        )
+        events = []
+        for (event_type, key), entry in latest.items():
+            if event_type == VERSION_DELETED:
+                data = {
+                    "id": key,
+                    "thesaurus_id": entry.thesaurus_id,
+                    "fingerprint": None,
+                }
+                events.append((event_type, data))
+            elif key in versions:
+                events.append((event_type, version_event_data(versions[key], entry.pk)))
+
+        if today != self._today:
+            effective = ThesaurusVersion.objects.filter(
+                start_date__gt=self._today, start_date__lte=today
+            ).order_by("start_date", "pk")
+            for version in effective:
+                events.append(
+                    (VERSION_EFFECTIVE, version_event_data(version, self._token))
+                )
+            self._today = today
+        return events
+
+    async def _watch(self):
+        poll = sync_to_async(self.poll)
+        while True:
+            try:
+                events = await poll()
+            except DatabaseError:
+                logger.exception("Failed to poll thesaurus change log")
+                await sync_to_async(close_old_connections)()
+                events = []
+            for event_type, data in events:
+                self.publish(event_type, data)
+            await asyncio.sleep(self.poll_interval)
+
+
+version_event_broker = VersionEventBroker()
+
+
+async def version_events_application(scope, receive, send):
+    """
+    ASGI-приложение потока событий версий справочников (Server-Sent Events)
+    """
+    if scope["method"] not in ("GET", "HEAD"):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 405,
+                "headers": [(b"allow", b"GET, HEAD")],
+            }
+        )
+        await send({"type": "http.response.body", "body": b""})
+        return
+
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream; charset=utf-8"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+            ],
+        }
+    )
+    if scope["method"] == "HEAD":
+        await send({"type": "http.response.body", "body": b""})
+        return
+
+    heartbeat = getattr(settings, "VOCABULARY_EVENTS_HEARTBEAT", 15)
+    queue = version_event_broker.subscribe()
+    disconnect = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        await send(
+            {
+                "type": "http.response.body",
+                "body": b"retry: 3000\n\n",
+                "more_body": True,
+            }
+        )
+        while not disconnect.done():
+            get_event = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {get_event, disconnect},
+                timeout=heartbeat,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if get_event in done:
+                sequence, event_type, data = get_event.result()
+                body = (
+                    f"id: {sequence}\nevent: {event_type}\n"
+                    f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+                )
+            else:
+                get_event.cancel()
+                body = ": keepalive\n\n"
+            if not disconnect.done():
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": body.encode(),
+                        "more_body": True,
+                    }
+                )
+    finally:
+        version_event_broker.unsubscribe(queue)
+        disconnect.cancel()
+
+
+async def _wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
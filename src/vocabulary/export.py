@@ -0,0 +1,69 @@
+import csv
+import io
+import json
+import zlib
+from collections.abc import Iterable, Iterator
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+EXPORT_FIELDS = ("id", "code", "value")
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def ndjson_lines(rows: Iterable[tuple]) -> Iterator[str]:
+    """
+    Элементы справочника в формате NDJSON (один JSON-объект на строку)
+    """
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + "\n"
+
+
+def csv_lines(rows: Iterable[tuple]) -> Iterator[str]:
+    """
+    Элементы справочника в формате CSV с заголовком
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def encode_chunks(
+    lines: Iterable[str], buffer_size: int = EXPORT_BUFFER_SIZE
+) -> Iterator[bytes]:
+    """
+    Объединение строк в блоки байтов для потоковой отдачи
+    """
+    buffer = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= buffer_size:
+            yield "".join(buffer).encode()
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Потоковое сжатие блоков в формат gzip
+    """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,74 @@
+import io
+from datetime import date
+
+from django import forms
+from django.contrib.admin.widgets import AdminDateWidget
+
+from .importer import IMPORT_FORMATS, detect_format, read_rows
+from .models import Thesaurus, ThesaurusVersion
+
+
+class ThesaurusVersionFileForm(forms.Form):
+    """
+    Параметры новой версии справочника и файл ее элементов
+    """
+
+    version = forms.CharField(
+        label="Версия",
+        max_length=ThesaurusVersion._meta.get_field("version").max_length,
+    )
+    start_date = forms.DateField(
+        label="Действует с", initial=date.today, widget=AdminDateWidget
+    )
+    slug = forms.CharField(
+        label="URL",
+        max_length=ThesaurusVersion._meta.get_field("slug").max_length,
+        required=False,
+        help_text="По умолчанию из версии",
+    )
+    file = forms.FileField(
+        label="Файл элементов", help_text="CSV (code,value) или NDJSON"
+    )
+    file_format = forms.ChoiceField(
+        label="Формат",
+        choices=[("", "По расширению файла")]
+        + [(f, f.upper()) for f in IMPORT_FORMATS],
+        required=False,
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        file = cleaned_data.get("file")
+        if file is not None and not cleaned_data.get("file_format"):
+            try:
+                cleaned_data["file_format"] = detect_format(file.name)
+            except ValueError as e:
+                self.add_error("file_format", str(e))
+        return cleaned_data
+
+    def get_rows(self):
+        """
+        Потоковое чтение строк загруженного файла
+        """
+        file = self.cleaned_data.get("file")
+        if file is None:
+            return ()
+        stream = io.TextIOWrapper(file, encoding="utf-8", newline="")
+        return read_rows(stream, self.cleaned_data["file_format"])
+
+
+class ThesaurusVersionImportForm(ThesaurusVersionFileForm):
+    thesaurus = forms.ModelChoiceField(
+        label="Справочник", queryset=Thesaurus.objects.all()
+    )
+
+    field_order = ["thesaurus"]
+
+
+class ThesaurusVersionCloneForm(ThesaurusVersionFileForm):
+    file = forms.FileField(
+        label="Файл изменений",
+        required=False,
+        help_text="Строки с op=delete удаляют элемент по коду, "
+        "остальные добавляют или изменяют элемент",
+    )
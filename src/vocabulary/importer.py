@@ -0,0 +1,202 @@
+import csv
+import io
+import json
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from datetime import date
+from itertools import islice
+from pathlib import Path
+from time import perf_counter
+
+from django.db import transaction
+from django.utils.text import slugify
+
+from .db_router import use_primary
+from .models import Thesaurus, ThesaurusVersion, ThesaurusItem, ThesaurusVersionItem
+from .signals import thesaurus_version_items_loaded
+
+IMPORT_CHUNK_SIZE = 5000
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+DELTA_DELETE = "delete"
+
+CODE_MAX_LENGTH = ThesaurusItem._meta.get_field("code").max_length
+VALUE_MAX_LENGTH = ThesaurusItem._meta.get_field("value").max_length
+
+
+@dataclass
+class ImportResult:
+    thesaurus_version: ThesaurusVersion
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else float(self.rows)
+
+
+def detect_format(path: str | Path) -> str:
+    """
+    Определение формата файла элементов по расширению
+    """
+    suffix = Path(path).suffix.lstrip(".").lower()
+    if suffix in ("json", "jsonl"):
+        suffix = "ndjson"
+    if suffix not in IMPORT_FORMATS:
+        raise ValueError(f"Unknown file format '{suffix}', expected {IMPORT_FORMATS}")
+    return suffix
+
+
+def read_rows(stream: io.TextIOBase, file_format: str) -> Iterator[dict]:
+    """
+    Потоковое чтение строк файла элементов (CSV с заголовком или NDJSON)
+    """
+    if file_format == "csv":
+        yield from csv.DictReader(stream)
+    elif file_format == "ndjson":
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        raise ValueError(f"Unknown file format '{file_format}'")
+
+
+class ThesaurusVersionImporter:
+    """
+    Загрузка новой версии справочника пакетами через bulk_create в одной
+    транзакции. Уникальность кодов и значений проверяется в памяти до записи.
+    """
+
+    def __init__(self, chunk_size: int = IMPORT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+
+    def import_version(
+        self,
+        thesaurus: Thesaurus,
+        version: str,
+        start_date: date,
+        rows: Iterable[dict] = (),
+        slug: str = None,
+        base_version: ThesaurusVersion = None,
+    ) -> ImportResult:
+        """
+        Создание версии справочника и загрузка ее элементов.
+        Если указана базовая версия, rows применяются к ее элементам как
+        изменения (строки с op=delete удаляют код); неизмененные элементы
+        базовой версии входят в новую версию без копирования.
+        """
+        started = perf_counter()
+        shared_ids = {}
+        with use_primary():
+            if base_version is not None:
+                rows, shared_ids = self._apply_delta(base_version, rows)
+
+            with transaction.atomic():
+                thesaurus_version = ThesaurusVersion.objects.create(
+                    thesaurus=thesaurus,
+                    version=version,
+                    start_date=start_date,
+                    slug=slug or slugify(version),
+                    parent=base_version,
+                )
+                count = self._load_items(thesaurus_version, rows, shared_ids)
+
+        return ImportResult(thesaurus_version, count, perf_counter() - started)
+
+    def load_items(
+        self, thesaurus_version: ThesaurusVersion, rows: Iterable[dict]
+    ) -> int:
+        """
+        Загрузка элементов в существующую пустую версию справочника.
+        Идентификаторы в строках (например, в выгрузке export) не учитываются:
+        все элементы записываются новыми строками версии.
+        """
+        return self._load_items(thesaurus_version, rows, {})
+
+    def _load_items(
+        self,
+        thesaurus_version: ThesaurusVersion,
+        rows: Iterable[dict],
+        shared_ids: dict[str, int],
+    ) -> int:
+        count = 0
+        items = self._validated_items(thesaurus_version, rows, shared_ids)
+        with transaction.atomic():
+            while chunk := list(islice(items, self.chunk_size)):
+                # Элементы базовой версии (с идентификатором) не копируются
+                ThesaurusVersionItem.objects.bulk_create(
+                    [
+                        ThesaurusVersionItem(
+                            thesaurus_version=thesaurus_version,
+                            item_id=item.pk,
+                            code=item.code,
+                            value=item.value,
+                        )
+                        for item in chunk
+                        if item.pk is not None
+                    ]
+                )
+                ThesaurusItem.objects.bulk_create(
+                    [item for item in chunk if item.pk is None]
+                )
+                count += len(chunk)
+
+            thesaurus_version_items_loaded.send(
+                sender=ThesaurusVersion, thesaurus_version=thesaurus_version
+            )
+        return count
+
+    def _validated_items(
+        self,
+        thesaurus_version: ThesaurusVersion,
+        rows: Iterable[dict],
+        shared_ids: dict[str, int],
+    ) -> Iterator[ThesaurusItem]:
+        codes = set()
+        values = set()
+        for line, row in enumerate(rows, start=1):
+            code = (row.get("code") or "").strip()
+            value = (row.get("value") or "").strip()
+            if not code or not value:
+                raise ValueError(f"Row {line}: code and value must not be empty")
+            if len(code) > CODE_MAX_LENGTH or len(value) > VALUE_MAX_LENGTH:
+                raise ValueError(f"Row {line}: code or value is too long")
+            if code in codes:
+                raise ValueError(f"Row {line}: duplicate code '{code}'")
+            if value in values:
+                raise ValueError(f"Row {line}: duplicate value '{value}'")
+            codes.add(code)
+            values.add(value)
+
+            yield ThesaurusItem(
+                id=shared_ids.get(code),
+                thesaurus_version=thesaurus_version,
+                code=code,
+                value=value,
+            )
+
+    def _apply_delta(
+        self, base_version: ThesaurusVersion, delta: Iterable[dict]
+    ) -> tuple[list[dict], dict[str, int]]:
+        """
+        Строки новой версии и идентификаторы неизмененных элементов базовой
+        версии по коду (входят в новую версию без копирования)
+        """
+        items = {
+            code: (pk, value)
+            for pk, code, value in ThesaurusItem.objects.in_version(base_version)
+            .order_by()
+            .values_list("id", "code", "value")
+        }
+        for row in delta:
+            code = (row.get("code") or "").strip()
+            if row.get("op") == DELTA_DELETE:
+                items.pop(code, None)
+            elif (
+                code not in items or items[code][1] != (row.get("value") or "").strip()
+            ):
+                items[code] = (None, row.get("value"))
+        rows = [{"code": code, "value": value} for code, (_, value) in items.items()]
+        shared_ids = {code: pk for code, (pk, _) in items.items() if pk is not None}
+        return rows, shared_ids
@@ -0,0 +1,302 @@
+import logging
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from inspect import isfunction
+from threading import Lock
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.db import connections
+from django.http import HttpResponse
+
+logger = logging.getLogger("vocabulary.slow_requests")
+
+# Этапы обработки запроса в порядке вывода в заголовке Server-Timing
+PHASES = ("db", "service", "serialize", "render", "total")
+
+# Количество SQL-запросов с наибольшим временем в журнале медленных запросов
+SLOW_REQUEST_SQL_LIMIT = 20
+
+# Количество сохраняемых SQL-запросов одного HTTP-запроса
+REQUEST_SQL_LIMIT = 1000
+
+_request_metrics: ContextVar["RequestMetrics | None"] = ContextVar(
+    "vocabulary_request_metrics", default=None
+)
+
+
+class RequestMetrics:
+    """
+    Замеры одного HTTP-запроса: время этапов (мс), количество и время
+    SQL-запросов. Вложенные замеры одного этапа учитываются один раз.
+    """
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.durations = defaultdict(float)
+        self.query_count = 0
+        self.queries = []
+        self._active = set()
+
+    @contextmanager
+    def phase(self, name: str):
+        if name in self._active:
+            yield
+            return
+
+        self._active.add(name)
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] += (perf_counter() - started) * 1000
+            self._active.discard(name)
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (perf_counter() - started) * 1000
+            self.durations["db"] += duration
+            self.query_count += 1
+            if len(self.queries) < REQUEST_SQL_LIMIT:
+                self.queries.append((duration, sql))
+
+    def finish(self):
+        self.durations["total"] = (perf_counter() - self.started) * 1000
+
+    def server_timing(self) -> str:
+        parts = []
+        for name in PHASES:
+            if name not in self.durations:
+                continue
+            part = f"{name};dur={self.durations[name]:.1f}"
+            if name == "db":
+                part += f';desc="{self.query_count} queries"'
+            parts.append(part)
+        return ", ".join(parts)
+
+
+@contextmanager
+def timed(phase: str):
+    """
+    Замер этапа текущего запроса (без активного замера ничего не делает)
+    """
+    metrics = _request_metrics.get()
+    if metrics is None:
+        yield
+        return
+
+    with metrics.phase(phase):
+        yield
+
+
+def instrument(phase: str):
+    """
+    Декоратор функции (в том числе асинхронной), время выполнения которой
+    учитывается в указанном этапе запроса
+    """
+
+    def decorator(func):
+        if iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with timed(phase):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(phase):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def instrument_methods(phase: str):
+    """
+    Декоратор класса: замер всех публичных методов в указанном этапе запроса
+    """
+
+    def decorator(cls):
+        for name, attr in list(vars(cls).items()):
+            if not name.startswith("_") and isfunction(attr):
+                setattr(cls, name, instrument(phase)(attr))
+        return cls
+
+    return decorator
+
+
+class RouteMetrics:
+    """
+    Накопленные по маршрутам счетчики запросов, SQL-запросов и времени этапов
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._routes = {}
+
+    def record(self, route: str, metrics: RequestMetrics):
+        with self._lock:
+            counters = self._routes.setdefault(
+                route, {"requests": 0, "queries": 0, "seconds": defaultdict(float)}
+            )
+            counters["requests"] += 1
+            counters["queries"] += metrics.query_count
+            for name, duration in metrics.durations.items():
+                counters["seconds"][name] += duration / 1000
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                route: {**counters, "seconds": dict(counters["seconds"])}
+                for route, counters in self._routes.items()
+            }
+
+    def prometheus(self) -> str:
+        """
+        Счетчики в текстовом формате Prometheus
+        """
+        lines = [
+            "# TYPE vocabulary_requests_total counter",
+            "# TYPE vocabulary_request_queries_total counter",
+            "# TYPE vocabulary_request_seconds_total counter",
+        ]
+        for route, counters in sorted(self.stats().items()):
+            lines.append(
+                f'vocabulary_requests_total{{route="{route}"}} {counters["requests"]}'
+            )
+            lines.append(
+                f'vocabulary_request_queries_total{{route="{route}"}} '
+                f'{counters["queries"]}'
+            )
+            for name in PHASES:
+                if name in counters["seconds"]:
+                    lines.append(
+                        f'vocabulary_request_seconds_total{{route="{route}",'
+                        f'phase="{name}"}} {counters["seconds"][name]:.6f}'
+                    )
+        return "\n".join(lines) + "\n"
+
+
+route_metrics = RouteMetrics()
+
+
+class ServerTimingMiddleware:
+    """
+    Замер времени SQL-запросов, сервиса, сериализации и отрисовки ответа.
+    Результаты отдаются в заголовке Server-Timing и накапливаются
+    по маршрутам; запросы дольше VOCABULARY_SLOW_REQUEST_MS попадают
+    в журнал вместе с самыми долгими SQL-запросами.
+    Включается настройкой VOCABULARY_SERVER_TIMING. Работает и в асинхронном
+    режиме: SQL-запросы замеряются в потоке, где их выполняет sync_to_async.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "VOCABULARY_SERVER_TIMING", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        metrics = RequestMetrics()
+        token = _request_metrics.set(metrics)
+        try:
+            with ExitStack() as stack:
+                self._wrap_queries(stack, metrics)
+                response = self.get_response(request)
+        finally:
+            _request_metrics.reset(token)
+        return self._finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _request_metrics.set(metrics)
+        try:
+            # Соединения принадлежат потоку запросов sync_to_async
+            # (один на запрос), обертки подключаются в нем же
+            stack = ExitStack()
+            await sync_to_async(self._wrap_queries)(stack, metrics)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            _request_metrics.reset(token)
+        return self._finish(request, response, metrics)
+
+    def _wrap_queries(self, stack: ExitStack, metrics: RequestMetrics):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics.execute_wrapper))
+
+    def _finish(self, request, response, metrics: RequestMetrics):
+        metrics.finish()
+        response["Server-Timing"] = metrics.server_timing()
+
+        resolver_match = request.resolver_match
+        route = resolver_match.view_name if resolver_match else "unresolved"
+        route_metrics.record(route, metrics)
+        self._log_slow_request(request, metrics)
+        return response
+
+    def process_template_response(self, request, response):
+        metrics = _request_metrics.get()
+        if metrics is None:
+            return response
+
+        started = perf_counter()
+
+        def rendered(response):
+            metrics.durations["render"] += (perf_counter() - started) * 1000
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def _log_slow_request(self, request, metrics: RequestMetrics):
+        threshold = getattr(settings, "VOCABULARY_SLOW_REQUEST_MS", None)
+        if threshold is None or metrics.durations["total"] < threshold:
+            return
+
+        slowest = sorted(metrics.queries, reverse=True)[:SLOW_REQUEST_SQL_LIMIT]
+        logger.warning(
+            "Slow request %s %s: %s\n%s",
+            request.method,
+            request.get_full_path(),
+            metrics.server_timing(),
+            "\n".join(f"{duration:.1f}ms {sql}" for duration, sql in slowest),
+        )
+
+
+def metrics_view(request):
+    """
+    Накопленные счетчики запросов по маршрутам (формат Prometheus).
+    Доступны сотрудникам (is_staff) и с адресов INTERNAL_IPS
+    """
+    user = getattr(request, "user", None)
+    is_staff = user is not None and user.is_active and user.is_staff
+    if not is_staff and request.META.get("REMOTE_ADDR") not in settings.INTERNAL_IPS:
+        raise PermissionDenied
+
+    return HttpResponse(
+        route_metrics.prometheus(), content_type="text/plain; version=0.0.4"
+    )
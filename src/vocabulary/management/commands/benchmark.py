@@ -0,0 +1,104 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from vocabulary.benchmark import (
+    PROFILES,
+    BenchmarkRunner,
+    SyntheticDataGenerator,
+    compare_with_baseline,
+    load_baseline,
+    save_baseline,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный замер методов ThesaurusService и маршрутов API "
+        "на синтетических данных в отдельной тестовой базе"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profile", choices=list(PROFILES), default="small", help="Объем данных"
+        )
+        parser.add_argument("--thesauri", type=int, help="Количество справочников")
+        parser.add_argument("--versions", type=int, help="Версий в справочнике")
+        parser.add_argument("--items", type=int, help="Элементов в версии")
+        parser.add_argument(
+            "--large-items", type=int, help="Элементов в версии большого справочника"
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Сбрасывать кэши версий, снимков и ответов перед каждым замером",
+        )
+        parser.add_argument("--baseline", help="Файл базовых результатов (JSON)")
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Сохранить результаты в файл базовых результатов",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Допустимый рост медианы времени относительно базовых результатов",
+        )
+        parser.add_argument(
+            "--keepdb", action="store_true", help="Не удалять тестовую базу"
+        )
+
+    def handle(self, *args, **options):
+        if options["save_baseline"] and not options["baseline"]:
+            raise CommandError("Parameter 'save-baseline' requires 'baseline'")
+
+        scale = dict(PROFILES[options["profile"]])
+        for name in scale:
+            if options[name] is not None:
+                scale[name] = options[name]
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options["keepdb"]
+        )
+        try:
+            thesaurus = SyntheticDataGenerator(seed=options["seed"], **scale).generate()
+            runner = BenchmarkRunner(
+                iterations=options["iterations"], cold=options["cold"]
+            )
+            results = runner.run(thesaurus)
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options["keepdb"]
+            )
+            teardown_test_environment()
+
+        self.stdout.write(
+            f"{'case':<55} {'queries':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result.name:<55} {result.queries:>7} {result.p50_ms:>9.3f} "
+                f"{result.p90_ms:>9.3f} {result.p99_ms:>9.3f}"
+            )
+
+        if not options["baseline"]:
+            return
+
+        if options["save_baseline"]:
+            save_baseline(options["baseline"], results)
+            self.stdout.write(self.style.SUCCESS(f"Saved {options['baseline']}"))
+            return
+
+        regressions = compare_with_baseline(
+            results, load_baseline(options["baseline"]), options["tolerance"]
+        )
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(regression)
+            raise CommandError(f"Found {len(regressions)} regressions")
+
+        self.stdout.write(self.style.SUCCESS("No regressions"))
@@ -0,0 +1,101 @@
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+from django.utils.dateparse import parse_date
+
+from vocabulary.importer import ThesaurusVersionImporter, detect_format, read_rows
+from vocabulary.models import Thesaurus, ThesaurusVersion
+
+
+class Command(BaseCommand):
+    help = (
+        "Создание новой версии справочника и загрузка ее элементов из файла "
+        "CSV (с колонками code,value) или NDJSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("thesaurus", help="Идентификатор или slug справочника")
+        parser.add_argument("version", help="Версия справочника")
+        parser.add_argument(
+            "--start-date", required=True, help="Дата начала действия (YYYY-MM-DD)"
+        )
+        parser.add_argument("--slug", help="URL версии (по умолчанию из версии)")
+        parser.add_argument("--file", help="Файл элементов версии")
+        parser.add_argument(
+            "--copy-from",
+            help="Версия справочника, элементы которой копируются в новую версию",
+        )
+        parser.add_argument(
+            "--delta",
+            help="Файл изменений, применяемых к копируемой версии "
+            "(строки с op=delete удаляют элемент по коду)",
+        )
+        parser.add_argument(
+            "--format",
+            dest="file_format",
+            choices=["csv", "ndjson"],
+            help="Формат файлов (по умолчанию по расширению)",
+        )
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        start_date = parse_date(options["start_date"] or "")
+        if start_date is None:
+            raise CommandError("Parameter 'start-date' is not valid")
+
+        thesaurus = self._get_thesaurus(options["thesaurus"])
+        base_version = None
+        if options["copy_from"]:
+            base_version = self._get_thesaurus_version(thesaurus, options["copy_from"])
+            path = options["delta"]
+        elif options["delta"]:
+            raise CommandError("Parameter 'delta' requires 'copy-from'")
+        else:
+            path = options["file"]
+            if not path:
+                raise CommandError("One of 'file' or 'copy-from' is required")
+
+        importer = ThesaurusVersionImporter(chunk_size=options["chunk_size"])
+        with ExitStack() as stack:
+            rows = ()
+            if path:
+                try:
+                    file_format = options["file_format"] or detect_format(path)
+                except ValueError as e:
+                    raise CommandError(e)
+                stream = stack.enter_context(open(path, encoding="utf-8", newline=""))
+                rows = read_rows(stream, file_format)
+
+            try:
+                result = importer.import_version(
+                    thesaurus,
+                    options["version"],
+                    start_date,
+                    rows,
+                    slug=options["slug"],
+                    base_version=base_version,
+                )
+            except (ValueError, IntegrityError) as e:
+                raise CommandError(e)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Version {result.thesaurus_version} "
+                f"(id={result.thesaurus_version.pk}): {result.rows} items "
+                f"in {result.seconds:.2f}s ({result.rows_per_second:.0f} rows/sec)"
+            )
+        )
+
+    def _get_thesaurus(self, key: str) -> Thesaurus:
+        lookup = {"pk": key} if key.isdigit() else {"slug": key}
+        try:
+            return Thesaurus.objects.get(**lookup)
+        except Thesaurus.DoesNotExist:
+            raise CommandError(f"Thesaurus '{key}' does not exist")
+
+    def _get_thesaurus_version(self, thesaurus: Thesaurus, key: str):
+        try:
+            return thesaurus.versions.get(version=key)
+        except ThesaurusVersion.DoesNotExist:
+            raise CommandError(f"Version '{key}' of '{thesaurus}' does not exist")
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from vocabulary.models import Thesaurus
+from vocabulary.service import ThesaurusService
+
+
+class Command(BaseCommand):
+    help = "Расчет изменений между последовательными версиями всех справочников"
+
+    def handle(self, *args, **options):
+        thesaurus_service = ThesaurusService()
+        count = 0
+        for thesaurus in Thesaurus.objects.all():
+            count += thesaurus_service.precalculate_thesaurus_versions_diffs(thesaurus)
+
+        self.stdout.write(self.style.SUCCESS(f"Calculated {count} version diffs"))
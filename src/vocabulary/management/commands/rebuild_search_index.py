@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from vocabulary.search import ThesaurusItemSearchIndex
+
+
+class Command(BaseCommand):
+    help = "Перестроение полнотекстового индекса значений элементов справочников"
+
+    def handle(self, *args, **options):
+        search_index = ThesaurusItemSearchIndex()
+        if not search_index.supported:
+            raise CommandError("Full-text index is supported only for SQLite")
+
+        search_index.create()
+        search_index.rebuild()
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt"))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from vocabulary.models import ThesaurusItem, normalize_value
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполнение нормализованных значений элементов справочников "
+        "(для элементов, загруженных до появления поля normalized_value)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        count = 0
+        last_pk = 0
+        while True:
+            rows = list(
+                ThesaurusItem.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", "value", "normalized_value")[: options["chunk_size"]]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+
+            changed = []
+            for pk, value, normalized_value in rows:
+                if normalize_value(value) != normalized_value:
+                    changed.append(
+                        ThesaurusItem(pk=pk, normalized_value=normalize_value(value))
+                    )
+            ThesaurusItem.objects.bulk_update(changed, ["normalized_value"])
+            count += len(changed)
+
+        self.stdout.write(self.style.SUCCESS(f"Updated {count} thesaurus items"))
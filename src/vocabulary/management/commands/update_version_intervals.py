@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from vocabulary.models import Thesaurus, ThesaurusVersion
+
+
+class Command(BaseCommand):
+    help = "Пересчет интервалов действия (end_date) версий всех справочников"
+
+    def handle(self, *args, **options):
+        count = 0
+        for thesaurus_id in Thesaurus.objects.values_list("pk", flat=True):
+            count += ThesaurusVersion.objects.update_intervals(thesaurus_id)
+
+        self.stdout.write(self.style.SUCCESS(f"Updated {count} thesaurus versions"))
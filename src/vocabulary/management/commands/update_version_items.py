@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+
+from vocabulary.models import ThesaurusItem, ThesaurusVersionItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполнение состава версий справочников для элементов, "
+        "загруженных до появления таблицы состава версий"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        missing = ThesaurusItem.objects.exclude(
+            Exists(
+                ThesaurusVersionItem.objects.filter(
+                    item=OuterRef("pk"), thesaurus_version=OuterRef("thesaurus_version")
+                )
+            )
+        ).order_by("pk")
+
+        count = 0
+        last_pk = 0
+        while True:
+            rows = list(
+                missing.filter(pk__gt=last_pk).values_list(
+                    "pk", "thesaurus_version_id", "code", "value"
+                )[: options["chunk_size"]]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+
+            ThesaurusVersionItem.objects.bulk_create(
+                [
+                    ThesaurusVersionItem(
+                        thesaurus_version_id=version_id,
+                        item_id=pk,
+                        code=code,
+                        value=value,
+                    )
+                    for pk, version_id, code, value in rows
+                ]
+            )
+            count += len(rows)
+
+        self.stdout.write(self.style.SUCCESS(f"Added {count} thesaurus version items"))
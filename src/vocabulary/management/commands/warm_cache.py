@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.settings import api_settings
+
+from vocabulary.models import Thesaurus
+from vocabulary.response_cache import response_cache
+from vocabulary.views import ThesaurusAPIView, ThesaurusItemAPIView
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполнение общего кэша ответов: список справочников и первые страницы "
+        "элементов текущих версий актуальных справочников"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--host",
+            default="localhost",
+            help="Имя сервера, под которым API доступно клиентам "
+            "(входит в ссылки на страницы и в ключ кэша)",
+        )
+        parser.add_argument("--secure", action="store_true", help="Адреса https")
+        parser.add_argument(
+            "--pages", type=int, default=1, help="Количество страниц элементов"
+        )
+
+    def handle(self, *args, **options):
+        if not response_cache.enabled:
+            raise CommandError("Response cache is disabled (VOCABULARY_RESPONSE_CACHE)")
+
+        factory = RequestFactory(
+            HTTP_HOST=options["host"],
+            HTTP_ACCEPT="application/json",
+            secure=options["secure"],
+        )
+        thesaurus_list = ThesaurusAPIView.as_view({"get": "list"})
+        item_list = ThesaurusItemAPIView.as_view({"get": "list"})
+
+        count = self._warm(thesaurus_list, factory.get("/api/v1/thesaurus/"))
+        page_size = api_settings.PAGE_SIZE
+        for thesaurus in Thesaurus.objects.filter(is_actual=True):
+            path = f"/api/v1/thesaurus/{thesaurus.pk}/items/"
+            for page in range(options["pages"]):
+                # Параметры совпадают со ссылками next постраничного вывода
+                params = (
+                    {"limit": page_size, "offset": page * page_size} if page else {}
+                )
+                if not self._warm(
+                    item_list, factory.get(path, params), thesaurus=thesaurus.pk
+                ):
+                    break
+                count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Cached {count} responses"))
+
+    def _warm(self, view, request, **kwargs) -> bool:
+        response = view(request, **kwargs)
+        if callable(getattr(response, "render", None)):
+            response.render()
+        return response.status_code == 200
@@ -1,4 +1,23 @@
-from django.db import models
+import unicodedata
+from collections import defaultdict
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.core.exceptions import ValidationError
+from django.db import models, router, transaction
+from django.db.models import F, Min, Q, Subquery
+from django.db.models.signals import post_delete
+from django.utils import timezone
+
+
+def normalize_value(value: str) -> str:
+    """
+    Ключ сравнения значений без учета регистра, формы Unicode (NFKC),
+    различия букв «ё» и «е» и пробелов
+    """
+    value = unicodedata.normalize(
+        "NFKC", unicodedata.normalize("NFKC", value).casefold()
+    )
+    return " ".join(value.replace("ё", "е").split())
 
 
 class Thesaurus(models.Model):
@@ -18,6 +37,35 @@ class Thesaurus(models.Model):
         ordering = ["name"]
 
 
+class ThesaurusVersionManager(models.Manager):
+    def actual_to(self, actual_to: date):
+        """
+        Версии справочников, действующие на указанную дату
+        """
+        return self.filter(
+            Q(end_date__isnull=True) | Q(end_date__gt=actual_to),
+            start_date__lte=actual_to,
+        )
+
+    def update_intervals(self, thesaurus_id: int) -> int:
+        """
+        Пересчет окончания действия версий справочника: версия действует
+        до начала действия следующей (end_date не включается в интервал)
+        """
+        versions = list(
+            self.filter(thesaurus_id=thesaurus_id)
+            .order_by("start_date")
+            .values_list("pk", "start_date", "end_date")
+        )
+        next_start_dates = [start_date for _, start_date, _ in versions[1:]] + [None]
+
+        updated = 0
+        for (pk, _, end_date), next_start_date in zip(versions, next_start_dates):
+            if end_date != next_start_date:
+                updated += self.filter(pk=pk).update(end_date=next_start_date)
+        return updated
+
+
 class ThesaurusVersion(models.Model):
     thesaurus = models.ForeignKey(
         to=Thesaurus,
@@ -27,7 +75,19 @@ class ThesaurusVersion(models.Model):
     )
     version = models.CharField("Версия", max_length=31)
     start_date = models.DateField("Действует с")
+    end_date = models.DateField("Действует до", null=True, editable=False)
     slug = models.CharField("URL", max_length=31, db_index=True)
+    parent = models.ForeignKey(
+        to="self",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="children",
+        verbose_name="Базовая версия",
+    )
+
+    objects = ThesaurusVersionManager()
 
     def __str__(self):
         return f"[{self.version} от {self.start_date}] {self.thesaurus}"
@@ -39,30 +99,480 @@ class ThesaurusVersion(models.Model):
             ["thesaurus", "start_date"],
             ["thesaurus", "slug"],
         ]
+        indexes = [
+            models.Index(
+                fields=["thesaurus", "start_date", "end_date"],
+                name="thesaurus_version_interval",
+            ),
+        ]
         verbose_name = "Версия справочника"
         verbose_name_plural = "Версии справочников"
         ordering = ["thesaurus", "-start_date"]
 
 
+def transfer_shared_items(collector, field, sub_objs, using):
+    """
+    Удаление версии: элементы, которые входят и в другие (не удаляемые)
+    версии, переходят к одной из них, остальные удаляются вместе с версией.
+    Версии, к которым перешли элементы, запоминаются в удаляемой версии
+    (items_transferred_to): обновление поля не отправляет сигналы,
+    о переходе сообщает обработчик post_delete версии.
+    """
+    deleted_versions = {
+        version.pk: version for version in collector.data[field.related_model]
+    }
+    deleted_version_ids = list(deleted_versions)
+    owners = dict(
+        ThesaurusVersionItem.objects.using(using)
+        .filter(item__in=sub_objs)
+        .exclude(thesaurus_version_id__in=deleted_version_ids)
+        .values("item_id")
+        .annotate(owner_id=Min("thesaurus_version_id"))
+        .values_list("item_id", "owner_id")
+    )
+
+    transferred = defaultdict(list)
+    deleted = []
+    for item in sub_objs:
+        if item.pk in owners:
+            transferred[owners[item.pk]].append(item)
+            deleted_version = deleted_versions[item.thesaurus_version_id]
+            deleted_version.items_transferred_to = {
+                *getattr(deleted_version, "items_transferred_to", ()),
+                owners[item.pk],
+            }
+        else:
+            deleted.append(item)
+
+    for owner_id, items in transferred.items():
+        collector.add_field_update(field, owner_id, items)
+    if deleted:
+        models.CASCADE(collector, field, deleted, using)
+
+
+class ThesaurusItemQuerySet(models.QuerySet):
+    def in_version(self, thesaurus_version: ThesaurusVersion):
+        """
+        Элементы версии по таблице состава версий (включая элементы,
+        общие с другими версиями справочника)
+        """
+        return self.filter(memberships__thesaurus_version=thesaurus_version)
+
+    def order_by_version_value(self):
+        """
+        Элементы in_version в порядке значения в составе версии
+        (version_value): строки читаются по индексу (thesaurus_version, value)
+        без сортировки
+        """
+        return self.annotate(version_value=F("memberships__value")).order_by(
+            "version_value"
+        )
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create не вызывает save(), ключ и состав версии заполняются здесь
+        objs = list(objs)
+        for obj in objs:
+            obj.normalized_value = normalize_value(obj.value)
+        with transaction.atomic(using=self.db, savepoint=False):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            ThesaurusVersionItem.objects.bulk_create(
+                [
+                    ThesaurusVersionItem(
+                        thesaurus_version_id=obj.thesaurus_version_id,
+                        item_id=obj.pk,
+                        code=obj.code,
+                        value=obj.value,
+                    )
+                    for obj in objs
+                ]
+            )
+        return objs
+
+
 class ThesaurusItem(models.Model):
+    """
+    Элемент справочника. Строка принадлежит версии, в которой создана
+    (thesaurus_version), и может входить в состав следующих версий без
+    копирования (ThesaurusVersionItem). Изменение или удаление общего
+    элемента в одной версии не затрагивает остальные: изменения
+    записываются в новую строку версии (копирование при записи).
+    """
+
     thesaurus_version = models.ForeignKey(
         to=ThesaurusVersion,
-        on_delete=models.CASCADE,
+        on_delete=transfer_shared_items,
         related_name="items",
         verbose_name="Справочник",
     )
     code = models.CharField("Код", max_length=31)
     value = models.CharField("Значение", max_length=255)
+    normalized_value = models.CharField(
+        "Нормализованное значение", max_length=255, default="", editable=False
+    )
+
+    objects = ThesaurusItemQuerySet.as_manager()
 
     def __str__(self):
         return f"[{self.code}] {self.value}"
 
+    def save(self, *args, **kwargs):
+        self.normalized_value = normalize_value(self.value)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "value" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "normalized_value"}
+
+        created = self._state.adding
+        with transaction.atomic():
+            if not created:
+                version_ids = self._get_member_version_ids()
+                if len(version_ids) > 1:
+                    return self._copy_on_write(version_ids)
+
+            super().save(*args, **kwargs)
+            if created:
+                ThesaurusVersionItem.objects.create(
+                    thesaurus_version_id=self.thesaurus_version_id,
+                    item=self,
+                    code=self.code,
+                    value=self.value,
+                )
+            else:
+                # Элемент может быть перенесен в другую версию
+                ThesaurusVersionItem.objects.filter(item=self).update(
+                    thesaurus_version_id=self.thesaurus_version_id,
+                    code=self.code,
+                    value=self.value,
+                )
+
+    def delete(self, *args, **kwargs):
+        version_ids = self._get_member_version_ids()
+        if len(version_ids) > 1 and self.thesaurus_version_id in version_ids:
+            with transaction.atomic():
+                self._detach()
+            return 1, {ThesaurusVersionItem._meta.label: 1}
+        return super().delete(*args, **kwargs)
+
+    def validate_unique(self, exclude=None):
+        """
+        Уникальность кода и значения в составе версии, а не только среди
+        строк, созданных в ней
+        """
+        super().validate_unique(exclude)
+        if self.thesaurus_version_id is None:
+            return
+
+        elements = ThesaurusItem.objects.filter(
+            memberships__thesaurus_version_id=self.thesaurus_version_id
+        ).exclude(pk=self.pk)
+        errors = {}
+        for field in ("code", "value"):
+            if exclude and field in exclude:
+                continue
+            if elements.filter(**{field: getattr(self, field)}).exists():
+                errors[field] = self.unique_error_message(
+                    ThesaurusItem, ("thesaurus_version", field)
+                )
+        if errors:
+            raise ValidationError(errors)
+
+    def _get_member_version_ids(self) -> set[int]:
+        return set(
+            ThesaurusVersionItem.objects.filter(item_id=self.pk).values_list(
+                "thesaurus_version_id", flat=True
+            )
+        )
+
+    def _copy_on_write(self, version_ids: set[int]):
+        """
+        Сохранение изменений общего элемента новой строкой версии
+        thesaurus_version, остальные версии сохраняют прежнюю строку
+        """
+        previous = ThesaurusItem.objects.get(pk=self.pk)
+        if self.thesaurus_version_id in version_ids:
+            previous.thesaurus_version_id = self.thesaurus_version_id
+        previous._detach()
+
+        self.pk = None
+        self._state.adding = True
+        self.save()
+
+    def _detach(self):
+        """
+        Исключение общего элемента из версии thesaurus_version без удаления
+        строки; строка переходит к одной из остальных версий
+        """
+        memberships = ThesaurusVersionItem.objects.filter(item_id=self.pk)
+        memberships.filter(thesaurus_version_id=self.thesaurus_version_id).delete()
+        ThesaurusItem.objects.filter(
+            pk=self.pk, thesaurus_version_id=self.thesaurus_version_id
+        ).update(
+            thesaurus_version_id=Subquery(
+                memberships.order_by("thesaurus_version_id").values(
+                    "thesaurus_version_id"
+                )[:1]
+            )
+        )
+        # Для версии элемент удален: обработчики сбрасывают кэши версии
+        # и записывают удаление в журнал изменений
+        post_delete.send(
+            sender=ThesaurusItem,
+            instance=self,
+            using=router.db_for_write(ThesaurusItem),
+            origin=self,
+        )
+
     class Meta:
         db_table = "thesaurus_item"
         unique_together = [
             ["thesaurus_version", "code"],
             ["thesaurus_version", "value"],
         ]
+        # Элементы версии отбираются через ThesaurusVersionItem, поэтому
+        # поиск по коду и значению идет по индексам без версии
+        indexes = [
+            models.Index(fields=["code"], name="thesaurus_item_code"),
+            models.Index(fields=["value"], name="thesaurus_item_value"),
+            models.Index(fields=["normalized_value"], name="thesaurus_item_normalized"),
+        ]
         verbose_name = "Элемент справочника"
         verbose_name_plural = "Элементы справочников"
         ordering = ["thesaurus_version", "value"]
+
+
+class ThesaurusVersionItem(models.Model):
+    """
+    Состав версии справочника: версия, созданная на основе другой,
+    ссылается на неизмененные элементы базовой версии вместо их копий.
+    Код и значение элемента повторяются здесь, чтобы их уникальность
+    проверялась в составе версии, а элементы версии читались в порядке
+    значения по индексу (thesaurus_version, value).
+    """
+
+    thesaurus_version = models.ForeignKey(
+        to=ThesaurusVersion,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Версия справочника",
+    )
+    item = models.ForeignKey(
+        to=ThesaurusItem,
+        on_delete=models.CASCADE,
+        related_name="memberships",
+        verbose_name="Элемент справочника",
+    )
+    code = models.CharField("Код", max_length=31)
+    value = models.CharField("Значение", max_length=255)
+
+    class Meta:
+        db_table = "thesaurus_version_item"
+        unique_together = [
+            ["thesaurus_version", "item"],
+            ["thesaurus_version", "code"],
+            ["thesaurus_version", "value"],
+        ]
+        verbose_name = "Элемент версии справочника"
+        verbose_name_plural = "Состав версий справочников"
+
+
+class ThesaurusVersionDiff(models.Model):
+    from_version = models.ForeignKey(
+        to=ThesaurusVersion,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Исходная версия",
+    )
+    to_version = models.ForeignKey(
+        to=ThesaurusVersion,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Целевая версия",
+    )
+    added = models.JSONField("Добавленные элементы", default=list)
+    removed = models.JSONField("Удаленные элементы", default=list)
+    changed = models.JSONField("Измененные элементы", default=list)
+    created_at = models.DateTimeField("Дата расчета", auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.from_version} -> {self.to_version}"
+
+    class Meta:
+        db_table = "thesaurus_version_diff"
+        unique_together = [["from_version", "to_version"]]
+        verbose_name = "Изменения версии справочника"
+        verbose_name_plural = "Изменения версий справочников"
+
+
+class ThesaurusVersionBloomFilter(models.Model):
+    thesaurus_version = models.OneToOneField(
+        to=ThesaurusVersion,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="+",
+        verbose_name="Версия справочника",
+    )
+    data = models.BinaryField("Фильтр Блума")
+    change_id = models.PositiveBigIntegerField("Последнее изменение версии", default=0)
+    created_at = models.DateTimeField("Дата построения", auto_now=True)
+
+    def __str__(self):
+        return f"{self.thesaurus_version}"
+
+    class Meta:
+        db_table = "thesaurus_version_bloom_filter"
+        verbose_name = "Фильтр Блума версии справочника"
+        verbose_name_plural = "Фильтры Блума версий справочников"
+
+
+class RevisionManager(models.Manager):
+    REVISION_ID = 1
+
+    # Ревизия до первого изменения данных (строка создается в bump)
+    INITIAL_UPDATED_AT = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+    def current(self) -> "Revision":
+        # Только чтение: get_or_create привязал бы чтение к основной базе
+        return self.filter(pk=self.REVISION_ID).first() or self._initial()
+
+    async def acurrent(self) -> "Revision":
+        return await self.filter(pk=self.REVISION_ID).afirst() or self._initial()
+
+    def _initial(self) -> "Revision":
+        return self.model(
+            pk=self.REVISION_ID, number=0, updated_at=self.INITIAL_UPDATED_AT
+        )
+
+    def bump(self):
+        updated = self.filter(pk=self.REVISION_ID).update(
+            number=F("number") + 1, updated_at=timezone.now()
+        )
+        if not updated:
+            self.get_or_create(pk=self.REVISION_ID, defaults={"number": 1})
+
+
+class Revision(models.Model):
+    number = models.PositiveBigIntegerField("Номер ревизии", default=0)
+    updated_at = models.DateTimeField("Дата изменения", default=timezone.now)
+
+    objects = RevisionManager()
+
+    def __str__(self):
+        return f"{self.number} от {self.updated_at}"
+
+    class Meta:
+        db_table = "revision"
+        verbose_name = "Ревизия данных"
+        verbose_name_plural = "Ревизии данных"
+
+
+class ChangeLogManager(models.Manager):
+    def record(self, instance: models.Model, action: str) -> "ChangeLog":
+        """
+        Запись изменения справочника, версии или элемента
+        """
+        if isinstance(instance, Thesaurus):
+            object_type, thesaurus_id, version_id = (
+                ChangeLog.THESAURUS,
+                instance.pk,
+                None,
+            )
+        elif isinstance(instance, ThesaurusVersion):
+            object_type = ChangeLog.VERSION
+            thesaurus_id, version_id = instance.thesaurus_id, instance.pk
+        else:
+            object_type = ChangeLog.ITEM
+            thesaurus_id, version_id = None, instance.thesaurus_version_id
+        return self.create(
+            object_type=object_type,
+            object_id=instance.pk,
+            action=action,
+            thesaurus_id=thesaurus_id,
+            thesaurus_version_id=version_id,
+        )
+
+    def last_version_change_id(self, thesaurus_version_id: int) -> int:
+        """
+        Идентификатор последнего изменения версии или ее элементов (0 — нет
+        изменений); отметка, по которой проверяется актуальность данных,
+        построенных по элементам версии в любом процессе
+        """
+        return (
+            self.filter(thesaurus_version_id=thesaurus_version_id)
+            .order_by("-pk")
+            .values_list("pk", flat=True)
+            .first()
+            or 0
+        )
+
+    async def alast_version_change_id(self, thesaurus_version_id: int) -> int:
+        return (
+            await self.filter(thesaurus_version_id=thesaurus_version_id)
+            .order_by("-pk")
+            .values_list("pk", flat=True)
+            .afirst()
+            or 0
+        )
+
+    def record_items_loaded(self, thesaurus_version: ThesaurusVersion) -> "ChangeLog":
+        """
+        Запись пакетной загрузки элементов версии (элементы по отдельности
+        не записываются, клиент получает элементы версии заново)
+        """
+        return self.create(
+            object_type=ChangeLog.VERSION_ITEMS,
+            object_id=thesaurus_version.pk,
+            action=ChangeLog.RELOAD,
+            thesaurus_id=thesaurus_version.thesaurus_id,
+            thesaurus_version_id=thesaurus_version.pk,
+        )
+
+
+class ChangeLog(models.Model):
+    """
+    Журнал изменений справочников для инкрементальной синхронизации.
+    Идентификатор записи возрастает и служит токеном синхронизации.
+    """
+
+    THESAURUS = "thesaurus"
+    VERSION = "version"
+    VERSION_ITEMS = "version_items"
+    ITEM = "item"
+    OBJECT_TYPES = [
+        (THESAURUS, "Справочник"),
+        (VERSION, "Версия справочника"),
+        (VERSION_ITEMS, "Элементы версии справочника"),
+        (ITEM, "Элемент справочника"),
+    ]
+
+    SAVE = "save"
+    DELETE = "delete"
+    RELOAD = "reload"
+    ACTIONS = [
+        (SAVE, "Сохранение"),
+        (DELETE, "Удаление"),
+        (RELOAD, "Загрузка"),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    object_type = models.CharField("Тип объекта", max_length=15, choices=OBJECT_TYPES)
+    object_id = models.PositiveBigIntegerField("Идентификатор объекта")
+    action = models.CharField("Действие", max_length=15, choices=ACTIONS)
+    thesaurus_id = models.PositiveBigIntegerField("Справочник", null=True)
+    thesaurus_version_id = models.PositiveBigIntegerField(
+        "Версия справочника", null=True
+    )
+    created_at = models.DateTimeField("Дата изменения", auto_now_add=True)
+
+    objects = ChangeLogManager()
+
+    def __str__(self):
+        return f"{self.pk}: {self.action} {self.object_type} {self.object_id}"
+
+    class Meta:
+        db_table = "change_log"
+        indexes = [
+            models.Index(
+                fields=["thesaurus_version_id", "id"], name="change_log_version"
+            ),
+        ]
+        verbose_name = "Изменение справочников"
+        verbose_name_plural = "Журнал изменений справочников"
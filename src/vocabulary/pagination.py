@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.db.models import Count, QuerySet, Window
+
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+
+class ThesaurusItemLimitOffsetPagination(LimitOffsetPagination):
+    """
+    Постраничный вывод по смещению, при котором общее количество элементов
+    вычисляется оконной функцией в запросе страницы, а не отдельным COUNT
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not isinstance(queryset, QuerySet):
+            return super().paginate_queryset(queryset, request, view)
+
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.offset = self.get_offset(request)
+        self.request = request
+        page = list(
+            queryset.annotate(total_count=Window(Count("pk")))[
+                self.offset : self.offset + self.limit
+            ]
+        )
+        if page and isinstance(page[0], dict):
+            self.count = page[0]["total_count"]
+            for row in page:
+                del row["total_count"]
+        elif page:
+            self.count = page[0].total_count
+        else:
+            self.count = queryset.count() if self.offset else 0
+
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+        return page
+
+
+class ThesaurusItemCursorPagination(CursorPagination):
+    """
+    Постраничный вывод элементов справочника по ключу вместо смещения.
+    Ключ — значение в составе версии (version_value, см.
+    ThesaurusItemQuerySet.order_by_version_value): страница отбирается по
+    индексу (thesaurus_version, value) от ключа предыдущей, поэтому
+    стоимость любой страницы одинакова; общее количество элементов
+    не вычисляется.
+    """
+
+    ordering = "version_value"
+    page_size = getattr(settings, "VOCABULARY_CURSOR_PAGE_SIZE", 1000)
+    page_size_query_param = "page_size"
+    max_page_size = getattr(settings, "VOCABULARY_CURSOR_MAX_PAGE_SIZE", 10000)
+
+    def _get_position_from_instance(self, instance, ordering):
+        # Строки values() содержат значение элемента, равное значению
+        # в составе версии
+        if isinstance(instance, dict):
+            return str(instance["value"])
+        return super()._get_position_from_instance(instance, ordering)
@@ -0,0 +1,119 @@
+import gzip
+from hashlib import sha1
+from time import time_ns
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+RESPONSE_CACHE_PREFIX = "vocabulary:response"
+
+# Области кэша: список справочников и элементы отдельных версий
+THESAURUS_SCOPE = "thesaurus"
+
+
+def version_scope(thesaurus_version_id: int) -> str:
+    return f"version:{thesaurus_version_id}"
+
+
+class ThesaurusResponseCache:
+    """
+    Общий для всех процессов кэш отрисованных ответов API (сжатых gzip)
+    в кэше Django (VOCABULARY_RESPONSE_CACHE — имя кэша из CACHES).
+
+    Ключ ответа включает ревизию данных, поколение области кэша (версии
+    справочника или списка справочников), адрес и параметры запроса
+    и формат ответа. Ревизия хранится в базе и меняется при любом изменении
+    данных, в том числе в других процессах, поэтому ответ из кэша всегда
+    соответствует ETag ревизии; поколение области сбрасывается сигналами.
+    """
+
+    def __init__(self, alias: str = None, timeout: int = None):
+        self._alias = alias
+        self._timeout = timeout
+
+    @property
+    def enabled(self) -> bool:
+        return self.alias is not None
+
+    @property
+    def alias(self) -> str | None:
+        if self._alias is not None:
+            return self._alias
+        return getattr(settings, "VOCABULARY_RESPONSE_CACHE", None)
+
+    @property
+    def timeout(self) -> int:
+        if self._timeout is not None:
+            return self._timeout
+        return getattr(settings, "VOCABULARY_RESPONSE_CACHE_TTL", 3600)
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get_key(
+        self, scope: str, revision: int, request, renderer_format: str
+    ) -> str | None:
+        if not self.enabled:
+            return None
+
+        params = sorted(request.GET.lists())
+        raw_key = "|".join(
+            [
+                scope,
+                str(revision),
+                str(self._get_generation(scope)),
+                request.build_absolute_uri(request.path),
+                repr(params),
+                renderer_format,
+            ]
+        )
+        return f"{RESPONSE_CACHE_PREFIX}:{sha1(raw_key.encode()).hexdigest()}"
+
+    def get(self, key: str | None) -> HttpResponse | None:
+        if key is None:
+            return None
+
+        cached = self.cache.get(key)
+        if cached is None:
+            return None
+
+        content_type, content = cached
+        return HttpResponse(gzip.decompress(content), content_type=content_type)
+
+    def set(self, key: str | None, response):
+        if key is None or response.status_code != 200:
+            return
+
+        self.cache.set(
+            key,
+            (response["Content-Type"], gzip.compress(response.content)),
+            self.timeout,
+        )
+
+    def invalidate(self, scope: str):
+        if self.enabled:
+            self.cache.set(self._get_generation_key(scope), time_ns(), None)
+
+    def clear(self):
+        """
+        Очистка всего кэша VOCABULARY_RESPONSE_CACHE
+        """
+        if self.enabled:
+            self.cache.clear()
+
+    def _get_generation(self, scope: str) -> int:
+        key = self._get_generation_key(scope)
+        generation = self.cache.get(key)
+        if generation is None:
+            # Поколение уникально и после вытеснения ключа из кэша
+            self.cache.add(key, time_ns(), None)
+            generation = self.cache.get(key)
+        return generation
+
+    def _get_generation_key(self, scope: str) -> str:
+        return f"{RESPONSE_CACHE_PREFIX}:generation:{scope}"
+
+
+response_cache = ThesaurusResponseCache()
@@ -0,0 +1,151 @@
+from django.db import connection as default_connection, connections
+from django.db.models import Q, QuerySet
+from django.db.models.expressions import RawSQL
+
+from .models import ThesaurusItem, ThesaurusVersionItem, normalize_value
+
+SEARCH_TABLE = "thesaurus_item_search"
+
+# Триграммный индекс FTS5 находит подстроки длиной не меньше трех символов
+SEARCH_MIN_LENGTH = 3
+
+SEARCH_LIMIT = 10
+SEARCH_MAX_LIMIT = 100
+
+
+class ThesaurusItemSearchIndex:
+    """
+    Полнотекстовый индекс значений элементов справочников (SQLite FTS5
+    с триграммным токенизатором). Индекс хранит только rowid и ссылается
+    на таблицу элементов, синхронизация выполняется триггерами, поэтому
+    учитываются в том числе элементы, загруженные через bulk_create.
+    """
+
+    def __init__(self, connection=None):
+        self.connection = connection or default_connection
+
+    @property
+    def supported(self) -> bool:
+        return self.connection.vendor == "sqlite"
+
+    def create(self):
+        """
+        Создание индекса и триггеров синхронизации (если их еще нет)
+        """
+        if not self.supported:
+            return
+
+        item_table = ThesaurusItem._meta.db_table
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+                [SEARCH_TABLE],
+            )
+            exists = cursor.fetchone() is not None
+
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+                f"value, thesaurus_version_id UNINDEXED, "
+                f"content='{item_table}', content_rowid='id', tokenize='trigram')"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai "
+                f"AFTER INSERT ON {item_table} BEGIN "
+                f"INSERT INTO {SEARCH_TABLE}(rowid, value, thesaurus_version_id) "
+                f"VALUES (new.id, new.value, new.thesaurus_version_id); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad "
+                f"AFTER DELETE ON {item_table} BEGIN "
+                f"INSERT INTO {SEARCH_TABLE}"
+                f"({SEARCH_TABLE}, rowid, value, thesaurus_version_id) "
+                f"VALUES ('delete', old.id, old.value, old.thesaurus_version_id); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au "
+                f"AFTER UPDATE ON {item_table} BEGIN "
+                f"INSERT INTO {SEARCH_TABLE}"
+                f"({SEARCH_TABLE}, rowid, value, thesaurus_version_id) "
+                f"VALUES ('delete', old.id, old.value, old.thesaurus_version_id); "
+                f"INSERT INTO {SEARCH_TABLE}(rowid, value, thesaurus_version_id) "
+                f"VALUES (new.id, new.value, new.thesaurus_version_id); END"
+            )
+
+        if not exists:
+            self.rebuild()
+
+    def rebuild(self):
+        """
+        Полное перестроение индекса по таблице элементов
+        """
+        if not self.supported:
+            return
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')"
+            )
+
+    def search(
+        self, thesaurus_version_id: int, query: str, limit: int = SEARCH_LIMIT
+    ) -> list[ThesaurusItem]:
+        """
+        Поиск элементов версии, значение которых содержит строку query.
+        Значения, начинающиеся с query, идут первыми, далее — по релевантности.
+        """
+        item_table = ThesaurusItem._meta.db_table
+        membership_table = ThesaurusVersionItem._meta.db_table
+        match = self._match(query)
+        prefix = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return list(
+            ThesaurusItem.objects.raw(
+                f"SELECT i.id, i.thesaurus_version_id, i.code, i.value "
+                f"FROM {SEARCH_TABLE} s JOIN {item_table} i ON i.id = s.rowid "
+                f"JOIN {membership_table} m ON m.item_id = i.id "
+                f"WHERE {SEARCH_TABLE} MATCH %s AND m.thesaurus_version_id = %s "
+                f"ORDER BY i.value LIKE %s ESCAPE '\\' DESC, s.rank, i.value "
+                f"LIMIT %s",
+                [match, thesaurus_version_id, prefix + "%", limit],
+            )
+        )
+
+    def filter_queryset(self, queryset: QuerySet, query: str) -> QuerySet:
+        """
+        Отбор элементов queryset, значение которых содержит строку query
+        (для коротких строк — по началу значения, без индекса — по подстроке)
+        """
+        if not self.supported:
+            return queryset.filter(value__icontains=query)
+        if len(query) < SEARCH_MIN_LENGTH:
+            return queryset.filter(prefix_filter(query))
+
+        return queryset.filter(
+            pk__in=RawSQL(
+                f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s",
+                [self._match(query)],
+            )
+        )
+
+    def _match(self, query: str) -> str:
+        return '"' + query.replace('"', '""') + '"'
+
+
+def prefix_filter(query: str) -> Q:
+    """
+    Условие «значение начинается с query» без учета регистра: диапазон
+    нормализованных значений [prefix, prefix + 1) выбирается по индексу
+    normalized_value (LIKE в SQLite не различает регистр только для ASCII
+    и не использует индекс)
+    """
+    prefix = normalize_value(query)
+    if not prefix:
+        return Q()
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return Q(normalized_value__gte=prefix, normalized_value__lt=upper)
+
+
+def create_search_index(using="default", **kwargs):
+    """
+    Обработчик post_migrate: создание полнотекстового индекса элементов
+    """
+    ThesaurusItemSearchIndex(connections[using]).create()
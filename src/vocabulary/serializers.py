@@ -1,23 +1,163 @@
 from rest_framework import serializers
 
-from .models import Thesaurus, ThesaurusVersion, ThesaurusItem
+from .instrumentation import timed
+from .models import (
+    Thesaurus,
+    ThesaurusVersion,
+    ThesaurusItem,
+    ThesaurusVersionDiff,
+    ChangeLog,
+)
+from .service import CHANGES_LIMIT, CHANGES_MAX_LIMIT
+
+
+class InstrumentedListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with timed("serialize"):
+            return super().data
+
+
+class InstrumentedSerializerMixin:
+    """
+    Время сериализации ответа учитывается в замерах запроса (Server-Timing)
+    """
+
+    @property
+    def data(self):
+        with timed("serialize"):
+            return super().data
 
 
 class ThesaurusVersionSerializer(serializers.ModelSerializer):
     class Meta:
         model = ThesaurusVersion
-        exclude = ["thesaurus"]
+        exclude = ["thesaurus", "end_date", "parent"]
 
 
-class ThesaurusSerializer(serializers.ModelSerializer):
+class ThesaurusSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
     versions = ThesaurusVersionSerializer(many=True)
 
     class Meta:
         model = Thesaurus
+        list_serializer_class = InstrumentedListSerializer
         fields = "__all__"
 
 
-class ThesaurusItemSerializer(serializers.ModelSerializer):
+class ThesaurusItemSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = ThesaurusItem
-        exclude = ["thesaurus_version"]
+        list_serializer_class = InstrumentedListSerializer
+        exclude = ["thesaurus_version", "normalized_value"]
+
+
+class ThesaurusVersionDiffSerializer(
+    InstrumentedSerializerMixin, serializers.ModelSerializer
+):
+    class Meta:
+        model = ThesaurusVersionDiff
+        fields = ["from_version", "to_version", "added", "removed", "changed"]
+
+
+class ThesaurusItemValidationSerializer(serializers.Serializer):
+    code = serializers.CharField(required=False, allow_blank=True, max_length=31)
+    value = serializers.CharField(required=False, allow_blank=True, max_length=255)
+
+    def validate(self, attrs):
+        if not attrs.get("code") and not attrs.get("value"):
+            raise serializers.ValidationError(
+                "None of the parameters specified (code and value)"
+            )
+        return attrs
+
+
+class ThesaurusItemBulkValidationSerializer(serializers.Serializer):
+    items = ThesaurusItemValidationSerializer(
+        many=True, allow_empty=False, max_length=10000
+    )
+
+
+class ThesaurusResolveSerializer(serializers.Serializer):
+    thesauri = serializers.ListField(
+        child=serializers.CharField(max_length=31), allow_empty=False, max_length=1000
+    )
+    date = serializers.DateField(required=False)
+    items = serializers.BooleanField(default=True)
+
+
+class ChangeLogQuerySerializer(serializers.Serializer):
+    since = serializers.IntegerField(min_value=0, required=False)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=CHANGES_MAX_LIMIT, default=CHANGES_LIMIT
+    )
+
+
+# Представления без сериализаторов для быстрого вывода списков в JSON.
+# Поля и их порядок совпадают с ThesaurusSerializer и ThesaurusItemSerializer.
+
+THESAURUS_ITEM_FIELDS = ("id", "code", "value")
+
+
+def thesaurus_item_data(item) -> dict:
+    if isinstance(item, dict):
+        return item
+    return {"id": item.id, "code": item.code, "value": item.value}
+
+
+def thesaurus_version_data(thesaurus_version: ThesaurusVersion) -> dict:
+    return {
+        "id": thesaurus_version.id,
+        "version": thesaurus_version.version,
+        "start_date": thesaurus_version.start_date.isoformat(),
+        "slug": thesaurus_version.slug,
+    }
+
+
+def thesaurus_data(thesaurus: Thesaurus) -> dict:
+    return {
+        "id": thesaurus.id,
+        "versions": [
+            thesaurus_version_data(version) for version in thesaurus.versions.all()
+        ],
+        "name": thesaurus.name,
+        "short_name": thesaurus.short_name,
+        "slug": thesaurus.slug,
+        "description": thesaurus.description,
+        "is_actual": thesaurus.is_actual,
+    }
+
+
+def change_log_data(entry: ChangeLog, obj) -> dict:
+    """
+    Изменение журнала с текущим состоянием сохраненного объекта (data)
+    """
+    action = entry.action
+    data = None
+    if action == ChangeLog.SAVE:
+        if obj is None:
+            # Объект удален между чтением журнала и чтением объектов
+            action = ChangeLog.DELETE
+        elif entry.object_type == ChangeLog.THESAURUS:
+            # Версии справочника передаются отдельными изменениями
+            data = {
+                "id": obj.id,
+                "name": obj.name,
+                "short_name": obj.short_name,
+                "slug": obj.slug,
+                "description": obj.description,
+                "is_actual": obj.is_actual,
+            }
+        elif entry.object_type == ChangeLog.VERSION:
+            data = thesaurus_version_data(obj)
+        else:
+            data = thesaurus_item_data(obj)
+
+    return {
+        "token": entry.pk,
+        "type": entry.object_type,
+        "id": entry.object_id,
+        "action": action,
+        "thesaurus_id": entry.thesaurus_id,
+        "version_id": entry.thesaurus_version_id,
+        "data": data,
+    }
@@ -1,11 +1,104 @@
+from collections import defaultdict
 from datetime import date
+from threading import Lock
+from time import monotonic
 
-from django.db.models import Subquery, OuterRef, Prefetch, Count
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.db.models import Prefetch, Count, Max, Q
+from django.http import Http404
 from django.shortcuts import get_list_or_404
 
-from .models import Thesaurus, ThesaurusVersion, ThesaurusItem
+from .bloom import BLOOM_FILTER_ERROR_RATE, BloomFilter, bloom_filter_cache
+from .instrumentation import instrument_methods
+from .models import (
+    Thesaurus,
+    ThesaurusVersion,
+    ThesaurusItem,
+    ThesaurusVersionDiff,
+    ThesaurusVersionBloomFilter,
+    ThesaurusVersionItem,
+    Revision,
+    ChangeLog,
+    normalize_value,
+)
+from .search import SEARCH_LIMIT, SEARCH_MIN_LENGTH, ThesaurusItemSearchIndex
+from .snapshot import ThesaurusVersionSnapshot, thesaurus_version_snapshot_cache
+
+
+class ThesaurusVersionCache:
+    """
+    Кэш версий справочников, актуальных на дату.
+
+    Для каждого справочника хранится последняя найденная версия и интервал
+    дат [start_date, next_start_date), в котором она остается актуальной.
+    Запись устаревает, как только вступает в действие следующая версия,
+    и сбрасывается сигналами при изменении версий справочника. Изменения,
+    сделанные в других процессах (загрузка версий командой), учитываются
+    по истечении времени жизни записи (VOCABULARY_VERSION_CACHE_TTL).
+    """
+
+    def __init__(self, ttl: float = None):
+        self._lock = Lock()
+        self._entries = {}
+        self._ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def ttl(self) -> float | None:
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, "VOCABULARY_VERSION_CACHE_TTL", None)
+
+    def get(self, thesaurus_id: int, actual_to: date):
+        with self._lock:
+            entry = self._entries.get(thesaurus_id)
+            if entry is not None:
+                version, valid_until, cached_at = entry
+                ttl = self.ttl
+                if (
+                    version.start_date <= actual_to
+                    and (valid_until is None or actual_to < valid_until)
+                    and (ttl is None or monotonic() - cached_at <= ttl)
+                ):
+                    self.hits += 1
+                    return version
+            self.misses += 1
+
+    def set(self, thesaurus_id: int, version: ThesaurusVersion, valid_until: date):
+        with self._lock:
+            self._entries[thesaurus_id] = (version, valid_until, monotonic())
+
+    def invalidate(self, thesaurus_id: int):
+        with self._lock:
+            self._entries.pop(thesaurus_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+thesaurus_version_cache = ThesaurusVersionCache()
+
+VALIDATION_CHUNK_SIZE = 500
+
+CHANGES_LIMIT = 1000
+CHANGES_MAX_LIMIT = 10000
 
 
+@instrument_methods("service")
 class ThesaurusService:
     def get_thesaurus_list(self):
         """
@@ -23,10 +116,13 @@ class ThesaurusService:
             queryset=self._get_thesaurus_version_actual_to(actual_to),
         )
 
-        queryset = (
-            Thesaurus.objects.prefetch_related(thesaurus_version_prefetch)
-            .filter(versions__start_date__lte=actual_to)
-            .distinct()
+        # У справочника не больше одной версии, действующей на дату,
+        # поэтому соединение не дублирует строки
+        queryset = Thesaurus.objects.prefetch_related(
+            thesaurus_version_prefetch
+        ).filter(
+            Q(versions__end_date__isnull=True) | Q(versions__end_date__gt=actual_to),
+            versions__start_date__lte=actual_to,
         )
 
         return queryset
@@ -37,44 +133,751 @@ class ThesaurusService:
         """
 
         thesaurus_current_version = self._get_thesaurus_current_version(thesaurus)
-        return thesaurus_current_version.items.all()
+        return self.get_thesaurus_version_elements(thesaurus_current_version)
 
     def validate_elements_thesaurus_current_version(
-        self, thesaurus: Thesaurus, code: str = None, value: str = None
+        self,
+        thesaurus: Thesaurus,
+        code: str = None,
+        value: str = None,
+        normalized: bool = False,
     ):
         """
         Валидация элементов заданного справочника текущей версии (проверка на то, что элемент с указанным кодом и значением существует в указанной версии справочника.)
         """
         thesaurus_current_version = self._get_thesaurus_current_version(thesaurus)
         return self.validate_elements_thesaurus_version(
-            thesaurus_current_version, code, value
+            thesaurus_current_version, code, value, normalized
         )
 
+    def validate_elements_thesaurus_current_version_bulk(
+        self,
+        thesaurus: Thesaurus,
+        elements: list[tuple[str | None, str | None]],
+        normalized: bool = False,
+    ) -> list[bool]:
+        """
+        Пакетная валидация элементов заданного справочника текущей версии
+        """
+        thesaurus_current_version = self._get_thesaurus_current_version(thesaurus)
+        return self.validate_elements_thesaurus_version_bulk(
+            thesaurus_current_version, elements, normalized
+        )
+
+    def search_elements_thesaurus_current_version(
+        self, thesaurus: Thesaurus, query: str, limit: int = SEARCH_LIMIT
+    ) -> list[ThesaurusItem]:
+        """
+        Поиск элементов заданного справочника текущей версии по подстроке значения
+        """
+        thesaurus_current_version = self._get_thesaurus_current_version(thesaurus)
+        return self.search_elements_thesaurus_version(
+            thesaurus_current_version, query, limit
+        )
+
+    def get_thesaurus_current_version(self, thesaurus: Thesaurus) -> ThesaurusVersion:
+        """
+        Получение текущей версии заданного справочника
+        """
+        return self._get_thesaurus_current_version(thesaurus)
+
+    def get_thesaurus_current_version_snapshot(
+        self, thesaurus: Thesaurus
+    ) -> ThesaurusVersionSnapshot | None:
+        """
+        Получение снимка элементов заданного справочника текущей версии
+        """
+        thesaurus_current_version = self._get_thesaurus_current_version(thesaurus)
+        return self.get_thesaurus_version_snapshot(thesaurus_current_version)
+
+    def get_thesauri_versions_actual_to(
+        self, thesaurus_keys: list[str], actual_to: date
+    ) -> dict[str, ThesaurusVersion | None]:
+        """
+        Получение версий нескольких справочников, актуальных на указанную дату,
+        одним запросом. Ключи — идентификаторы или slug справочников;
+        для справочников без актуальной версии возвращается None.
+        """
+        ids = [int(key) for key in thesaurus_keys if str(key).isdigit()]
+        slugs = [key for key in thesaurus_keys if not str(key).isdigit()]
+        versions = self._get_thesaurus_version_actual_to(actual_to).filter(
+            Q(thesaurus_id__in=ids) | Q(thesaurus__slug__in=slugs)
+        )
+
+        found = {}
+        for version in versions.select_related("thesaurus"):
+            found[str(version.thesaurus_id)] = version
+            found[version.thesaurus.slug] = version
+        return {key: found.get(str(key)) for key in thesaurus_keys}
+
+    def get_thesauri_versions_elements(
+        self, thesaurus_versions: list[ThesaurusVersion]
+    ) -> dict[int, list[dict]]:
+        """
+        Получение элементов нескольких версий справочников одним запросом
+        в виде словарей (id, code, value) по идентификаторам версий
+        """
+        elements = {version.pk: [] for version in thesaurus_versions}
+        rows = (
+            ThesaurusVersionItem.objects.filter(
+                thesaurus_version__in=thesaurus_versions
+            )
+            .order_by("thesaurus_version", "value")
+            .values_list("thesaurus_version_id", "item_id", "code", "value")
+        )
+        for thesaurus_version_id, pk, code, value in rows.iterator():
+            elements[thesaurus_version_id].append(
+                {"id": pk, "code": code, "value": value}
+            )
+        return elements
+
+    def get_thesaurus_version_by_key(
+        self, thesaurus_key: str, version_key: str = None, actual_to: date = None
+    ) -> ThesaurusVersion:
+        """
+        Получение версии справочника (если версия не указана — актуальной
+        на дату actual_to, по умолчанию текущую) вместе со справочником одним
+        запросом. Ключи — идентификаторы либо, если ключ справочника не число,
+        slug справочника и версии.
+        """
+        thesaurus_id = self._get_cached_thesaurus_id(thesaurus_key, version_key)
+        if thesaurus_id is not None:
+            thesaurus_version = thesaurus_version_cache.get(
+                thesaurus_id, actual_to or date.today()
+            )
+            if thesaurus_version is not None:
+                return thesaurus_version
+
+        queryset, lookup = self._get_thesaurus_version_by_key_lookup(
+            thesaurus_key, version_key, actual_to
+        )
+        try:
+            thesaurus_version = queryset.get(**lookup)
+        except ThesaurusVersion.DoesNotExist:
+            raise Http404(
+                f"No {ThesaurusVersion._meta.object_name} matches the given query."
+            )
+
+        if version_key is None and actual_to is None:
+            thesaurus_version_cache.set(
+                thesaurus_version.thesaurus_id,
+                thesaurus_version,
+                thesaurus_version.end_date,
+            )
+        return thesaurus_version
+
     def get_thesaurus_version_elements(self, thesaurus_version: ThesaurusVersion):
         """
         Получение элементов заданного справочника указанной версии
+        (по составу версии, включая элементы, общие с другими версиями)
         """
         self._validate_parameter_type(
             thesaurus_version, "thesaurus_version", ThesaurusVersion
         )
 
-        return thesaurus_version.items.all()
+        return ThesaurusItem.objects.in_version(
+            thesaurus_version
+        ).order_by_version_value()
+
+    def iter_thesaurus_version_elements(
+        self, thesaurus_version: ThesaurusVersion, chunk_size: int = 2000
+    ):
+        """
+        Потоковое получение элементов заданного справочника указанной версии
+        в виде кортежей (id, code, value) без создания экземпляров модели
+        """
+        items = self.get_thesaurus_version_elements(thesaurus_version)
+        return items.values_list("id", "code", "value").iterator(chunk_size=chunk_size)
+
+    def get_thesaurus_version_snapshot(
+        self, thesaurus_version: ThesaurusVersion, change_id: int = None
+    ) -> ThesaurusVersionSnapshot | None:
+        """
+        Получение неизменяемого снимка элементов заданного справочника указанной
+        версии. Снимок загружается из базы один раз и хранится в LRU-кэше
+        с отметкой последнего изменения версии (change_id, по умолчанию
+        читается из журнала изменений); после изменения версии, в том числе
+        в другом процессе, снимок строится заново. Для версий больше лимита
+        кэша возвращается None.
+        """
+        if thesaurus_version_snapshot_cache.is_oversized(thesaurus_version.pk):
+            return None
+        if change_id is None:
+            change_id = ChangeLog.objects.last_version_change_id(thesaurus_version.pk)
+        return thesaurus_version_snapshot_cache.get(
+            thesaurus_version,
+            self.get_thesaurus_version_elements(thesaurus_version),
+            change_id,
+        )
+
+    def get_thesaurus_version_bloom_filter(
+        self, thesaurus_version: ThesaurusVersion, change_id: int = None
+    ) -> BloomFilter:
+        """
+        Получение фильтра Блума по кодам и значениям элементов версии.
+        Фильтр хранится в базе вместе с версией и в памяти процесса
+        с отметкой последнего изменения версии; при отсутствии фильтра или
+        после изменения версии (в том числе в другом процессе) он строится
+        по элементам версии заново.
+        """
+        if change_id is None:
+            change_id = ChangeLog.objects.last_version_change_id(thesaurus_version.pk)
+        bloom_filter, generation = bloom_filter_cache.get(
+            thesaurus_version.pk, change_id
+        )
+        if bloom_filter is not None:
+            return bloom_filter
+
+        data = (
+            ThesaurusVersionBloomFilter.objects.filter(
+                thesaurus_version=thesaurus_version, change_id=change_id
+            )
+            .values_list("data", flat=True)
+            .first()
+        )
+        if data is not None:
+            bloom_filter = BloomFilter.from_bytes(data)
+        else:
+            bloom_filter = self._build_thesaurus_version_bloom_filter(
+                thesaurus_version, change_id
+            )
+
+        bloom_filter_cache.put(
+            thesaurus_version.pk, bloom_filter, change_id, generation
+        )
+        return bloom_filter
+
+    def build_thesaurus_version_bloom_filter(
+        self, thesaurus_version: ThesaurusVersion
+    ) -> BloomFilter:
+        """
+        Построение и сохранение фильтра Блума версии справочника
+        """
+        return self._build_thesaurus_version_bloom_filter(
+            thesaurus_version,
+            ChangeLog.objects.last_version_change_id(thesaurus_version.pk),
+        )
 
     def validate_elements_thesaurus_version(
-        self, thesaurus_version: ThesaurusVersion, code: str = None, value: str = None
+        self,
+        thesaurus_version: ThesaurusVersion,
+        code: str = None,
+        value: str = None,
+        normalized: bool = False,
     ):
         """
-        Валидация элемента заданного справочника по указанной версии
+        Валидация элемента заданного справочника по указанной версии.
+        При normalized=True значение сравнивается без учета регистра,
+        лишних пробелов и различий Unicode (см. normalize_value)
+        """
+        self._validate_element_parameters(thesaurus_version, code, value)
+
+        if normalized:
+            # Снимок и фильтр Блума построены по точным значениям
+            filters = {"code": code} if code else {}
+            if value:
+                filters["normalized_value"] = normalize_value(value)
+            return get_list_or_404(
+                self.get_thesaurus_version_elements(thesaurus_version), **filters
+            )
+
+        # Загруженный снимок точнее фильтра Блума, без снимка отсутствующие
+        # элементы отсекаются фильтром без обращения к элементам в базе.
+        # Оба используются, только если построены по последнему изменению версии
+        change_id = ChangeLog.objects.last_version_change_id(thesaurus_version.pk)
+        snapshot = thesaurus_version_snapshot_cache.peek(
+            thesaurus_version.pk, change_id
+        )
+        if snapshot is None:
+            bloom_filter = self.get_thesaurus_version_bloom_filter(
+                thesaurus_version, change_id
+            )
+            if not bloom_filter.may_contain(code, value):
+                raise Http404(
+                    f"No {ThesaurusItem._meta.object_name} matches the given query."
+                )
+            snapshot = self.get_thesaurus_version_snapshot(thesaurus_version, change_id)
+
+        if snapshot is not None:
+            return self._validate_elements_snapshot(snapshot, code, value)
+
+        filters = {k: v for k, v in (("code", code), ("value", value)) if v}
+        return get_list_or_404(
+            self.get_thesaurus_version_elements(thesaurus_version), **filters
+        )
+
+    def validate_elements_thesaurus_version_bulk(
+        self,
+        thesaurus_version: ThesaurusVersion,
+        elements: list[tuple[str | None, str | None]],
+        normalized: bool = False,
+    ) -> list[bool]:
+        """
+        Пакетная валидация элементов заданного справочника по указанной версии.
+        Для каждой пары (код, значение) возвращается признак существования
+        элемента в версии, в порядке следования пар.
         """
         self._validate_parameter_type(
             thesaurus_version, "thesaurus_version", ThesaurusVersion
         )
-        filters = {k: v for k, v in (("code", code), ("value", value)) if v}
-        if filters:
-            return get_list_or_404(
-                ThesaurusItem, thesaurus_version=thesaurus_version, **filters
+        if normalized:
+            return self._validate_elements_thesaurus_version_bulk(
+                thesaurus_version, elements, normalized
+            )
+
+        change_id = ChangeLog.objects.last_version_change_id(thesaurus_version.pk)
+        snapshot = thesaurus_version_snapshot_cache.peek(
+            thesaurus_version.pk, change_id
+        )
+        if snapshot is not None:
+            return [snapshot.contains(code, value) for code, value in elements]
+
+        bloom_filter = self.get_thesaurus_version_bloom_filter(
+            thesaurus_version, change_id
+        )
+        result = [bloom_filter.may_contain(code, value) for code, value in elements]
+        candidates = [
+            element for element, possible in zip(elements, result) if possible
+        ]
+        if candidates:
+            found = iter(
+                self._validate_elements_thesaurus_version_bulk(
+                    thesaurus_version, candidates, change_id=change_id
+                )
+            )
+            result = [possible and next(found) for possible in result]
+        return result
+
+    def _validate_elements_thesaurus_version_bulk(
+        self,
+        thesaurus_version: ThesaurusVersion,
+        elements: list[tuple[str | None, str | None]],
+        normalized: bool = False,
+        change_id: int = None,
+    ) -> list[bool]:
+        if normalized:
+            value_field = "normalized_value"
+            elements = [
+                (code, normalize_value(value) if value else value)
+                for code, value in elements
+            ]
+        else:
+            value_field = "value"
+            snapshot = self.get_thesaurus_version_snapshot(thesaurus_version, change_id)
+            if snapshot is not None:
+                return [snapshot.contains(code, value) for code, value in elements]
+
+        items = self.get_thesaurus_version_elements(thesaurus_version).order_by()
+
+        codes = {code for code, _ in elements if code}
+        value_by_code = {}
+        for chunk in self._chunked(codes):
+            value_by_code.update(
+                items.filter(code__in=chunk).values_list("code", value_field)
+            )
+
+        values = {value for code, value in elements if value and not code}
+        existing_values = set()
+        for chunk in self._chunked(values):
+            existing_values.update(
+                items.filter(**{f"{value_field}__in": chunk}).values_list(
+                    value_field, flat=True
+                )
+            )
+
+        result = []
+        for code, value in elements:
+            if code:
+                valid = code in value_by_code and (
+                    not value or value_by_code[code] == value
+                )
+            else:
+                valid = bool(value) and value in existing_values
+            result.append(valid)
+        return result
+
+    def search_elements_thesaurus_version(
+        self,
+        thesaurus_version: ThesaurusVersion,
+        query: str,
+        limit: int = SEARCH_LIMIT,
+    ) -> list[ThesaurusItem]:
+        """
+        Поиск элементов заданного справочника указанной версии по подстроке
+        значения (для автодополнения). Используется полнотекстовый индекс,
+        для коротких строк — поиск по началу значения.
+        """
+        self._validate_parameter_type(
+            thesaurus_version, "thesaurus_version", ThesaurusVersion
+        )
+        query = query.strip()
+        if not query:
+            return []
+
+        search_index = ThesaurusItemSearchIndex()
+        if search_index.supported and len(query) >= SEARCH_MIN_LENGTH:
+            return search_index.search(thesaurus_version.pk, query, limit)
+
+        items = self.get_thesaurus_version_elements(thesaurus_version)
+        return list(search_index.filter_queryset(items, query)[:limit])
+
+    def get_thesaurus_versions_diff(
+        self, from_version: ThesaurusVersion, to_version: ThesaurusVersion
+    ) -> ThesaurusVersionDiff:
+        """
+        Получение изменений элементов между двумя версиями одного справочника
+        (сопоставление по коду). Рассчитанные изменения сохраняются в базе.
+        """
+        self._validate_parameter_type(from_version, "from_version", ThesaurusVersion)
+        self._validate_parameter_type(to_version, "to_version", ThesaurusVersion)
+        if from_version.thesaurus_id != to_version.thesaurus_id:
+            raise ValueError("Versions belong to different thesauruses")
+
+        diff = ThesaurusVersionDiff.objects.filter(
+            from_version=from_version, to_version=to_version
+        ).first()
+        if diff is None:
+            diff = self._calculate_thesaurus_versions_diff(from_version, to_version)
+        return diff
+
+    def precalculate_thesaurus_versions_diffs(self, thesaurus: Thesaurus) -> int:
+        """
+        Расчет изменений между всеми последовательными версиями справочника
+        """
+        versions = list(thesaurus.versions.order_by("start_date"))
+        existing = set(
+            ThesaurusVersionDiff.objects.filter(
+                from_version__thesaurus=thesaurus
+            ).values_list("from_version", "to_version")
+        )
+        count = 0
+        for from_version, to_version in zip(versions, versions[1:]):
+            if (from_version.pk, to_version.pk) not in existing:
+                self._calculate_thesaurus_versions_diff(from_version, to_version)
+                count += 1
+        return count
+
+    def _calculate_thesaurus_versions_diff(
+        self, from_version: ThesaurusVersion, to_version: ThesaurusVersion
+    ) -> ThesaurusVersionDiff:
+        def load(version):
+            items = self.get_thesaurus_version_elements(version).order_by()
+            return {
+                code: (pk, value)
+                for pk, code, value in items.values_list("id", "code", "value")
+            }
+
+        old_items = load(from_version)
+        new_items = load(to_version)
+        old_codes = old_items.keys()
+        new_codes = new_items.keys()
+
+        def as_items(items, codes):
+            return [
+                {"id": items[code][0], "code": code, "value": items[code][1]}
+                for code in sorted(codes)
+            ]
+
+        diff, _ = ThesaurusVersionDiff.objects.update_or_create(
+            from_version=from_version,
+            to_version=to_version,
+            defaults={
+                "added": as_items(new_items, new_codes - old_codes),
+                "removed": as_items(old_items, old_codes - new_codes),
+                "changed": [
+                    {
+                        "id": new_items[code][0],
+                        "code": code,
+                        "old_value": old_items[code][1],
+                        "value": new_items[code][1],
+                    }
+                    for code in sorted(old_codes & new_codes)
+                    if old_items[code][1] != new_items[code][1]
+                ],
+            },
+        )
+        return diff
+
+    def get_changes(
+        self, since: int, limit: int = CHANGES_LIMIT
+    ) -> tuple[list[tuple[ChangeLog, object]], bool]:
+        """
+        Изменения после токена since, сжатые до последнего изменения каждого
+        объекта, вместе с текущим состоянием сохраненных объектов (None для
+        удаленных). Второй элемент результата — признак следующей страницы.
+        Стоимость зависит от количества изменений, а не от объема справочников.
+        """
+        last_ids = list(
+            ChangeLog.objects.filter(pk__gt=since)
+            .values("object_type", "object_id")
+            .annotate(last_id=Max("pk"))
+            .order_by("last_id")
+            .values_list("last_id", flat=True)[: limit + 1]
+        )
+        has_more = len(last_ids) > limit
+        entries = list(ChangeLog.objects.filter(pk__in=last_ids[:limit]).order_by("pk"))
+
+        querysets = {
+            ChangeLog.THESAURUS: Thesaurus.objects.order_by(),
+            ChangeLog.VERSION: ThesaurusVersion.objects.order_by(),
+            ChangeLog.ITEM: ThesaurusItem.objects.order_by(),
+        }
+        saved_ids = defaultdict(list)
+        for entry in entries:
+            if entry.action == ChangeLog.SAVE and entry.object_type in querysets:
+                saved_ids[entry.object_type].append(entry.object_id)
+
+        objects = {}
+        for object_type, object_ids in saved_ids.items():
+            for chunk in self._chunked(object_ids):
+                for obj in querysets[object_type].filter(pk__in=chunk):
+                    objects[object_type, obj.pk] = obj
+
+        return [
+            (entry, objects.get((entry.object_type, entry.object_id)))
+            for entry in entries
+        ], has_more
+
+    def get_changes_token(self) -> int:
+        """
+        Текущий токен журнала изменений (для начала синхронизации)
+        """
+        return ChangeLog.objects.aggregate(token=Max("pk"))["token"] or 0
+
+    def get_revision(self) -> Revision:
+        """
+        Получение текущей ревизии данных справочников (номер ревизии
+        увеличивается при любом изменении справочников, версий и элементов)
+        """
+        return Revision.objects.current()
+
+    async def aget_revision(self) -> Revision:
+        """
+        Асинхронное получение текущей ревизии данных справочников
+        """
+        return await Revision.objects.acurrent()
+
+    async def aget_thesaurus_current_version(
+        self, thesaurus: Thesaurus
+    ) -> ThesaurusVersion:
+        """
+        Асинхронное получение текущей версии заданного справочника
+        """
+        return await self._aget_thesaurus_current_version(thesaurus)
+
+    async def aget_thesaurus_version_by_key(
+        self, thesaurus_key: str, version_key: str = None, actual_to: date = None
+    ) -> ThesaurusVersion:
+        """
+        Асинхронное получение версии справочника вместе со справочником
+        """
+        thesaurus_id = self._get_cached_thesaurus_id(thesaurus_key, version_key)
+        if thesaurus_id is not None:
+            thesaurus_version = thesaurus_version_cache.get(
+                thesaurus_id, actual_to or date.today()
             )
-        raise AttributeError("None of the parameters specified (code and value)")
+            if thesaurus_version is not None:
+                return thesaurus_version
+
+        queryset, lookup = self._get_thesaurus_version_by_key_lookup(
+            thesaurus_key, version_key, actual_to
+        )
+        try:
+            thesaurus_version = await queryset.aget(**lookup)
+        except ThesaurusVersion.DoesNotExist:
+            raise Http404(
+                f"No {ThesaurusVersion._meta.object_name} matches the given query."
+            )
+
+        if version_key is None and actual_to is None:
+            thesaurus_version_cache.set(
+                thesaurus_version.thesaurus_id,
+                thesaurus_version,
+                thesaurus_version.end_date,
+            )
+        return thesaurus_version
+
+    async def aget_thesaurus_version_snapshot(
+        self, thesaurus_version: ThesaurusVersion, change_id: int = None
+    ) -> ThesaurusVersionSnapshot | None:
+        """
+        Асинхронное получение снимка элементов заданного справочника указанной
+        версии
+        """
+        if thesaurus_version_snapshot_cache.is_oversized(thesaurus_version.pk):
+            return None
+        if change_id is None:
+            change_id = await ChangeLog.objects.alast_version_change_id(
+                thesaurus_version.pk
+            )
+        return await thesaurus_version_snapshot_cache.aget(
+            thesaurus_version,
+            self.get_thesaurus_version_elements(thesaurus_version),
+            change_id,
+        )
+
+    async def aget_thesaurus_version_bloom_filter(
+        self, thesaurus_version: ThesaurusVersion, change_id: int = None
+    ) -> BloomFilter:
+        """
+        Асинхронное получение фильтра Блума версии справочника
+        """
+        if change_id is None:
+            change_id = await ChangeLog.objects.alast_version_change_id(
+                thesaurus_version.pk
+            )
+        bloom_filter, _ = bloom_filter_cache.get(thesaurus_version.pk, change_id)
+        if bloom_filter is not None:
+            return bloom_filter
+
+        return await sync_to_async(self.get_thesaurus_version_bloom_filter)(
+            thesaurus_version, change_id
+        )
+
+    async def avalidate_elements_thesaurus_current_version(
+        self,
+        thesaurus: Thesaurus,
+        code: str = None,
+        value: str = None,
+        normalized: bool = False,
+    ):
+        """
+        Асинхронная валидация элементов заданного справочника текущей версии
+        """
+        thesaurus_current_version = await self._aget_thesaurus_current_version(
+            thesaurus
+        )
+        return await self.avalidate_elements_thesaurus_version(
+            thesaurus_current_version, code, value, normalized
+        )
+
+    async def avalidate_elements_thesaurus_version(
+        self,
+        thesaurus_version: ThesaurusVersion,
+        code: str = None,
+        value: str = None,
+        normalized: bool = False,
+    ):
+        """
+        Асинхронная валидация элемента заданного справочника по указанной версии
+        """
+        self._validate_element_parameters(thesaurus_version, code, value)
+
+        if normalized:
+            return await sync_to_async(self.validate_elements_thesaurus_version)(
+                thesaurus_version, code, value, normalized
+            )
+
+        change_id = await ChangeLog.objects.alast_version_change_id(
+            thesaurus_version.pk
+        )
+        snapshot = thesaurus_version_snapshot_cache.peek(
+            thesaurus_version.pk, change_id
+        )
+        if snapshot is None:
+            bloom_filter = await self.aget_thesaurus_version_bloom_filter(
+                thesaurus_version, change_id
+            )
+            if not bloom_filter.may_contain(code, value):
+                raise Http404(
+                    f"No {ThesaurusItem._meta.object_name} matches the given query."
+                )
+            snapshot = await self.aget_thesaurus_version_snapshot(
+                thesaurus_version, change_id
+            )
+
+        if snapshot is not None:
+            return self._validate_elements_snapshot(snapshot, code, value)
+
+        return await sync_to_async(self.validate_elements_thesaurus_version)(
+            thesaurus_version, code, value
+        )
+
+    async def avalidate_elements_thesaurus_current_version_bulk(
+        self,
+        thesaurus: Thesaurus,
+        elements: list[tuple[str | None, str | None]],
+        normalized: bool = False,
+    ) -> list[bool]:
+        """
+        Асинхронная пакетная валидация элементов заданного справочника текущей
+        версии
+        """
+        thesaurus_current_version = await self._aget_thesaurus_current_version(
+            thesaurus
+        )
+        return await self.avalidate_elements_thesaurus_version_bulk(
+            thesaurus_current_version, elements, normalized
+        )
+
+    async def avalidate_elements_thesaurus_version_bulk(
+        self,
+        thesaurus_version: ThesaurusVersion,
+        elements: list[tuple[str | None, str | None]],
+        normalized: bool = False,
+    ) -> list[bool]:
+        """
+        Асинхронная пакетная валидация элементов заданного справочника по
+        указанной версии
+        """
+        self._validate_parameter_type(
+            thesaurus_version, "thesaurus_version", ThesaurusVersion
+        )
+        if normalized:
+            return await sync_to_async(self.validate_elements_thesaurus_version_bulk)(
+                thesaurus_version, elements, normalized
+            )
+
+        change_id = await ChangeLog.objects.alast_version_change_id(
+            thesaurus_version.pk
+        )
+        snapshot = thesaurus_version_snapshot_cache.peek(
+            thesaurus_version.pk, change_id
+        )
+        if snapshot is not None:
+            return [snapshot.contains(code, value) for code, value in elements]
+
+        bloom_filter = await self.aget_thesaurus_version_bloom_filter(
+            thesaurus_version, change_id
+        )
+        result = [bloom_filter.may_contain(code, value) for code, value in elements]
+        candidates = [
+            element for element, possible in zip(elements, result) if possible
+        ]
+        if not candidates:
+            return result
+
+        snapshot = await self.aget_thesaurus_version_snapshot(
+            thesaurus_version, change_id
+        )
+        if snapshot is not None:
+            found = [snapshot.contains(code, value) for code, value in candidates]
+        else:
+            found = await sync_to_async(self._validate_elements_thesaurus_version_bulk)(
+                thesaurus_version, candidates, change_id=change_id
+            )
+
+        found = iter(found)
+        return [possible and next(found) for possible in result]
+
+    def _build_thesaurus_version_bloom_filter(
+        self, thesaurus_version: ThesaurusVersion, change_id: int
+    ) -> BloomFilter:
+        # Отметка change_id прочитана до элементов: изменение, сделанное
+        # во время построения, сделает фильтр неактуальным
+        items = self.get_thesaurus_version_elements(thesaurus_version).order_by()
+        bloom_filter = BloomFilter.for_elements(
+            items.values_list("code", "value").iterator(),
+            items.count(),
+            getattr(
+                settings, "VOCABULARY_BLOOM_FILTER_ERROR_RATE", BLOOM_FILTER_ERROR_RATE
+            ),
+        )
+        ThesaurusVersionBloomFilter.objects.update_or_create(
+            thesaurus_version=thesaurus_version,
+            defaults={"data": bloom_filter.to_bytes(), "change_id": change_id},
+        )
+        return bloom_filter
 
     def _get_thesaurus_current_version(self, thesaurus: Thesaurus):
         """
@@ -83,23 +886,108 @@ class ThesaurusService:
         self._validate_parameter_type(thesaurus, "thesaurus", Thesaurus)
 
         today = date.today()
+        thesaurus_current_version = thesaurus_version_cache.get(thesaurus.pk, today)
+        if thesaurus_current_version is not None:
+            return thesaurus_current_version
+
         thesaurus_current_version = self._get_thesaurus_version_actual_to(today).get(
             thesaurus=thesaurus
         )
+        thesaurus_current_version.thesaurus = thesaurus
+        thesaurus_version_cache.set(
+            thesaurus.pk, thesaurus_current_version, thesaurus_current_version.end_date
+        )
         return thesaurus_current_version
 
+    async def _aget_thesaurus_current_version(self, thesaurus: Thesaurus):
+        """
+        Асинхронное получение справочника текущей версии
+        """
+        self._validate_parameter_type(thesaurus, "thesaurus", Thesaurus)
+
+        today = date.today()
+        thesaurus_current_version = thesaurus_version_cache.get(thesaurus.pk, today)
+        if thesaurus_current_version is not None:
+            return thesaurus_current_version
+
+        thesaurus_current_version = await self._get_thesaurus_version_actual_to(
+            today
+        ).aget(thesaurus=thesaurus)
+        thesaurus_current_version.thesaurus = thesaurus
+        thesaurus_version_cache.set(
+            thesaurus.pk, thesaurus_current_version, thesaurus_current_version.end_date
+        )
+        return thesaurus_current_version
+
+    def _get_cached_thesaurus_id(self, thesaurus_key, version_key) -> int | None:
+        """
+        Идентификатор справочника, текущая версия которого может быть взята из кэша
+        """
+        if version_key is None and str(thesaurus_key).isdigit():
+            return int(thesaurus_key)
+
+    def _get_thesaurus_version_by_key_lookup(
+        self, thesaurus_key, version_key, actual_to: date = None
+    ):
+        """
+        Запрос версии справочника по идентификаторам или slug
+        """
+        by_slug = not str(thesaurus_key).isdigit()
+        if by_slug:
+            lookup = {"thesaurus__slug": thesaurus_key}
+        else:
+            lookup = {"thesaurus_id": thesaurus_key}
+
+        if version_key is None:
+            queryset = self._get_thesaurus_version_actual_to(actual_to or date.today())
+        else:
+            queryset = ThesaurusVersion.objects.all()
+            if by_slug:
+                lookup["slug"] = version_key
+            elif str(version_key).isdigit():
+                lookup["pk"] = version_key
+            else:
+                raise Http404(
+                    f"No {ThesaurusVersion._meta.object_name} matches the given query."
+                )
+
+        return queryset.select_related("thesaurus"), lookup
+
     def _get_thesaurus_version_actual_to(self, actual_to: date):
         """
         Получение версий справочников, актуальных на указанную дату
         """
         self._validate_parameter_type(actual_to, "actual_to", date)
 
-        subquery = ThesaurusVersion.objects.filter(
-            thesaurus=OuterRef("thesaurus"), start_date__lte=actual_to
-        ).order_by("-start_date")
-        return ThesaurusVersion.objects.filter(
-            start_date=Subquery(subquery.values("start_date")[:1])
+        return ThesaurusVersion.objects.actual_to(actual_to)
+
+    def _validate_elements_snapshot(
+        self, snapshot: ThesaurusVersionSnapshot, code: str = None, value: str = None
+    ) -> list[ThesaurusItem]:
+        index = snapshot.find(code, value)
+        if index is None:
+            raise Http404(
+                f"No {ThesaurusItem._meta.object_name} matches the given query."
+            )
+        return [snapshot.get_item(index)]
+
+    def _chunked(self, values, size: int = VALIDATION_CHUNK_SIZE):
+        values = list(values)
+        for i in range(0, len(values), size):
+            yield values[i : i + size]
+
+    def _validate_element_parameters(
+        self, thesaurus_version: ThesaurusVersion, code: str, value: str
+    ):
+        """
+        Проверка параметров валидации элемента (общая для синхронной
+        и асинхронной валидации)
+        """
+        self._validate_parameter_type(
+            thesaurus_version, "thesaurus_version", ThesaurusVersion
         )
+        if not code and not value:
+            raise AttributeError("None of the parameters specified (code and value)")
 
     def _validate_parameter_type(self, parameter, parameter_name, expected_type):
         if type(parameter) is not expected_type:
@@ -0,0 +1,256 @@
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+
+from .models import (
+    Thesaurus,
+    ThesaurusVersion,
+    ThesaurusItem,
+    ThesaurusVersionDiff,
+    ThesaurusVersionBloomFilter,
+    Revision,
+    ChangeLog,
+)
+from .bloom import bloom_filter_cache
+from .response_cache import THESAURUS_SCOPE, response_cache, version_scope
+from .service import ThesaurusService, thesaurus_version_cache
+from .snapshot import thesaurus_version_snapshot_cache
+
+# Отправляется после пакетной загрузки элементов версии (bulk_create
+# не отправляет post_save), аргумент: thesaurus_version
+thesaurus_version_items_loaded = Signal()
+
+
+def deleted_with_version(sender, origin) -> bool:
+    """
+    Элемент удален каскадно вместе с версией или справочником: изменение
+    записывается и обрабатывается один раз обработчиками удаления версии
+    """
+    return sender is ThesaurusItem and isinstance(origin, (Thesaurus, ThesaurusVersion))
+
+
+@receiver(post_save, sender=ThesaurusVersion)
+@receiver(post_delete, sender=ThesaurusVersion)
+def update_thesaurus_version_intervals(sender, instance, **kwargs):
+    """
+    Пересчет интервалов действия версий справочника
+    """
+    ThesaurusVersion.objects.update_intervals(instance.thesaurus_id)
+
+
+@receiver(post_save, sender=ThesaurusVersion)
+@receiver(post_delete, sender=ThesaurusVersion)
+def invalidate_thesaurus_version_cache(sender, instance, **kwargs):
+    """
+    Сброс кэша актуальных версий при изменении версий справочника
+    """
+    thesaurus_version_cache.invalidate(instance.thesaurus_id)
+
+
+@receiver(post_save, sender=Thesaurus)
+@receiver(post_delete, sender=Thesaurus)
+def invalidate_thesaurus_cache(sender, instance, **kwargs):
+    """
+    Сброс кэша актуальных версий при изменении справочника
+    (версии в кэше хранятся вместе со справочником)
+    """
+    thesaurus_version_cache.invalidate(instance.pk)
+
+
+@receiver(post_delete, sender=ThesaurusVersion)
+def invalidate_thesaurus_version_snapshot(sender, instance, **kwargs):
+    """
+    Сброс снимка удаленной версии справочника
+    """
+    thesaurus_version_snapshot_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=ThesaurusItem)
+@receiver(post_delete, sender=ThesaurusItem)
+def invalidate_thesaurus_item_snapshot(sender, instance, **kwargs):
+    """
+    Сброс снимка версии при изменении ее элементов
+    """
+    if deleted_with_version(sender, kwargs.get("origin")):
+        return
+    thesaurus_version_snapshot_cache.invalidate(instance.thesaurus_version_id)
+
+
+@receiver(thesaurus_version_items_loaded)
+def invalidate_loaded_version_snapshot(sender, thesaurus_version, **kwargs):
+    """
+    Сброс снимка версии после пакетной загрузки элементов
+    """
+    thesaurus_version_snapshot_cache.invalidate(thesaurus_version.pk)
+
+
+@receiver(post_save, sender=Thesaurus)
+@receiver(post_delete, sender=Thesaurus)
+@receiver(post_save, sender=ThesaurusVersion)
+@receiver(post_delete, sender=ThesaurusVersion)
+def invalidate_thesaurus_responses(sender, instance, **kwargs):
+    """
+    Сброс кэшированных ответов списка справочников
+    """
+    response_cache.invalidate(THESAURUS_SCOPE)
+
+
+@receiver(post_save, sender=ThesaurusVersion)
+@receiver(post_delete, sender=ThesaurusVersion)
+def invalidate_thesaurus_version_responses(sender, instance, **kwargs):
+    """
+    Сброс кэшированных ответов элементов версии при изменении версии
+    """
+    response_cache.invalidate(version_scope(instance.pk))
+
+
+@receiver(post_save, sender=ThesaurusItem)
+@receiver(post_delete, sender=ThesaurusItem)
+def invalidate_thesaurus_item_responses(sender, instance, **kwargs):
+    """
+    Сброс кэшированных ответов элементов версии при изменении ее элементов
+    """
+    if deleted_with_version(sender, kwargs.get("origin")):
+        return
+    response_cache.invalidate(version_scope(instance.thesaurus_version_id))
+
+
+@receiver(thesaurus_version_items_loaded)
+def invalidate_loaded_version_responses(sender, thesaurus_version, **kwargs):
+    """
+    Сброс кэшированных ответов элементов версии после пакетной загрузки
+    """
+    response_cache.invalidate(version_scope(thesaurus_version.pk))
+
+
+@receiver(post_save, sender=Thesaurus)
+@receiver(post_delete, sender=Thesaurus)
+@receiver(post_save, sender=ThesaurusVersion)
+@receiver(post_delete, sender=ThesaurusVersion)
+@receiver(post_save, sender=ThesaurusItem)
+@receiver(post_delete, sender=ThesaurusItem)
+def bump_revision(sender, instance, **kwargs):
+    """
+    Увеличение номера ревизии данных при любом изменении справочников
+    """
+    if deleted_with_version(sender, kwargs.get("origin")):
+        return
+    Revision.objects.bump()
+
+
+@receiver(thesaurus_version_items_loaded)
+def bump_revision_on_items_loaded(sender, thesaurus_version, **kwargs):
+    """
+    Увеличение номера ревизии данных после пакетной загрузки элементов
+    """
+    Revision.objects.bump()
+
+
+@receiver(post_save, sender=ThesaurusItem)
+@receiver(post_delete, sender=ThesaurusItem)
+def delete_thesaurus_item_version_diffs(sender, instance, **kwargs):
+    """
+    Удаление рассчитанных изменений версии при изменении ее элементов
+    """
+    if deleted_with_version(sender, kwargs.get("origin")):
+        return
+    version_id = instance.thesaurus_version_id
+    ThesaurusVersionDiff.objects.filter(
+        Q(from_version_id=version_id) | Q(to_version_id=version_id)
+    ).delete()
+
+
+@receiver(thesaurus_version_items_loaded)
+def precalculate_loaded_version_diffs(sender, thesaurus_version, **kwargs):
+    """
+    Пересчет изменений между последовательными версиями справочника
+    после пакетной загрузки элементов
+    """
+    ThesaurusVersionDiff.objects.filter(
+        Q(from_version=thesaurus_version) | Q(to_version=thesaurus_version)
+    ).delete()
+    ThesaurusService().precalculate_thesaurus_versions_diffs(
+        thesaurus_version.thesaurus
+    )
+
+
+@receiver(post_delete, sender=ThesaurusVersion)
+def invalidate_thesaurus_version_bloom_filter(sender, instance, **kwargs):
+    """
+    Сброс фильтра Блума удаленной версии справочника
+    """
+    bloom_filter_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=ThesaurusItem)
+@receiver(post_delete, sender=ThesaurusItem)
+def delete_thesaurus_item_bloom_filter(sender, instance, **kwargs):
+    """
+    Удаление фильтра Блума версии при изменении ее элементов
+    (фильтр будет построен заново при следующей валидации)
+    """
+    if deleted_with_version(sender, kwargs.get("origin")):
+        return
+    version_id = instance.thesaurus_version_id
+    ThesaurusVersionBloomFilter.objects.filter(thesaurus_version_id=version_id).delete()
+    bloom_filter_cache.invalidate(version_id)
+
+
+@receiver(post_save, sender=Thesaurus)
+@receiver(post_save, sender=ThesaurusVersion)
+@receiver(post_save, sender=ThesaurusItem)
+def record_saved_change(sender, instance, **kwargs):
+    """
+    Запись сохранения справочника, версии или элемента в журнал изменений
+    """
+    ChangeLog.objects.record(instance, ChangeLog.SAVE)
+
+
+@receiver(post_delete, sender=Thesaurus)
+@receiver(post_delete, sender=ThesaurusVersion)
+@receiver(post_delete, sender=ThesaurusItem)
+def record_deleted_change(sender, instance, **kwargs):
+    """
+    Запись удаления справочника, версии или элемента в журнал изменений
+    (для элементов, удаленных вместе с версией, записывается только
+    удаление версии)
+    """
+    if deleted_with_version(sender, kwargs.get("origin")):
+        return
+    ChangeLog.objects.record(instance, ChangeLog.DELETE)
+
+
+@receiver(thesaurus_version_items_loaded)
+def record_items_loaded_change(sender, thesaurus_version, **kwargs):
+    """
+    Запись пакетной загрузки элементов версии в журнал изменений
+    """
+    ChangeLog.objects.record_items_loaded(thesaurus_version)
+
+
+@receiver(thesaurus_version_items_loaded)
+def build_loaded_version_bloom_filter(sender, thesaurus_version, **kwargs):
+    """
+    Построение фильтра Блума версии после пакетной загрузки элементов
+    (после записи загрузки в журнал: фильтр строится с ее отметкой)
+    """
+    bloom_filter_cache.invalidate(thesaurus_version.pk)
+    ThesaurusService().build_thesaurus_version_bloom_filter(thesaurus_version)
+
+
+@receiver(post_delete, sender=ThesaurusVersion)
+def notify_transferred_items(sender, instance, **kwargs):
+    """
+    Версии, к которым при удалении версии перешли общие элементы
+    (transfer_shared_items), обрабатываются как после пакетной загрузки:
+    запись в журнал изменений, ревизия данных и сброс кэшей
+    """
+    version_ids = getattr(instance, "items_transferred_to", None)
+    if not version_ids:
+        return
+    for thesaurus_version in ThesaurusVersion.objects.filter(
+        pk__in=version_ids
+    ).select_related("thesaurus"):
+        thesaurus_version_items_loaded.send(
+            sender=ThesaurusVersion, thesaurus_version=thesaurus_version
+        )
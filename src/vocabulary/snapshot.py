@@ -0,0 +1,316 @@
+from array import array
+from collections import OrderedDict
+from collections.abc import Sequence
+from sys import intern
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.db.models import QuerySet
+
+from .models import ThesaurusVersion, ThesaurusItem
+
+
+class ThesaurusVersionSnapshot:
+    """
+    Неизменяемый снимок элементов версии справочника.
+
+    Элементы хранятся в параллельных массивах (идентификаторы, коды, значения)
+    в порядке сортировки модели, поиск по коду и значению выполняется
+    по хеш-индексам без обращения к базе данных. change_id — последнее
+    изменение версии (ChangeLog), по которому построен снимок.
+    """
+
+    __slots__ = (
+        "thesaurus_version_id",
+        "change_id",
+        "created_at",
+        "_ids",
+        "_codes",
+        "_values",
+        "_by_code",
+        "_by_value",
+    )
+
+    def __init__(self, thesaurus_version_id: int, rows, change_id: int = 0):
+        ids = array("q")
+        codes = []
+        values = []
+        for pk, code, value in rows:
+            ids.append(pk)
+            # Строки элементов, общих для нескольких версий, хранятся
+            # в памяти один раз для всех снимков
+            codes.append(intern(code))
+            values.append(intern(value))
+
+        attrs = {
+            "thesaurus_version_id": thesaurus_version_id,
+            "change_id": change_id,
+            "created_at": monotonic(),
+            "_ids": ids,
+            "_codes": tuple(codes),
+            "_values": tuple(values),
+            "_by_code": {code: i for i, code in enumerate(codes)},
+            "_by_value": {value: i for i, value in enumerate(values)},
+        }
+        for name, attr in attrs.items():
+            object.__setattr__(self, name, attr)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Snapshot is immutable")
+
+    def find(self, code: str = None, value: str = None) -> int | None:
+        """
+        Поиск позиции элемента по коду и (или) значению
+        """
+        if code:
+            index = self._by_code.get(code)
+            if index is not None and value and self._values[index] != value:
+                return None
+            return index
+        if value:
+            return self._by_value.get(value)
+
+    def contains(self, code: str = None, value: str = None) -> bool:
+        return self.find(code, value) is not None
+
+    def get_item(self, index: int) -> ThesaurusItem:
+        return ThesaurusItem(
+            id=self._ids[index],
+            thesaurus_version_id=self.thesaurus_version_id,
+            code=self._codes[index],
+            value=self._values[index],
+        )
+
+    def get_values(self, index: int) -> dict:
+        return {
+            "id": self._ids[index],
+            "code": self._codes[index],
+            "value": self._values[index],
+        }
+
+    @property
+    def items(self) -> "ThesaurusVersionSnapshotItems":
+        return ThesaurusVersionSnapshotItems(self)
+
+    @property
+    def values(self) -> "ThesaurusVersionSnapshotValues":
+        return ThesaurusVersionSnapshotValues(self)
+
+
+class ThesaurusVersionSnapshotItems(Sequence):
+    """
+    Представление снимка в виде последовательности элементов справочника.
+    Экземпляры модели создаются только для запрошенного среза.
+    """
+
+    __slots__ = ("_snapshot",)
+
+    def __init__(self, snapshot: ThesaurusVersionSnapshot):
+        self._snapshot = snapshot
+
+    @property
+    def snapshot(self) -> ThesaurusVersionSnapshot:
+        return self._snapshot
+
+    def __len__(self):
+        return len(self._snapshot)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(len(self._snapshot)))]
+        if index < 0:
+            index += len(self._snapshot)
+        if not 0 <= index < len(self._snapshot):
+            raise IndexError("Snapshot index out of range")
+        return self._get(index)
+
+    def _get(self, index: int):
+        return self._snapshot.get_item(index)
+
+
+class ThesaurusVersionSnapshotValues(ThesaurusVersionSnapshotItems):
+    """
+    Представление снимка в виде последовательности словарей (id, code, value)
+    без создания экземпляров модели
+    """
+
+    __slots__ = ()
+
+    def _get(self, index: int) -> dict:
+        return self._snapshot.get_values(index)
+
+
+class ThesaurusVersionSnapshotCache:
+    """
+    LRU-кэш снимков версий, ограниченный суммарным количеством элементов.
+    Снимок используется только при совпадении его отметки последнего
+    изменения версии (ChangeLog) с текущей, поэтому изменения, сделанные
+    в других процессах, видны сразу. Кроме того, снимок перестраивается
+    при изменении элементов версии и по истечении времени жизни.
+    """
+
+    def __init__(self, max_items: int = None, ttl: float = None):
+        self._lock = Lock()
+        self._snapshots = OrderedDict()
+        self._oversized = set()
+        self._max_items = max_items
+        self._ttl = ttl
+        self._generation = 0
+        self.total_items = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_items(self) -> int:
+        if self._max_items is not None:
+            return self._max_items
+        return getattr(settings, "VOCABULARY_SNAPSHOT_MAX_ITEMS", 1_000_000)
+
+    @property
+    def ttl(self) -> float | None:
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, "VOCABULARY_SNAPSHOT_TTL", None)
+
+    def get(
+        self, thesaurus_version: ThesaurusVersion, items: QuerySet, change_id: int
+    ) -> ThesaurusVersionSnapshot | None:
+        """
+        Получение снимка версии, построенного по изменению change_id; при
+        отсутствии снимок строится по items. Для версий, не помещающихся
+        в кэш целиком, возвращается None.
+        """
+        snapshot, generation = self._lookup(thesaurus_version.pk, change_id)
+        if generation is None:
+            return snapshot
+
+        items = items.order_by("value")
+        if items.count() > self.max_items:
+            self._put_oversized(thesaurus_version.pk, generation)
+            return None
+
+        rows = items.values_list("id", "code", "value")
+        snapshot = ThesaurusVersionSnapshot(
+            thesaurus_version.pk, rows.iterator(), change_id
+        )
+        self._put(snapshot, generation)
+        return snapshot
+
+    async def aget(
+        self, thesaurus_version: ThesaurusVersion, items: QuerySet, change_id: int
+    ) -> ThesaurusVersionSnapshot | None:
+        """
+        Асинхронное получение снимка версии
+        """
+        snapshot, generation = self._lookup(thesaurus_version.pk, change_id)
+        if generation is None:
+            return snapshot
+
+        items = items.order_by("value")
+        if await items.acount() > self.max_items:
+            self._put_oversized(thesaurus_version.pk, generation)
+            return None
+
+        rows = [row async for row in items.values_list("id", "code", "value")]
+        snapshot = ThesaurusVersionSnapshot(thesaurus_version.pk, rows, change_id)
+        self._put(snapshot, generation)
+        return snapshot
+
+    def peek(
+        self, thesaurus_version_id: int, change_id: int
+    ) -> ThesaurusVersionSnapshot | None:
+        """
+        Снимок версии, если он уже загружен и построен по изменению change_id
+        (без обращения к базе)
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(thesaurus_version_id)
+            if snapshot is None or not self._is_current(snapshot, change_id):
+                return None
+            self._snapshots.move_to_end(thesaurus_version_id)
+            self.hits += 1
+            return snapshot
+
+    def is_oversized(self, thesaurus_version_id: int) -> bool:
+        """
+        Версия не помещается в кэш целиком (снимок не строится)
+        """
+        with self._lock:
+            return thesaurus_version_id in self._oversized
+
+    def invalidate(self, thesaurus_version_id: int):
+        with self._lock:
+            self._generation += 1
+            self._oversized.discard(thesaurus_version_id)
+            snapshot = self._snapshots.pop(thesaurus_version_id, None)
+            if snapshot is not None:
+                self.total_items -= len(snapshot)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._oversized.clear()
+            self._snapshots.clear()
+            self.total_items = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._snapshots),
+                "items": self.total_items,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _lookup(self, thesaurus_version_id: int, change_id: int):
+        """
+        Поиск снимка в кэше. Возвращает снимок (или None для версий больше
+        лимита) и None либо, если снимок нужно построить, None и номер поколения.
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(thesaurus_version_id)
+            if snapshot is not None and self._is_current(snapshot, change_id):
+                self._snapshots.move_to_end(thesaurus_version_id)
+                self.hits += 1
+                return snapshot, None
+            if thesaurus_version_id in self._oversized:
+                return None, None
+            self.misses += 1
+            return None, self._generation
+
+    def _put_oversized(self, thesaurus_version_id: int, generation: int):
+        with self._lock:
+            if generation == self._generation:
+                self._oversized.add(thesaurus_version_id)
+
+    def _put(self, snapshot: ThesaurusVersionSnapshot, generation: int):
+        with self._lock:
+            if generation != self._generation:
+                # Версия изменилась во время построения снимка
+                return
+
+            previous = self._snapshots.pop(snapshot.thesaurus_version_id, None)
+            if previous is not None:
+                self.total_items -= len(previous)
+
+            self._snapshots[snapshot.thesaurus_version_id] = snapshot
+            self.total_items += len(snapshot)
+
+            while self.total_items > self.max_items:
+                _, evicted = self._snapshots.popitem(last=False)
+                self.total_items -= len(evicted)
+
+    def _is_current(self, snapshot: ThesaurusVersionSnapshot, change_id: int) -> bool:
+        ttl = self.ttl
+        return snapshot.change_id == change_id and (
+            ttl is None or monotonic() - snapshot.created_at <= ttl
+        )
+
+
+thesaurus_version_snapshot_cache = ThesaurusVersionSnapshotCache()
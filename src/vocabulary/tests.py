@@ -1,12 +1,62 @@
-from datetime import date
+from contextvars import copy_context
+from dataclasses import replace
+from datetime import date, timedelta
+from io import StringIO
+from tempfile import NamedTemporaryFile
+from time import sleep
+import asyncio
+import gzip
 import json
+import os
 
-from django.urls import reverse
-from django.test import TestCase
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from config.asgi import application
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, transaction
+from django.http import Http404, HttpResponse
+from django.urls import NoReverseMatch, reverse
+from django.test.utils import CaptureQueriesContext
+from django.test import (
+    AsyncRequestFactory,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
 from rest_framework import status
 
-from .models import Thesaurus, ThesaurusVersion, ThesaurusItem
-from .service import ThesaurusService
+from .async_views import ThesaurusItemListAsyncView, ThesaurusItemValidateAsyncView
+from .bloom import BloomFilter, bloom_filter_cache
+from .events import VersionEventBroker, version_event_broker
+from .db_router import (
+    PRIMARY_COOKIE,
+    ReplicaRouter,
+    is_primary_pinned,
+    ReplicaStickinessMiddleware,
+    replica_health,
+)
+from .benchmark import BenchmarkRunner, SyntheticDataGenerator, compare_with_baseline
+from .instrumentation import ServerTimingMiddleware, metrics_view, route_metrics
+from .models import (
+    ChangeLog,
+    Revision,
+    Thesaurus,
+    ThesaurusVersion,
+    ThesaurusItem,
+    ThesaurusVersionDiff,
+    ThesaurusVersionBloomFilter,
+    ThesaurusVersionItem,
+    normalize_value,
+)
+from .importer import ThesaurusVersionImporter
+from .serializers import thesaurus_version_data
+from .views import ThesaurusItemAPIView
+from .service import ThesaurusService, thesaurus_version_cache
+from .snapshot import ThesaurusVersionSnapshotCache, thesaurus_version_snapshot_cache
 
 
 class ThesaurusTestCase(TestCase):
@@ -174,6 +224,91 @@ class ThesaurusItemAPIViewTests(ThesaurusTestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data["results"]), 3)
 
+    def test_get_thesaurus_version_elements_cursor_pagination(self):
+        """
+        Получение элементов заданного справочника указанной версии
+        с постраничным выводом по ключу
+        """
+        url = reverse(
+            "thesaurus-version-item-list",
+            kwargs={"thesaurus": 1, "version": 3},
+        )
+        response = self.client.get(url, {"pagination": "cursor", "page_size": 3})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", response.data)
+        self.assertEqual(
+            [item["code"] for item in response.data["results"]], ["123", "124", "125"]
+        )
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["code"] for item in response.data["results"]], ["126"])
+        self.assertIsNone(response.data["next"])
+
+    def test_get_thesaurus_version_elements_by_slug(self):
+        """
+        Получение элементов заданного справочника по slug справочника и версии
+        """
+        url = reverse(
+            "thesaurus-version-item-list",
+            kwargs={"thesaurus": "ias-smo", "version": "101"},
+        )
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 3)
+
+        url = reverse("thesaurus-item-list", kwargs={"thesaurus": "ias-smo"})
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 2)
+
+        for kwargs in (
+            {"thesaurus": "ias-smo", "version": "2"},
+            {"thesaurus": "1", "version": "ias-smo"},
+            {"thesaurus": "1", "version": "101"},
+            {"thesaurus": "remd-ppd", "version": "101"},
+        ):
+            url = reverse("thesaurus-version-item-list", kwargs=kwargs)
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, kwargs)
+
+        url = reverse("thesaurus-item-list", kwargs={"thesaurus": "svyaz-is-mo"})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(VOCABULARY_RESPONSE_CACHE=None)
+    def test_get_thesaurus_version_elements_num_queries(self):
+        """
+        Получение элементов заданного справочника указанной версии: справочник
+        и версия определяются одним запросом, количество элементов — вместе
+        со страницей элементов
+        """
+        url = reverse(
+            "thesaurus-version-item-list",
+            kwargs={"thesaurus": 1, "version": 3},
+        )
+        self.client.get(url)
+
+        # Ревизия данных, версия со справочником и отметка последнего
+        # изменения версии, элементы — из снимка
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.json()["count"], 4)
+
+        with override_settings(VOCABULARY_SNAPSHOT_MAX_ITEMS=1):
+            thesaurus_version_snapshot_cache.clear()
+            self.client.get(url)
+
+            with self.assertNumQueries(3):
+                response = self.client.get(url, {"limit": 2, "offset": 2})
+        self.assertEqual(response.json()["count"], 4)
+        self.assertEqual(
+            [item["code"] for item in response.json()["results"]], ["125", "126"]
+        )
+
     def test_get_thesaurus_version_elements_wrong_version(self):
         """
         Получение элементов заданного справочника указанной версии: не существующая версия
@@ -201,76 +336,1922 @@ class ThesaurusItemAPIViewTests(ThesaurusTestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK, response.json())
         self.assertEqual(len(response.data["results"]), 1)
 
+    def test_bulk_validate_elements_thesaurus_version(self):
+        """
+        Пакетная валидация элементов заданного справочника по указанной версии
+        """
+        url = reverse(
+            "thesaurus-version-item-validate",
+            kwargs={"thesaurus": 1, "version": 3},
+        )
+        items = [
+            {"code": "125", "value": "Элемент 125"},
+            {"code": "125", "value": "Элемент 124"},
+            {"code": "999"},
+            {"value": "Элемент 126"},
+        ]
+        response = self.client.post(url, {"items": items}, "application/json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.json())
+        self.assertEqual(
+            [item["valid"] for item in response.data["results"]],
+            [True, False, False, True],
+        )
 
-class ThesaurusServiceTests(ThesaurusTestCase):
+    def test_bulk_validate_elements_thesaurus_current_version(self):
+        """
+        Пакетная валидация элементов заданного справочника текущей версии
+        """
+        url = reverse("thesaurus-item-validate", kwargs={"thesaurus": 1})
+        items = [{"code": "125"}, {"code": "123", "value": "Элемент 123"}]
+        response = self.client.post(url, {"items": items}, "application/json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.json())
+        self.assertEqual(
+            response.data["results"],
+            [
+                {"code": "125", "valid": False},
+                {"code": "123", "value": "Элемент 123", "valid": True},
+            ],
+        )
+
+    def test_bulk_validate_elements_without_parameters(self):
+        """
+        Пакетная валидация элементов: элемент без кода и значения
+        """
+        url = reverse("thesaurus-item-validate", kwargs={"thesaurus": 1})
+        response = self.client.post(url, {"items": [{}]}, "application/json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ThesaurusItemSearchTests(ThesaurusTestCase):
     thesaurus_service = ThesaurusService()
 
-    def test_get_thesaurus_list(self):
+    def test_search_thesaurus_version_elements(self):
         """
-        Получение списка справочников.
+        Поиск элементов заданного справочника указанной версии по подстроке
         """
-        thesaurus_list = self.thesaurus_service.get_thesaurus_list()
-        self.assertEqual(len(thesaurus_list), 4)
-        self.assertEqual(len(thesaurus_list[0].versions.all()), 3)
-        self.assertEqual(len(thesaurus_list[1].versions.all()), 2)
-        self.assertEqual(len(thesaurus_list[2].versions.all()), 1)
-        self.assertEqual(len(thesaurus_list[3].versions.all()), 0)
+        url = reverse(
+            "thesaurus-version-item-search", kwargs={"thesaurus": 2, "version": 4}
+        )
+        response = self.client.get(url, {"q": "вило 2"})
 
-    def test_get_thesaurus_list_actual_to(self):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["results"], [{"id": 11, "code": "789", "value": "Правило 2"}]
+        )
+
+    def test_search_prefix_ranked_first(self):
         """
-        Получение списка справочников, актуальных на указанную дату
+        Элементы, значение которых начинается с искомой строки, идут первыми
         """
-        actual_to = date.today()
-        thesaurus_list = self.thesaurus_service.get_thesaurus_list_actual_to(actual_to)
-        self.assertEqual(len(thesaurus_list), 2)
-        self.assertEqual(len(thesaurus_list[0].versions.all()), 1)
-        self.assertEqual(len(thesaurus_list[1].versions.all()), 1)
+        thesaurus_version = self.thesauruses[0].versions.get(version="1.0.0")
+        ThesaurusItem.objects.create(
+            thesaurus_version=thesaurus_version, code="1", value="Новый элемент"
+        )
+        ThesaurusItem.objects.bulk_create(
+            [
+                ThesaurusItem(
+                    thesaurus_version=thesaurus_version, code="2", value="элемент 1"
+                )
+            ]
+        )
 
-        actual_to = date(2022, 8, 15)
-        thesaurus_list = self.thesaurus_service.get_thesaurus_list_actual_to(actual_to)
-        self.assertEqual(len(thesaurus_list), 2)
-        self.assertEqual(len(thesaurus_list[0].versions.all()), 1)
-        self.assertEqual(len(thesaurus_list[1].versions.all()), 1)
+        result = self.thesaurus_service.search_elements_thesaurus_version(
+            thesaurus_version, "ЭЛЕМ", limit=3
+        )
+        self.assertEqual(len(result), 3)
+        self.assertTrue(all(item.value.lower().startswith("элем") for item in result))
 
-        actual_to = date(2022, 7, 15)
-        thesaurus_list = self.thesaurus_service.get_thesaurus_list_actual_to(actual_to)
-        self.assertEqual(len(thesaurus_list), 1)
-        self.assertEqual(len(thesaurus_list[0].versions.all()), 1)
+        ThesaurusItem.objects.filter(code="1").delete()
+        result = self.thesaurus_service.search_elements_thesaurus_version(
+            thesaurus_version, "Новый"
+        )
+        self.assertEqual(result, [])
 
-    def test_get_thesaurus_current_version_elements(self):
+    def test_search_short_query(self):
         """
-        Получение элементов заданного справочника текущей версии
+        Поиск элементов по строке короче трех символов выполняется по началу значения
         """
-        result = self.thesaurus_service.get_thesaurus_current_version_elements(
-            self.thesauruses[0]
+        url = reverse("thesaurus-item-search", kwargs={"thesaurus": 1})
+        response = self.client.get(url, {"q": "Эл", "limit": 1})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 1)
+
+        response = self.client.get(url, {"q": "эЛ", "limit": 100})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["results"])
+        self.assertTrue(
+            all(item["value"].startswith("Эл") for item in response.data["results"])
         )
-        self.assertEqual(len(result), 2)
 
-    def test_validate_element_thesaurus_current_version(self):
+        response = self.client.get(url, {"q": "Эл", "limit": 1000})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ThesaurusItemAsyncViewTests(ThesaurusTestCase):
+    async_factory = AsyncRequestFactory()
+
+    async def _compare(self, view, url, data=None, method="get", **kwargs):
+        if method == "get":
+            request = self.async_factory.get(url, data)
+            expected = await sync_to_async(self.client.get)(
+                url, data, HTTP_ACCEPT="application/json"
+            )
+        else:
+            request = self.async_factory.post(url, data, "application/json")
+            expected = await sync_to_async(self.client.post)(
+                url, data, "application/json", HTTP_ACCEPT="application/json"
+            )
+
+        response = await view(request, **kwargs)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content)
+        return response
+
+    async def test_get_thesaurus_current_version_elements(self):
         """
-        Валидация элементов заданного справочника текущей версии (проверка на то, что элемент с указанным кодом и значением существует в указанной версии справочника.)
+        Асинхронное получение элементов справочника совпадает с синхронным
         """
-        result = self.thesaurus_service.validate_elements_thesaurus_current_version(
-            self.thesauruses[0], code="123", value="Элемент 123"
+        view = ThesaurusItemListAsyncView.as_view()
+        url = reverse("thesaurus-item-list", kwargs={"thesaurus": 1})
+        response = await self._compare(view, url, thesaurus="1")
+        self.assertIn("ETag", response)
+
+        await self._compare(view, url, {"limit": 1, "offset": 1}, thesaurus="1")
+        await self._compare(view, url, {"code": "123"}, thesaurus="1")
+        await self._compare(view, url, {"code": "125"}, thesaurus="1")
+        url = reverse("thesaurus-item-list", kwargs={"thesaurus": 5000})
+        await self._compare(view, url, thesaurus="5000")
+
+    async def test_get_thesaurus_version_elements(self):
+        """
+        Асинхронное получение элементов справочника указанной версии
+        """
+        view = ThesaurusItemListAsyncView.as_view()
+        url = reverse(
+            "thesaurus-version-item-list", kwargs={"thesaurus": 1, "version": 3}
         )
-        self.assertEqual(result[0], self.thesauruses[0].versions.first().items.first())
+        await self._compare(view, url, thesaurus="1", version="3")
+        await self._compare(
+            view, url, {"pagination": "cursor"}, thesaurus="1", version="3"
+        )
+        url = reverse(
+            "thesaurus-version-item-list", kwargs={"thesaurus": 1, "version": 50000}
+        )
+        await self._compare(view, url, thesaurus="1", version="50000")
 
-    def test_get_thesaurus_version_elements(self):
+    async def test_bulk_validate_elements(self):
         """
-        Получение элементов заданного справочника указанной версии
+        Асинхронная пакетная валидация элементов совпадает с синхронной
         """
-        result = self.thesaurus_service.get_thesaurus_version_elements(
-            self.thesauruses[0].versions.all()[1]
+        view = ThesaurusItemValidateAsyncView.as_view()
+        url = reverse(
+            "thesaurus-version-item-validate", kwargs={"thesaurus": 1, "version": 3}
+        )
+        items = {"items": [{"code": "125"}, {"code": "127"}, {"value": "Элемент 126"}]}
+        await self._compare(view, url, items, method="post", thesaurus="1", version="3")
+        await self._compare(
+            view, url, {"items": []}, method="post", thesaurus="1", version="3"
         )
-        self.assertEqual(len(result), 3)
 
-    def test_validate_element_thesaurus_version(self):
+    async def test_async_validate_parameters(self):
         """
-        Валидация элемента заданного справочника по указанной версии
+        Асинхронная валидация проверяет параметры так же, как синхронная
         """
-        result = self.thesaurus_service.validate_elements_thesaurus_version(
-            self.thesauruses[0].versions.all()[1], code="125", value="Элемент 125"
+        service = ThesaurusService()
+        thesaurus_version = await ThesaurusVersion.objects.aget(pk=3)
+        calls = [
+            (
+                service.validate_elements_thesaurus_version,
+                service.avalidate_elements_thesaurus_version,
+                (3, "125"),
+            ),
+            (
+                service.validate_elements_thesaurus_version,
+                service.avalidate_elements_thesaurus_version,
+                (thesaurus_version,),
+            ),
+            (
+                service.validate_elements_thesaurus_version_bulk,
+                service.avalidate_elements_thesaurus_version_bulk,
+                (3, [("125", None)]),
+            ),
+        ]
+        for sync_method, async_method, args in calls:
+            with self.subTest(method=async_method.__name__, args=args):
+                with self.assertRaises(Exception) as expected:
+                    await sync_to_async(sync_method)(*args)
+                with self.assertRaises(type(expected.exception)) as context:
+                    await async_method(*args)
+                self.assertEqual(str(context.exception), str(expected.exception))
+
+
+class ThesaurusResolveTests(ThesaurusTestCase):
+    def test_resolve_thesauri_versions(self):
+        """
+        Версии нескольких справочников на дату с элементами одним запросом API
+        """
+        url = reverse("thesaurus-resolve")
+        data = {
+            "thesauri": ["ias-smo", "2", "svyaz-is-mo", "unknown"],
+            "date": "2022-08-05",
+        }
+        with self.assertNumQueries(2):
+            response = self.client.post(url, data, "application/json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.json())
+        results = response.json()["results"]
+        self.assertEqual(
+            [(result["thesaurus"], result["thesaurus_id"]) for result in results],
+            [("ias-smo", 1), ("2", 2), ("svyaz-is-mo", None), ("unknown", None)],
         )
+        self.assertEqual(results[0]["version"]["version"], "1.0.1")
         self.assertEqual(
-            result[0], self.thesauruses[0].versions.all()[1].items.all()[2]
+            [item["code"] for item in results[0]["items"]], ["123", "124", "125"]
+        )
+        self.assertEqual(results[1]["version"]["start_date"], "2022-08-01")
+        self.assertIsNone(results[2]["version"])
+        self.assertEqual(results[3]["items"], [])
+
+    def test_resolve_thesauri_versions_without_items(self):
+        """
+        Версии нескольких справочников на дату без элементов
+        """
+        url = reverse("thesaurus-resolve")
+        data = {"thesauri": ["1", "rsmo-foms"], "date": "2024-09-01", "items": False}
+        with self.assertNumQueries(1):
+            response = self.client.post(url, data, "application/json")
+
+        results = response.json()["results"]
+        self.assertEqual([result["version"]["id"] for result in results], [1, 6])
+        self.assertNotIn("items", results[0])
+
+        response = self.client.post(url, {"thesauri": []}, "application/json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ThesaurusVersionDiffTests(ThesaurusTestCase):
+    thesaurus_service = ThesaurusService()
+
+    def test_get_thesaurus_versions_diff(self):
+        """
+        Получение изменений между версиями справочника
+        """
+        url = reverse("thesaurus-diff", kwargs={"pk": 1})
+        response = self.client.get(url, {"from": 3, "to": 1})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.json())
+        self.assertEqual(response.data["added"], [])
+        self.assertEqual(
+            [item["code"] for item in response.data["removed"]], ["125", "126"]
+        )
+
+        with self.assertNumQueries(3):
+            self.client.get(url, {"from": 3, "to": 1})
+
+    def test_get_thesaurus_versions_diff_by_slug(self):
+        """
+        Получение изменений между версиями справочника, заданного slug
+        """
+        url = reverse("thesaurus-diff", kwargs={"pk": "ias-smo"})
+        response = self.client.get(url, {"from": 3, "to": 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["code"] for item in response.data["removed"]], ["125", "126"]
+        )
+
+        for key in ("remd-ppd", "unknown"):
+            url = reverse("thesaurus-diff", kwargs={"pk": key})
+            response = self.client.get(url, {"from": 3, "to": 1})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_thesaurus_versions_diff_wrong_version(self):
+        """
+        Получение изменений между версиями справочника: версия другого справочника
+        """
+        url = reverse("thesaurus-diff", kwargs={"pk": 1})
+        response = self.client.get(url, {"from": 3, "to": 4})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.get(url, {"from": 3})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_diff_recalculated_on_item_change(self):
+        """
+        Изменение элементов версии сбрасывает рассчитанные изменения
+        """
+        from_version, to_version = self.thesauruses[0].versions.order_by("start_date")[
+            :2
+        ]
+        self.assertEqual(
+            self.thesaurus_service.precalculate_thesaurus_versions_diffs(
+                self.thesauruses[0]
+            ),
+            2,
+        )
+
+        item = to_version.items.get(code="125")
+        item.value = "Элемент 125 (изм.)"
+        item.save()
+        self.assertFalse(
+            ThesaurusVersionDiff.objects.filter(to_version=to_version).exists()
+        )
+
+        diff = self.thesaurus_service.get_thesaurus_versions_diff(
+            from_version, to_version
+        )
+        self.assertEqual(
+            diff.changed,
+            [
+                {
+                    "id": item.pk,
+                    "code": "125",
+                    "old_value": "Элемент 125",
+                    "value": "Элемент 125 (изм.)",
+                }
+            ],
+        )
+        self.assertEqual([item["code"] for item in diff.removed], ["126"])
+
+
+class ThesaurusItemExportTests(ThesaurusTestCase):
+    def test_export_thesaurus_version_ndjson(self):
+        """
+        Выгрузка элементов заданного справочника указанной версии в NDJSON
+        """
+        url = reverse(
+            "thesaurus-version-item-export", kwargs={"thesaurus": 1, "version": 3}
+        )
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("ias-smo-100.ndjson", response["Content-Disposition"])
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(
+            json.loads(lines[0]), {"id": 6, "code": "123", "value": "Элемент 123"}
+        )
+
+    def test_export_thesaurus_current_version_csv_gzip(self):
+        """
+        Выгрузка элементов заданного справочника текущей версии в CSV со сжатием
+        """
+        url = reverse("thesaurus-item-export", kwargs={"thesaurus": 1})
+        response = self.client.get(
+            url, {"type": "csv", "gzip": "1"}, HTTP_ACCEPT="text/csv"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        content = gzip.decompress(b"".join(response.streaming_content)).decode()
+        self.assertEqual(
+            content.splitlines(),
+            ["id,code,value", "1,123,Элемент 123", "2,124,Элемент 124"],
+        )
+
+    def test_export_wrong_type(self):
+        """
+        Выгрузка элементов справочника: неподдерживаемый формат
+        """
+        url = reverse("thesaurus-item-export", kwargs={"thesaurus": 1})
+        response = self.client.get(url, {"type": "xml"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConditionalGetTests(ThesaurusTestCase):
+    def test_thesaurus_list_not_modified(self):
+        """
+        Повторный запрос списка справочников с If-None-Match возвращает 304
+        """
+        url = reverse("thesaurus-list")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("Last-Modified", response)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+    def test_items_modified_after_change(self):
+        """
+        Изменение элементов справочника меняет ETag списка элементов
+        """
+        url = reverse("thesaurus-item-list", kwargs={"thesaurus": 1})
+        etag = self.client.get(url)["ETag"]
+
+        ThesaurusItem.objects.filter(code="123").first().save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_current_version_etag_depends_on_date(self):
+        """
+        ETag элементов текущей версии учитывает дату, версии — нет
+        """
+        current_url = reverse("thesaurus-item-list", kwargs={"thesaurus": 1})
+        version_url = reverse(
+            "thesaurus-version-item-list", kwargs={"thesaurus": 1, "version": 2}
+        )
+        self.assertIn(date.today().isoformat(), self.client.get(current_url)["ETag"])
+        self.assertNotIn(date.today().isoformat(), self.client.get(version_url)["ETag"])
+
+    @override_settings(VOCABULARY_DATABASE_REPLICAS=["replica1"])
+    def test_list_does_not_pin_primary(self):
+        """
+        Условный GET списка только читает ревизию данных: чтение не привязывается
+        к основной базе, и cookie привязки не отправляется (в том числе
+        до создания строки ревизии)
+        """
+        replica_health.clear()
+        replica_health.mark("replica1", False)
+        self.addCleanup(replica_health.clear)
+        url = reverse("thesaurus-item-list", kwargs={"thesaurus": 1})
+        view = ThesaurusItemAPIView.as_view({"get": "list"})
+
+        def get_list():
+            view(RequestFactory().get(url), thesaurus="1").render()
+            return is_primary_pinned()
+
+        for _ in range(2):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn(PRIMARY_COOKIE, response.cookies)
+            self.assertFalse(copy_context().run(get_list))
+            Revision.objects.using("default").delete()
+
+
+@override_settings(VOCABULARY_RESPONSE_CACHE=None)
+class FastListTests(ThesaurusTestCase):
+    def _assert_same_content(self, url, data=None):
+        response = self.client.get(url, data)
+        with override_settings(VOCABULARY_FAST_JSON=False):
+            expected = self.client.get(url, data)
+
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content)
+
+    def test_thesaurus_list_same_content(self):
+        """
+        Быстрый вывод списка справочников совпадает с выводом через сериализатор
+        """
+        url = reverse("thesaurus-list")
+        self._assert_same_content(url)
+        self._assert_same_content(url, {"actual_to": "2022-08-05"})
+        self._assert_same_content(url, {"limit": 2, "offset": 1})
+
+    def test_thesaurus_items_same_content(self):
+        """
+        Быстрый вывод элементов справочника совпадает с выводом через сериализатор
+        """
+        current_url = reverse("thesaurus-item-list", kwargs={"thesaurus": 1})
+        version_url = reverse(
+            "thesaurus-version-item-list", kwargs={"thesaurus": 1, "version": 3}
+        )
+        self._assert_same_content(current_url)
+        self._assert_same_content(current_url, {"code": "123"})
+        self._assert_same_content(version_url, {"limit": 2, "offset": 1})
+        self._assert_same_content(version_url, {"pagination": "cursor", "page_size": 3})
+        self._assert_same_content(version_url, {"code": "missing"})
+
+        with override_settings(VOCABULARY_SNAPSHOT_MAX_ITEMS=1):
+            thesaurus_version_snapshot_cache.clear()
+            self._assert_same_content(version_url, {"limit": 3})
+            self._assert_same_content(version_url, {"offset": 10})
+
+
+@override_settings(VOCABULARY_RESPONSE_CACHE="default")
+class ResponseCacheTests(ThesaurusTestCase):
+    def test_items_response_cached(self):
+        """
+        Повторный запрос элементов версии обслуживается из кэша ответов
+        до изменения элементов версии
+        """
+        url = reverse(
+            "thesaurus-version-item-list", kwargs={"thesaurus": 1, "version": 3}
         )
+        content = self.client.get(url).content
+
+        # Ревизия данных и версия справочника, ответ — из кэша
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.content, content)
+        self.assertEqual(response["Content-Type"], "application/json")
+
+        item = ThesaurusItem.objects.get(thesaurus_version=3, code="123")
+        item.value = "Элемент 123 (изм.)"
+        item.save()
+
+        response = self.client.get(url)
+        self.assertIn("Элемент 123 (изм.)", response.content.decode())
+
+    def test_items_response_keyed_by_revision(self):
+        """
+        Изменение в другом процессе (без сигналов в этом процессе) меняет
+        ревизию данных, и ответ из кэша прежней ревизии не используется
+        """
+        url = reverse(
+            "thesaurus-version-item-list", kwargs={"thesaurus": 1, "version": 3}
+        )
+        etag = self.client.get(url)["ETag"]
+
+        ThesaurusItem.objects.filter(thesaurus_version=3, code="123").update(
+            value="Элемент 123 (изм.)"
+        )
+        Revision.objects.bump()
+        thesaurus_version_snapshot_cache.clear()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("Элемент 123 (изм.)", response.content.decode())
+
+    def test_warm_cache(self):
+        """
+        Заполнение кэша ответов текущих версий актуальных справочников
+        """
+        out = StringIO()
+        call_command("warm_cache", "--host=testserver", stdout=out)
+        self.assertIn("Cached", out.getvalue())
+
+        url = reverse("thesaurus-item-list", kwargs={"thesaurus": 1})
+        # Только ревизия данных: версия и ответ — из кэшей
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(len(response.json()["results"]), 2)
+
+
+class ServerTimingTests(ThesaurusTestCase):
+    def setUp(self):
+        super().setUp()
+        route_metrics.clear()
+
+    @override_settings(
+        VOCABULARY_SERVER_TIMING=True,
+        VOCABULARY_SLOW_REQUEST_MS=0,
+        INTERNAL_IPS=["10.0.0.1"],
+    )
+    def test_server_timing_header(self):
+        """
+        Заголовок Server-Timing, счетчики маршрута и журнал медленных запросов
+        """
+        url = reverse(
+            "thesaurus-version-item-list", kwargs={"thesaurus": 1, "version": 3}
+        )
+        with self.assertLogs("vocabulary.slow_requests", "WARNING") as logs:
+            response = self.client.get(url)
+
+        phases = [part.split(";")[0] for part in response["Server-Timing"].split(", ")]
+        self.assertEqual(phases, ["db", "service", "serialize", "render", "total"])
+        self.assertIn("SELECT", logs.output[0])
+
+        stats = route_metrics.stats()["thesaurus-version-item-list"]
+        self.assertEqual(stats["requests"], 1)
+        self.assertGreater(stats["queries"], 0)
+
+        request = RequestFactory().get("/metrics/", REMOTE_ADDR="10.0.0.1")
+        metrics = metrics_view(request)
+        self.assertIn(
+            'vocabulary_requests_total{route="thesaurus-version-item-list"} 1',
+            metrics.content.decode(),
+        )
+
+    @override_settings(VOCABULARY_SERVER_TIMING=True)
+    async def test_server_timing_async(self):
+        """
+        В асинхронном режиме middleware вызывает представление без
+        переключения в поток, SQL-запросы в sync_to_async учитываются
+        """
+
+        async def get_response(request):
+            await sync_to_async(Thesaurus.objects.count)()
+            return HttpResponse()
+
+        middleware = ServerTimingMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        response = await middleware(RequestFactory().get("/"))
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertEqual(route_metrics.stats()["unresolved"]["queries"], 1)
+
+    def test_metrics_restricted(self):
+        """
+        Счетчики доступны только сотрудникам и с адресов INTERNAL_IPS,
+        без VOCABULARY_SERVER_TIMING адрес /metrics/ не подключается
+        """
+        with self.assertRaises(NoReverseMatch):
+            reverse("metrics")
+
+        request = RequestFactory().get("/metrics/", REMOTE_ADDR="10.0.0.1")
+        request.user = AnonymousUser()
+        with self.assertRaises(PermissionDenied):
+            metrics_view(request)
+
+        request.user = User(is_staff=True)
+        self.assertEqual(metrics_view(request).status_code, status.HTTP_200_OK)
+
+    def test_server_timing_disabled(self):
+        """
+        Без настройки VOCABULARY_SERVER_TIMING замеры не выполняются
+        """
+        response = self.client.get(reverse("thesaurus-list"))
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(route_metrics.stats(), {})
+
+
+class ThesaurusServiceTests(ThesaurusTestCase):
+    thesaurus_service = ThesaurusService()
+
+    def test_get_thesaurus_list(self):
+        """
+        Получение списка справочников.
+        """
+        thesaurus_list = self.thesaurus_service.get_thesaurus_list()
+        self.assertEqual(len(thesaurus_list), 4)
+        self.assertEqual(len(thesaurus_list[0].versions.all()), 3)
+        self.assertEqual(len(thesaurus_list[1].versions.all()), 2)
+        self.assertEqual(len(thesaurus_list[2].versions.all()), 1)
+        self.assertEqual(len(thesaurus_list[3].versions.all()), 0)
+
+    def test_get_thesaurus_list_actual_to(self):
+        """
+        Получение списка справочников, актуальных на указанную дату
+        """
+        actual_to = date.today()
+        thesaurus_list = self.thesaurus_service.get_thesaurus_list_actual_to(actual_to)
+        self.assertEqual(len(thesaurus_list), 2)
+        self.assertEqual(len(thesaurus_list[0].versions.all()), 1)
+        self.assertEqual(len(thesaurus_list[1].versions.all()), 1)
+
+        actual_to = date(2022, 8, 15)
+        thesaurus_list = self.thesaurus_service.get_thesaurus_list_actual_to(actual_to)
+        self.assertEqual(len(thesaurus_list), 2)
+        self.assertEqual(len(thesaurus_list[0].versions.all()), 1)
+        self.assertEqual(len(thesaurus_list[1].versions.all()), 1)
+
+        actual_to = date(2022, 7, 15)
+        thesaurus_list = self.thesaurus_service.get_thesaurus_list_actual_to(actual_to)
+        self.assertEqual(len(thesaurus_list), 1)
+        self.assertEqual(len(thesaurus_list[0].versions.all()), 1)
+
+    def test_thesaurus_version_intervals(self):
+        """
+        Интервалы действия версий пересчитываются при сохранении и удалении версий
+        """
+        versions = ThesaurusVersion.objects.filter(thesaurus=self.thesauruses[0])
+
+        def intervals():
+            return list(
+                versions.order_by("start_date").values_list("start_date", "end_date")
+            )
+
+        self.assertEqual(
+            intervals(),
+            [
+                (date(2022, 7, 1), date(2022, 8, 4)),
+                (date(2022, 8, 4), date(2022, 9, 3)),
+                (date(2022, 9, 3), None),
+            ],
+        )
+
+        versions.get(pk=2).delete()
+        self.assertEqual(
+            intervals(),
+            [(date(2022, 7, 1), date(2022, 9, 3)), (date(2022, 9, 3), None)],
+        )
+
+        version = versions.get(pk=1)
+        version.start_date = date(2022, 6, 1)
+        version.save()
+        self.assertEqual(
+            intervals(),
+            [(date(2022, 6, 1), date(2022, 7, 1)), (date(2022, 7, 1), None)],
+        )
+
+    def test_get_thesaurus_current_version_single_query(self):
+        """
+        Текущая версия справочника определяется одним запросом по интервалу
+        """
+        thesaurus_version_cache.clear()
+        with self.assertNumQueries(1):
+            version = self.thesaurus_service.get_thesaurus_current_version(
+                self.thesauruses[0]
+            )
+        self.assertEqual(version.pk, 1)
+
+    def test_get_thesaurus_current_version_elements(self):
+        """
+        Получение элементов заданного справочника текущей версии
+        """
+        result = self.thesaurus_service.get_thesaurus_current_version_elements(
+            self.thesauruses[0]
+        )
+        self.assertEqual(len(result), 2)
+
+    def test_validate_element_thesaurus_current_version(self):
+        """
+        Валидация элементов заданного справочника текущей версии (проверка на то, что элемент с указанным кодом и значением существует в указанной версии справочника.)
+        """
+        result = self.thesaurus_service.validate_elements_thesaurus_current_version(
+            self.thesauruses[0], code="123", value="Элемент 123"
+        )
+        self.assertEqual(result[0], self.thesauruses[0].versions.first().items.first())
+
+    def test_get_thesaurus_version_elements(self):
+        """
+        Получение элементов заданного справочника указанной версии
+        """
+        result = self.thesaurus_service.get_thesaurus_version_elements(
+            self.thesauruses[0].versions.all()[1]
+        )
+        self.assertEqual(len(result), 3)
+
+    def test_validate_element_thesaurus_version(self):
+        """
+        Валидация элемента заданного справочника по указанной версии
+        """
+        result = self.thesaurus_service.validate_elements_thesaurus_version(
+            self.thesauruses[0].versions.all()[1], code="125", value="Элемент 125"
+        )
+        self.assertEqual(
+            result[0], self.thesauruses[0].versions.all()[1].items.all()[2]
+        )
+
+    def test_validate_elements_thesaurus_version_bulk(self):
+        """
+        Пакетная валидация элементов заданного справочника по указанной версии
+        """
+        thesaurus_version = self.thesauruses[0].versions.all()[1]
+        elements = [("125", "Элемент 125"), ("126", None), (None, "Элемент 124")]
+        result = self.thesaurus_service.validate_elements_thesaurus_version_bulk(
+            thesaurus_version, elements
+        )
+        self.assertEqual(result, [True, False, True])
+
+    def test_validate_elements_thesaurus_version_bulk_without_snapshot(self):
+        """
+        Пакетная валидация элементов версии, не помещающейся в кэш снимков
+        """
+        thesaurus_version = self.thesauruses[0].versions.all()[1]
+        elements = [("125", "Элемент 125"), ("126", None), (None, "Элемент 124")]
+        with self.settings(VOCABULARY_SNAPSHOT_MAX_ITEMS=1):
+            thesaurus_version_snapshot_cache.clear()
+            result = self.thesaurus_service.validate_elements_thesaurus_version_bulk(
+                thesaurus_version, elements
+            )
+        self.assertEqual(result, [True, False, True])
+
+
+class ThesaurusVersionCacheTests(ThesaurusTestCase):
+    thesaurus_service = ThesaurusService()
+
+    def setUp(self):
+        super().setUp()
+        thesaurus_version_cache.clear()
+
+    def test_current_version_is_cached(self):
+        """
+        Повторное получение текущей версии справочника обслуживается из кэша
+        """
+        thesaurus = self.thesauruses[0]
+        version = self.thesaurus_service._get_thesaurus_current_version(thesaurus)
+
+        with self.assertNumQueries(0):
+            cached = self.thesaurus_service._get_thesaurus_current_version(thesaurus)
+
+        self.assertEqual(cached, version)
+        self.assertEqual(thesaurus_version_cache.hits, 1)
+        self.assertEqual(thesaurus_version_cache.misses, 1)
+
+    def test_cache_invalidated_on_version_change(self):
+        """
+        Изменение версий справочника сбрасывает кэш текущей версии
+        """
+        thesaurus = self.thesauruses[0]
+        self.thesaurus_service._get_thesaurus_current_version(thesaurus)
+
+        new_version = ThesaurusVersion.objects.create(
+            thesaurus=thesaurus, version="2.0.0", start_date=date.today(), slug="200"
+        )
+        self.assertEqual(
+            self.thesaurus_service._get_thesaurus_current_version(thesaurus),
+            new_version,
+        )
+
+        new_version.delete()
+        self.assertNotEqual(
+            self.thesaurus_service._get_thesaurus_current_version(thesaurus),
+            new_version,
+        )
+        self.assertEqual(thesaurus_version_cache.misses, 3)
+
+    def test_cache_expires_when_next_version_starts(self):
+        """
+        Запись кэша устаревает с датой начала действия следующей версии
+        """
+        thesaurus = self.thesauruses[0]
+        version = thesaurus.versions.get(version="1.0.1")
+        thesaurus_version_cache.set(thesaurus.pk, version, date(2022, 9, 3))
+
+        self.assertEqual(
+            thesaurus_version_cache.get(thesaurus.pk, date(2022, 9, 2)), version
+        )
+        self.assertIsNone(thesaurus_version_cache.get(thesaurus.pk, date(2022, 9, 3)))
+
+    def test_cache_expires_after_ttl(self):
+        """
+        Версия, опубликованная другим процессом (без сигналов в этом процессе),
+        выбирается по истечении времени жизни записи кэша
+        """
+        thesaurus = self.thesauruses[0]
+        version = self.thesaurus_service._get_thesaurus_current_version(thesaurus)
+
+        (new_version,) = ThesaurusVersion.objects.bulk_create(
+            [
+                ThesaurusVersion(
+                    thesaurus=thesaurus,
+                    version="2.0.0",
+                    start_date=date.today(),
+                    slug="200",
+                )
+            ]
+        )
+        ThesaurusVersion.objects.update_intervals(thesaurus.pk)
+
+        with self.settings(VOCABULARY_VERSION_CACHE_TTL=3600):
+            self.assertEqual(
+                self.thesaurus_service._get_thesaurus_current_version(thesaurus),
+                version,
+            )
+        sleep(0.01)
+        with self.settings(VOCABULARY_VERSION_CACHE_TTL=0):
+            self.assertEqual(
+                self.thesaurus_service._get_thesaurus_current_version(thesaurus),
+                new_version,
+            )
+
+
+class ThesaurusVersionSnapshotTests(ThesaurusTestCase):
+    thesaurus_service = ThesaurusService()
+
+    def setUp(self):
+        super().setUp()
+        thesaurus_version_snapshot_cache.clear()
+
+    def test_validation_served_from_snapshot(self):
+        """
+        Валидация элементов версии после загрузки снимка не обращается
+        к элементам в базе (только проверка отметки последнего изменения версии)
+        """
+        thesaurus_version = self.thesauruses[0].versions.all()[1]
+        self.thesaurus_service.get_thesaurus_version_snapshot(thesaurus_version)
+
+        with self.assertNumQueries(2):
+            result = self.thesaurus_service.validate_elements_thesaurus_version(
+                thesaurus_version, code="125", value="Элемент 125"
+            )
+            self.assertEqual(result[0].code, "125")
+            self.assertRaises(
+                Http404,
+                self.thesaurus_service.validate_elements_thesaurus_version,
+                thesaurus_version,
+                code="125",
+                value="Элемент 124",
+            )
+
+    def test_snapshot_rebuilt_on_item_change(self):
+        """
+        Изменение элементов версии приводит к перестроению снимка
+        """
+        thesaurus_version = self.thesauruses[0].versions.all()[1]
+        snapshot = self.thesaurus_service.get_thesaurus_version_snapshot(
+            thesaurus_version
+        )
+        self.assertFalse(snapshot.contains(code="999"))
+
+        ThesaurusItem.objects.create(
+            thesaurus_version=thesaurus_version, code="999", value="Элемент 999"
+        )
+        snapshot = self.thesaurus_service.get_thesaurus_version_snapshot(
+            thesaurus_version
+        )
+        self.assertTrue(snapshot.contains(code="999", value="Элемент 999"))
+        self.assertEqual(len(snapshot), 4)
+
+    def test_snapshot_items_ordered_by_value(self):
+        """
+        Элементы снимка упорядочены по значению, как и в модели
+        """
+        thesaurus_version = self.thesauruses[1].versions.all()[0]
+        snapshot = self.thesaurus_service.get_thesaurus_version_snapshot(
+            thesaurus_version
+        )
+        self.assertEqual(
+            [item.pk for item in snapshot.items],
+            list(thesaurus_version.items.values_list("pk", flat=True)),
+        )
+        self.assertRaises(AttributeError, setattr, snapshot, "_codes", ())
+
+    def test_snapshot_cache_evicts_least_recently_used(self):
+        """
+        Кэш снимков ограничен суммарным количеством элементов
+        """
+        cache = ThesaurusVersionSnapshotCache(max_items=5)
+        first, second, third = self.thesauruses[0].versions.all()
+
+        cache.get(first, first.items.all(), 0)
+        cache.get(second, second.items.all(), 0)
+        self.assertEqual(cache.stats()["items"], 5)
+
+        cache.get(third, third.items.all(), 0)
+        self.assertEqual(cache.stats()["items"], 4)
+        self.assertEqual(cache.stats()["size"], 1)
+
+        cache = ThesaurusVersionSnapshotCache(max_items=3)
+        self.assertIsNone(cache.get(third, third.items.all(), 0))
+        self.assertEqual(cache.stats()["size"], 0)
+
+
+class ThesaurusVersionBloomFilterTests(ThesaurusTestCase):
+    thesaurus_service = ThesaurusService()
+
+    def setUp(self):
+        super().setUp()
+        thesaurus_version_snapshot_cache.clear()
+        bloom_filter_cache.clear()
+
+    def test_bloom_filter_roundtrip(self):
+        """
+        Фильтр без ложноотрицательных ответов, одинаковый после сериализации
+        """
+        keys = [f"c:{i}" for i in range(1000)]
+        bloom_filter = BloomFilter.for_capacity(len(keys))
+        for key in keys:
+            bloom_filter.add(key)
+
+        restored = BloomFilter.from_bytes(bloom_filter.to_bytes())
+        self.assertTrue(all(key in restored for key in keys))
+        self.assertEqual(restored.to_bytes(), bloom_filter.to_bytes())
+        false_positives = sum(f"c:missing-{i}" in restored for i in range(1000))
+        self.assertLess(false_positives, 50)
+
+    def test_missing_element_without_item_queries(self):
+        """
+        Отсутствующий код отсекается загруженным фильтром без запросов
+        к элементам (только проверка отметки последнего изменения версии)
+        """
+        thesaurus_version = self.thesauruses[0].versions.all()[1]
+        self.thesaurus_service.get_thesaurus_version_bloom_filter(thesaurus_version)
+
+        with self.assertNumQueries(2):
+            self.assertRaises(
+                Http404,
+                self.thesaurus_service.validate_elements_thesaurus_version,
+                thesaurus_version,
+                code="999",
+            )
+            result = self.thesaurus_service.validate_elements_thesaurus_version_bulk(
+                thesaurus_version, [("999", None), (None, "Нет такого")]
+            )
+        self.assertEqual(result, [False, False])
+
+        result = self.thesaurus_service.validate_elements_thesaurus_version_bulk(
+            thesaurus_version,
+            [("125", "Элемент 125"), ("999", None), ("125", "Элемент 124")],
+        )
+        self.assertEqual(result, [True, False, False])
+
+    def test_bloom_filter_rebuilt_on_item_change(self):
+        """
+        Фильтр версии удаляется при изменении ее элементов и строится заново
+        """
+        thesaurus_version = self.thesauruses[0].versions.all()[0]
+        self.thesaurus_service.get_thesaurus_version_bloom_filter(thesaurus_version)
+        self.assertTrue(
+            ThesaurusVersionBloomFilter.objects.filter(
+                thesaurus_version=thesaurus_version
+            ).exists()
+        )
+
+        ThesaurusItem.objects.create(
+            thesaurus_version=thesaurus_version, code="999", value="Элемент 999"
+        )
+        self.assertFalse(
+            ThesaurusVersionBloomFilter.objects.filter(
+                thesaurus_version=thesaurus_version
+            ).exists()
+        )
+        result = self.thesaurus_service.validate_elements_thesaurus_version(
+            thesaurus_version, code="999"
+        )
+        self.assertEqual(result[0].value, "Элемент 999")
+
+    def test_bloom_filter_rebuilt_after_change_in_other_process(self):
+        """
+        Элемент, добавленный в другом процессе (без сброса фильтра в этом
+        процессе), не получает ложноотрицательный ответ загруженного фильтра
+        """
+        thesaurus_version = self.thesauruses[0].versions.all()[0]
+        self.thesaurus_service.get_thesaurus_version_bloom_filter(thesaurus_version)
+
+        # bulk_create не отправляет сигналы, запись в журнал изменений
+        # выполняет обработчик другого процесса
+        (item,) = ThesaurusItem.objects.bulk_create(
+            [
+                ThesaurusItem(
+                    thesaurus_version=thesaurus_version, code="999", value="Элемент 999"
+                )
+            ]
+        )
+        ChangeLog.objects.record(item, ChangeLog.SAVE)
+
+        result = self.thesaurus_service.validate_elements_thesaurus_version(
+            thesaurus_version, code="999"
+        )
+        self.assertEqual(result[0].value, "Элемент 999")
+        self.assertEqual(
+            self.thesaurus_service.validate_elements_thesaurus_version_bulk(
+                thesaurus_version, [(None, "Элемент 999")]
+            ),
+            [True],
+        )
+
+    def test_snapshot_rebuilt_after_change_in_other_process(self):
+        """
+        Загруженный снимок не используется после изменения версии в другом
+        процессе (без сброса снимка в этом процессе): новый элемент найден,
+        удаленный не проходит валидацию
+        """
+        thesaurus_version = self.thesauruses[0].versions.all()[0]
+        self.thesaurus_service.get_thesaurus_version_snapshot(thesaurus_version)
+        removed = thesaurus_version.items.get(code="124")
+
+        # bulk_create и update не отправляют сигналы, запись в журнал
+        # изменений выполняет обработчик другого процесса
+        (item,) = ThesaurusItem.objects.bulk_create(
+            [
+                ThesaurusItem(
+                    thesaurus_version=thesaurus_version, code="999", value="Элемент 999"
+                )
+            ]
+        )
+        ChangeLog.objects.record(item, ChangeLog.SAVE)
+        ThesaurusItem.objects.filter(pk=removed.pk).update(value="Изменено")
+        ChangeLog.objects.record(removed, ChangeLog.SAVE)
+
+        result = self.thesaurus_service.validate_elements_thesaurus_version(
+            thesaurus_version, code="999"
+        )
+        self.assertEqual(result[0].value, "Элемент 999")
+        self.assertEqual(
+            self.thesaurus_service.validate_elements_thesaurus_version_bulk(
+                thesaurus_version, [(None, "Элемент 999"), ("124", "Элемент 124")]
+            ),
+            [True, False],
+        )
+
+    def test_download_bloom_filter(self):
+        """
+        Выгрузка фильтра версии для проверки на стороне клиента
+        """
+        url = reverse(
+            "thesaurus-version-item-bloom", kwargs={"thesaurus": 1, "version": 2}
+        )
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/octet-stream")
+        self.assertIn('filename="ias-smo-101.bloom"', response["Content-Disposition"])
+        bloom_filter = BloomFilter.from_bytes(response.content)
+        self.assertTrue(bloom_filter.may_contain("125", "Элемент 125"))
+        self.assertFalse(bloom_filter.may_contain("126"))
+
+
+class NormalizedValueTests(ThesaurusTestCase):
+    thesaurus_service = ThesaurusService()
+    async_factory = AsyncRequestFactory()
+
+    def test_normalize_value(self):
+        self.assertEqual(
+            normalize_value("  Ёлка\u00a0  ЗЕЛЁНАЯ \ufb01 "), "елка зеленая fi"
+        )
+
+    def test_validate_normalized(self):
+        """
+        Валидация без учета регистра и пробелов только при match=normalized
+        """
+        url = reverse("thesaurus-item-list", kwargs={"thesaurus": 1})
+        response = self.client.get(url, {"value": " элемент  123"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.get(
+            url, {"value": " элемент  123", "match": "normalized"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["code"], "123")
+
+        response = self.client.get(url, {"value": "123", "match": "fuzzy"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], "Parameter 'match' is not valid")
+
+        url = reverse("thesaurus-item-validate", kwargs={"thesaurus": 1})
+        response = self.client.post(
+            f"{url}?match=normalized",
+            {
+                "items": [
+                    {"code": "123", "value": "ЭЛЕМЕНТ 123"},
+                    {"code": "124", "value": "элемент 123"},
+                    {"value": "элемент 124 "},
+                    {"value": "элемент 125"},
+                ]
+            },
+            "application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["valid"] for item in response.data["results"]],
+            [True, False, True, False],
+        )
+
+    def test_validate_normalized_service(self):
+        thesaurus_version = self.thesauruses[0].versions.get(slug="100")
+        items = self.thesaurus_service.validate_elements_thesaurus_version(
+            thesaurus_version, "126", "элемент 126", normalized=True
+        )
+        self.assertEqual([item.code for item in items], ["126"])
+        self.assertRaises(
+            Http404,
+            self.thesaurus_service.validate_elements_thesaurus_version,
+            thesaurus_version,
+            value="элемент 126",
+        )
+
+        result = self.thesaurus_service.validate_elements_thesaurus_version_bulk(
+            thesaurus_version, [(None, "ЭЛЕМЕНТ 125"), ("125", "x")], normalized=True
+        )
+        self.assertEqual(result, [True, False])
+
+    async def test_async_validate_normalized(self):
+        view = ThesaurusItemValidateAsyncView.as_view()
+        url = reverse("thesaurus-item-validate", kwargs={"thesaurus": 1})
+        request = self.async_factory.post(
+            f"{url}?match=normalized",
+            {"items": [{"value": "элемент 123"}]},
+            "application/json",
+        )
+        response = await view(request, thesaurus="1")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content)["results"][0]["valid"], True)
+
+    def test_update_normalized_values_command(self):
+        ThesaurusItem.objects.update(normalized_value="")
+
+        out = StringIO()
+        call_command("update_normalized_values", "--chunk-size=2", stdout=out)
+        self.assertIn("Updated 15 thesaurus items", out.getvalue())
+        self.assertFalse(ThesaurusItem.objects.filter(normalized_value="").exists())
+        self.assertEqual(
+            ThesaurusItem.objects.get(
+                thesaurus_version__slug="102", code="123"
+            ).normalized_value,
+            "элемент 123",
+        )
+
+
+class CopyOnWriteItemsTests(ThesaurusTestCase):
+    thesaurus_service = ThesaurusService()
+
+    def setUp(self):
+        super().setUp()
+        self.base_version = self.thesauruses[0].versions.get(slug="100")
+        self.version = (
+            ThesaurusVersionImporter()
+            .import_version(
+                self.thesauruses[0],
+                "1.0.3",
+                date(2025, 1, 1),
+                [{"code": "123", "op": "delete"}, {"code": "127", "value": "Новый"}],
+                base_version=self.base_version,
+            )
+            .thesaurus_version
+        )
+
+    def _elements(self, version) -> dict:
+        items = self.thesaurus_service.get_thesaurus_version_elements(version)
+        return dict(items.values_list("code", "value"))
+
+    def test_clone_shares_items(self):
+        """
+        Новая версия ссылается на неизмененные элементы базовой версии
+        """
+        self.assertEqual(self.version.parent, self.base_version)
+        self.assertEqual(self.version.items.count(), 1)
+        self.assertEqual(
+            self._elements(self.version),
+            {
+                "124": "Элемент 124",
+                "125": "Элемент 125",
+                "126": "Элемент 126",
+                "127": "Новый",
+            },
+        )
+        self.assertEqual(len(self._elements(self.base_version)), 4)
+
+        result = self.thesaurus_service.get_thesauri_versions_elements(
+            [self.base_version, self.version]
+        )
+        self.assertEqual(
+            [item["code"] for item in result[self.version.pk]],
+            ["127", "124", "125", "126"],
+        )
+
+    def test_change_shared_item(self):
+        """
+        Изменение и удаление общего элемента не затрагивает другую версию
+        """
+        item = self.thesaurus_service.get_thesaurus_version_elements(self.version).get(
+            code="124"
+        )
+        item.thesaurus_version = self.version
+        item.value = "Изменено"
+        item.save()
+
+        self.assertEqual(self._elements(self.version)["124"], "Изменено")
+        self.assertEqual(self._elements(self.base_version)["124"], "Элемент 124")
+
+        item = self.thesaurus_service.get_thesaurus_version_elements(self.version).get(
+            code="125"
+        )
+        item.thesaurus_version = self.version
+        item.delete()
+
+        self.assertNotIn("125", self._elements(self.version))
+        self.assertIn("125", self._elements(self.base_version))
+        self.assertTrue(
+            ChangeLog.objects.filter(
+                object_type=ChangeLog.ITEM,
+                object_id=item.pk,
+                action=ChangeLog.DELETE,
+                thesaurus_version_id=self.version.pk,
+            ).exists()
+        )
+
+    def test_delete_base_version(self):
+        """
+        При удалении базовой версии общие элементы остаются в новой версии
+        """
+        elements = self._elements(self.version)
+        change_id = ChangeLog.objects.last_version_change_id(self.version.pk)
+        revision = Revision.objects.current().number
+        self.base_version.delete()
+
+        self.assertEqual(self._elements(self.version), elements)
+        self.assertEqual(self.version.items.count(), 4)
+        # Переход элементов к версии записан в журнал изменений
+        self.assertTrue(
+            ChangeLog.objects.filter(
+                pk__gt=change_id,
+                object_type=ChangeLog.VERSION_ITEMS,
+                object_id=self.version.pk,
+                action=ChangeLog.RELOAD,
+            ).exists()
+        )
+        self.assertGreater(Revision.objects.current().number, revision + 1)
+        self.assertFalse(
+            ThesaurusVersionItem.objects.filter(
+                thesaurus_version_id=self.base_version.pk
+            ).exists()
+        )
+
+    def test_validate_unique_in_version(self):
+        item = ThesaurusItem(
+            thesaurus_version=self.version, code="124", value="Элемент 999"
+        )
+        with self.assertRaises(ValidationError) as context:
+            item.validate_unique()
+        self.assertIn("code", context.exception.message_dict)
+
+    def test_unique_in_version_composition(self):
+        """
+        Код и значение уникальны в составе версии, включая элементы,
+        общие с базовой версией
+        """
+        for code, value in (("124", "Элемент 999"), ("999", "Элемент 124")):
+            with self.subTest(code=code), self.assertRaises(IntegrityError):
+                with transaction.atomic():
+                    ThesaurusItem.objects.create(
+                        thesaurus_version=self.version, code=code, value=value
+                    )
+            with self.subTest(bulk=code), self.assertRaises(IntegrityError):
+                with transaction.atomic():
+                    ThesaurusItem.objects.bulk_create(
+                        [
+                            ThesaurusItem(
+                                thesaurus_version=self.version, code=code, value=value
+                            )
+                        ]
+                    )
+
+    def test_update_version_items_command(self):
+        ThesaurusVersionItem.objects.filter(
+            thesaurus_version=self.base_version
+        ).delete()
+
+        out = StringIO()
+        call_command("update_version_items", stdout=out)
+        self.assertIn("Added 4 thesaurus version items", out.getvalue())
+        self.assertEqual(len(self._elements(self.base_version)), 4)
+
+
+class ThesaurusItemAsOfTests(ThesaurusTestCase):
+    async_factory = AsyncRequestFactory()
+
+    def test_get_elements_as_of(self):
+        """
+        Элементы и валидация по версии, актуальной на дату as_of,
+        за один запрос с идентификатором версии в заголовке
+        """
+        url = reverse("thesaurus-item-list", kwargs={"thesaurus": "ias-smo"})
+        response = self.client.get(url)
+        self.assertEqual(response["X-Thesaurus-Version"], "1")
+
+        response = self.client.get(url, {"as_of": "2022-08-15"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-Thesaurus-Version"], "2")
+        self.assertEqual(response.data["count"], 3)
+
+        response = self.client.get(url, {"as_of": "2022-07-15", "code": "126"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-Thesaurus-Version"], "3")
+
+        response = self.client.get(url, {"as_of": "2020-01-01"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.get(url, {"as_of": "2022-13-01"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], "Parameter 'as_of' is not valid")
+
+        url = reverse(
+            "thesaurus-version-item-list",
+            kwargs={"thesaurus": "ias-smo", "version": "102"},
+        )
+        response = self.client.get(url, {"as_of": "2022-08-15"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        url = reverse("thesaurus-item-validate", kwargs={"thesaurus": "ias-smo"})
+        response = self.client.post(
+            f"{url}?as_of=2022-07-15",
+            {"items": [{"code": "126"}]},
+            "application/json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-Thesaurus-Version"], "3")
+        self.assertTrue(response.data["results"][0]["valid"])
+
+    async def test_async_get_elements_as_of(self):
+        view = ThesaurusItemListAsyncView.as_view()
+        url = reverse("thesaurus-item-list", kwargs={"thesaurus": "ias-smo"})
+        request = self.async_factory.get(url, {"as_of": "2022-08-15"})
+        response = await view(request, thesaurus="ias-smo")
+        expected = await sync_to_async(self.client.get)(
+            url, {"as_of": "2022-08-15"}, HTTP_ACCEPT="application/json"
+        )
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response["X-Thesaurus-Version"], "2")
+
+        view = ThesaurusItemValidateAsyncView.as_view()
+        url = reverse("thesaurus-item-validate", kwargs={"thesaurus": "ias-smo"})
+        request = self.async_factory.post(
+            f"{url}?as_of=2022-07-15",
+            {"items": [{"code": "126"}]},
+            "application/json",
+        )
+        response = await view(request, thesaurus="ias-smo")
+        self.assertEqual(response["X-Thesaurus-Version"], "3")
+        self.assertEqual(json.loads(response.content)["results"][0]["valid"], True)
+
+
+@override_settings(VOCABULARY_DATABASE_REPLICAS=["replica1", "replica2", "replica3"])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        replica_health.clear()
+        replica_health.mark("replica1", True)
+        replica_health.mark("replica2", False)
+        replica_health.mark("replica3", True)
+        self.addCleanup(replica_health.clear)
+        self.router = ReplicaRouter()
+
+    def test_reads_round_robin_over_healthy_replicas(self):
+        """
+        Чтение по кругу из доступных реплик, запись в основную базу
+        """
+        reads = [self.router.db_for_read(Thesaurus) for _ in range(6)]
+        self.assertEqual(set(reads), {"replica1", "replica3"})
+
+        replica_health.mark("replica1", False)
+        replica_health.mark("replica3", False)
+        self.assertEqual(self.router.db_for_read(Thesaurus), "default")
+
+        with override_settings(VOCABULARY_DATABASE_REPLICAS=["unknown"]):
+            self.assertEqual(self.router.db_for_read(Thesaurus), "default")
+
+    def test_reads_stick_to_primary_after_write(self):
+        """
+        После записи чтение из основной базы в том же и следующих запросах
+        клиента (cookie)
+        """
+        reads = []
+
+        def get_response(request):
+            if request.method == "POST":
+                self.assertEqual(self.router.db_for_write(Thesaurus), "default")
+            reads.append(self.router.db_for_read(Thesaurus))
+            return HttpResponse()
+
+        middleware = ReplicaStickinessMiddleware(get_response)
+        factory = RequestFactory()
+
+        response = middleware(factory.post("/"))
+        self.assertIn(PRIMARY_COOKIE, response.cookies)
+
+        request = factory.get("/")
+        request.COOKIES[PRIMARY_COOKIE] = response.cookies[PRIMARY_COOKIE].value
+        response = middleware(request)
+        self.assertNotIn(PRIMARY_COOKIE, response.cookies)
+
+        middleware(factory.get("/"))
+        self.assertEqual(reads[:2], [None, None])
+        self.assertIn(reads[2], ("replica1", "replica3"))
+
+    async def test_async_reads_stick_to_primary_after_write(self):
+        """
+        В асинхронном режиме middleware вызывает представление без
+        переключения в поток, запись в sync_to_async привязывает клиента
+        к основной базе
+        """
+
+        async def get_response(request):
+            await sync_to_async(self.router.db_for_write)(Thesaurus)
+            return HttpResponse()
+
+        middleware = ReplicaStickinessMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+
+        response = await middleware(RequestFactory().post("/"))
+        self.assertIn(PRIMARY_COOKIE, response.cookies)
+
+
+class ThesaurusAdminTests(ThesaurusTestCase):
+    def setUp(self):
+        super().setUp()
+        user = User.objects.create_superuser("admin", "admin@example.org", "admin")
+        self.client.force_login(user)
+        self.version = ThesaurusVersion.objects.get(pk=3)
+        ThesaurusItem.objects.bulk_create(
+            ThesaurusItem(
+                thesaurus_version=self.version, code=f"c{i}", value=f"Значение {i}"
+            )
+            for i in range(116)
+        )
+
+    def test_version_items_paginated(self):
+        """
+        Элементы версии в форме версии выводятся постранично
+        """
+        url = reverse("admin:vocabulary_thesaurusversion_change", args=[3])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, 'name="items-INITIAL_FORMS" value="50"')
+        self.assertContains(response, "Страница 1 из 3, всего элементов: 120")
+
+        response = self.client.get(url, {"items_page": 3})
+        self.assertContains(response, 'name="items-INITIAL_FORMS" value="20"')
+
+        data = {
+            "thesaurus": 1,
+            "version": "1.0.0",
+            "start_date": "2022-07-01",
+            "slug": "100",
+            "items-TOTAL_FORMS": 20,
+            "items-INITIAL_FORMS": 20,
+        }
+        items = ThesaurusItem.objects.filter(thesaurus_version=self.version)
+        for i, item in enumerate(items[100:]):
+            data.update(
+                {
+                    f"items-{i}-id": item.pk,
+                    f"items-{i}-thesaurus_version": 3,
+                    f"items-{i}-code": item.code,
+                    f"items-{i}-value": item.value,
+                }
+            )
+        data["items-0-value"] = "Новое значение"
+        response = self.client.post(f"{url}?items_page=3", data)
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertTrue(items.filter(value="Новое значение").exists())
+
+    def test_item_changelist_queries(self):
+        """
+        Количество запросов списка элементов не зависит от их количества,
+        поиск значений выполняется по индексу
+        """
+        url = reverse("admin:vocabulary_thesaurusitem_changelist")
+        response = self.client.get(url)
+        self.assertContains(response, "Значение 1")
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, {"version": 3})
+        self.assertEqual(len(response.context["cl"].result_list), 100)
+        self.assertLess(len(context), 10)
+
+        response = self.client.get(url, {"q": "ение 11"})
+        self.assertEqual(
+            {item.code for item in response.context["cl"].result_list},
+            {"c11", *(f"c{i}" for i in range(110, 116))},
+        )
+        response = self.client.get(url, {"q": "125"})
+        self.assertEqual(
+            {item.value for item in response.context["cl"].result_list},
+            {"Элемент 125"},
+        )
+
+    def test_clone_and_import_version(self):
+        """
+        Новая версия копированием выбранной с файлом изменений и загрузка из файла
+        """
+        url = reverse("admin:vocabulary_thesaurusversion_clone", args=[3])
+        delta = SimpleUploadedFile(
+            "delta.csv", "code,value,op\n123,,delete\nc0,Изменено,\n".encode()
+        )
+        response = self.client.post(
+            url, {"version": "1.0.3", "start_date": "2025-01-01", "file": delta}
+        )
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        version = ThesaurusVersion.objects.get(thesaurus_id=1, version="1.0.3")
+        items = ThesaurusItem.objects.in_version(version)
+        self.assertEqual(items.count(), 119)
+        self.assertTrue(items.filter(code="c0", value="Изменено").exists())
+
+        # Общие с базовой версией элементы входят в список элементов новой версии
+        response = self.client.get(
+            reverse("admin:vocabulary_thesaurusitem_changelist"),
+            {"version": version.pk},
+        )
+        self.assertEqual(response.context["cl"].result_count, 119)
+
+        url = reverse("admin:vocabulary_thesaurusversion_import")
+        response = self.client.post(
+            url,
+            {
+                "thesaurus": 3,
+                "version": "12.0.6",
+                "start_date": "2025-01-01",
+                "file": SimpleUploadedFile(
+                    "items.csv", "code,value\n1,Один\n1,Два\n".encode()
+                ),
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, "duplicate code")
+        self.assertFalse(ThesaurusVersion.objects.filter(version="12.0.6").exists())
+
+
+class ChangeLogTests(ThesaurusTestCase):
+    def test_changes_since_token(self):
+        """
+        Изменения после токена сжимаются до последнего изменения объекта
+        """
+        url = reverse("changes-list")
+        token = self.client.get(url).json()["token"]
+        self.assertGreater(token, 0)
+
+        item = ThesaurusItem.objects.get(thesaurus_version_id=1, code="123")
+        item.value = "Элемент 123 (изм.)"
+        item.save()
+        item.value = "Элемент 123 (изм. 2)"
+        item.save()
+        deleted = ThesaurusItem.objects.get(thesaurus_version_id=1, code="124")
+        deleted.delete()
+        ThesaurusVersionImporter().import_version(
+            self.thesauruses[3],
+            "1.0",
+            date(2025, 1, 1),
+            [{"code": "1", "value": "Один"}],
+        )
+
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {"since": token})
+        data = response.json()
+        self.assertFalse(data["has_more"])
+        self.assertEqual(data["token"], data["changes"][-1]["token"])
+        changes = [
+            (change["type"], change["action"], change["data"])
+            for change in data["changes"]
+        ]
+        version = ThesaurusVersion.objects.get(thesaurus_id=4)
+        self.assertEqual(
+            changes,
+            [
+                (
+                    "item",
+                    "save",
+                    {"id": item.pk, "code": "123", "value": "Элемент 123 (изм. 2)"},
+                ),
+                ("item", "delete", None),
+                ("version", "save", thesaurus_version_data(version)),
+                ("version_items", "reload", None),
+            ],
+        )
+        self.assertEqual(data["changes"][1]["version_id"], 1)
+
+        response = self.client.get(url, {"since": token, "limit": 1})
+        self.assertTrue(response.json()["has_more"])
+        next_token = response.json()["token"]
+        response = self.client.get(url, {"since": next_token})
+        self.assertEqual(len(response.json()["changes"]), 3)
+
+        response = self.client.get(url, {"since": -1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_version_delete_recorded_once(self):
+        """
+        Удаление версии записывается одним изменением версии, элементы,
+        удаленные вместе с ней, по отдельности не обрабатываются
+        """
+        version = (
+            ThesaurusVersionImporter()
+            .import_version(
+                self.thesauruses[3],
+                "1.0",
+                date(2025, 1, 1),
+                [{"code": str(i), "value": f"Элемент {i}"} for i in range(200)],
+            )
+            .thesaurus_version
+        )
+        version_id = version.pk
+        token = ThesaurusService().get_changes_token()
+
+        with CaptureQueriesContext(connection) as context:
+            version.delete()
+        self.assertLess(len(context), 20)
+        self.assertEqual(
+            list(
+                ChangeLog.objects.filter(pk__gt=token).values_list(
+                    "object_type", "action", "object_id"
+                )
+            ),
+            [(ChangeLog.VERSION, ChangeLog.DELETE, version_id)],
+        )
+
+
+class VersionEventTests(ThesaurusTestCase):
+    def test_poll_version_events(self):
+        """
+        События версий по журналу изменений: одно событие на версию и тип
+        """
+        broker = VersionEventBroker()
+        self.assertEqual(broker.poll(), [])
+
+        result = ThesaurusVersionImporter().import_version(
+            self.thesauruses[3],
+            "1.0",
+            date(2025, 1, 1),
+            [{"code": "1", "value": "Один"}],
+        )
+        item = ThesaurusItem.objects.get(thesaurus_version_id=1, code="123")
+        item.value = "Элемент 123 (изм.)"
+        item.save()
+        item.save()
+        ThesaurusVersion.objects.get(pk=5).delete()
+
+        events = broker.poll()
+        self.assertEqual(
+            [(event_type, data["id"]) for event_type, data in events],
+            [
+                ("version_saved", result.thesaurus_version.pk),
+                ("version_items_changed", result.thesaurus_version.pk),
+                ("version_items_changed", 1),
+                ("version_deleted", 5),
+            ],
+        )
+        self.assertEqual(len(events[0][1]["fingerprint"]), 16)
+        self.assertNotEqual(events[0][1]["fingerprint"], events[1][1]["fingerprint"])
+        self.assertEqual(broker.poll(), [])
+
+        tomorrow = date.today() + timedelta(days=1)
+        version = ThesaurusVersion.objects.create(
+            thesaurus=self.thesauruses[2], version="13", slug="13", start_date=tomorrow
+        )
+        broker.poll()
+        self.assertEqual(
+            [(event_type, data["id"]) for event_type, data in broker.poll(tomorrow)],
+            [("version_effective", version.pk)],
+        )
+
+    @override_settings(
+        VOCABULARY_EVENTS_POLL_INTERVAL=60, VOCABULARY_EVENTS_HEARTBEAT=60
+    )
+    async def test_events_stream(self):
+        """
+        Поток Server-Sent Events через ASGI-приложение
+        """
+        sent = []
+        subscribed = asyncio.Event()
+        delivered = asyncio.Event()
+
+        async def receive():
+            await delivered.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            body = message.get("body", b"")
+            if body.startswith(b"retry:"):
+                subscribed.set()
+            elif body.startswith(b"id:"):
+                delivered.set()
+
+        scope = {"type": "http", "method": "GET", "path": "/api/v1/events/"}
+        task = asyncio.ensure_future(application(scope, receive, send))
+        await asyncio.wait_for(subscribed.wait(), 5)
+        version_event_broker.publish("version_saved", {"id": 1, "fingerprint": "f"})
+        await asyncio.wait_for(task, 5)
+
+        self.assertEqual(sent[0]["status"], 200)
+        self.assertIn(
+            (b"content-type", b"text/event-stream; charset=utf-8"), sent[0]["headers"]
+        )
+        body = b"".join(message.get("body", b"") for message in sent).decode()
+        self.assertIn(
+            'event: version_saved\ndata: {"id": 1, "fingerprint": "f"}\n\n', body
+        )
+
+
+class ImportVersionCommandTests(ThesaurusTestCase):
+    def _write(self, suffix: str, content: str) -> str:
+        f = NamedTemporaryFile("w", suffix=suffix, encoding="utf-8", delete=False)
+        with f:
+            f.write(content)
+        self.addCleanup(os.remove, f.name)
+        return f.name
+
+    def test_import_version_from_csv(self):
+        """
+        Загрузка новой версии справочника из CSV
+        """
+        path = self._write(".csv", "code,value\n1,Один\n2,Два\n")
+        out = StringIO()
+        call_command(
+            "import_version",
+            "rsmo-foms",
+            "12.0.6",
+            "--start-date=2025-01-01",
+            f"--file={path}",
+            "--chunk-size=1",
+            stdout=out,
+        )
+
+        version = ThesaurusVersion.objects.get(thesaurus__slug="rsmo-foms", slug="1206")
+        self.assertEqual(
+            list(version.items.values_list("code", "value")),
+            [("2", "Два"), ("1", "Один")],
+        )
+        self.assertIn("rows/sec", out.getvalue())
+
+    def test_import_version_copy_with_delta(self):
+        """
+        Загрузка новой версии справочника копированием существующей с изменениями
+        """
+        path = self._write(
+            ".ndjson",
+            '{"code": "124", "op": "delete"}\n'
+            '{"code": "125", "value": "Элемент 125 (изм.)"}\n'
+            '{"code": "127", "value": "Элемент 127"}\n',
+        )
+        call_command(
+            "import_version",
+            "ias-smo",
+            "1.0.3",
+            "--start-date=2025-01-01",
+            "--copy-from=1.0.0",
+            f"--delta={path}",
+            stdout=StringIO(),
+        )
+
+        version = ThesaurusVersion.objects.get(thesaurus__slug="ias-smo", slug="103")
+        self.assertEqual(
+            dict(
+                ThesaurusItem.objects.in_version(version).values_list("code", "value")
+            ),
+            {
+                "123": "Элемент 123",
+                "125": "Элемент 125 (изм.)",
+                "126": "Элемент 126",
+                "127": "Элемент 127",
+            },
+        )
+
+    def test_import_version_from_other_thesaurus_export(self):
+        """
+        Загрузка выгрузки другого справочника: идентификаторы выгрузки
+        не учитываются, элементы записываются новыми строками версии
+        """
+        url = reverse(
+            "thesaurus-version-item-export", kwargs={"thesaurus": 1, "version": 3}
+        )
+        exported = b"".join(self.client.get(url, {"type": "csv"}).streaming_content)
+        path = self._write(".csv", exported.decode().replace("Элемент", "Значение"))
+        call_command(
+            "import_version",
+            "rsmo-foms",
+            "12.0.6",
+            "--start-date=2025-01-01",
+            f"--file={path}",
+            stdout=StringIO(),
+        )
+
+        version = ThesaurusVersion.objects.get(thesaurus__slug="rsmo-foms", slug="1206")
+        items = list(
+            ThesaurusItem.objects.in_version(version).values_list(
+                "thesaurus_version", "value"
+            )
+        )
+        self.assertTrue(items)
+        self.assertTrue(
+            all(
+                owner == version.pk and value.startswith("Значение")
+                for owner, value in items
+            )
+        )
+        self.assertFalse(
+            ThesaurusItem.objects.filter(thesaurus_version=3)
+            .exclude(value__startswith="Элемент")
+            .exists()
+        )
+
+    def test_import_version_duplicate_value(self):
+        """
+        Загрузка новой версии справочника: повторяющиеся значения
+        """
+        path = self._write(".csv", "code,value\n1,Один\n2,Один\n")
+        with self.assertRaisesMessage(CommandError, "duplicate value"):
+            call_command(
+                "import_version",
+                "rsmo-foms",
+                "12.0.6",
+                "--start-date=2025-01-01",
+                f"--file={path}",
+                stdout=StringIO(),
+            )
+        self.assertFalse(ThesaurusVersion.objects.filter(version="12.0.6").exists())
+
+
+class BenchmarkTests(TestCase):
+    def _generate(self):
+        return SyntheticDataGenerator(
+            thesauri=3, versions=2, items=5, large_items=20, seed=1
+        ).generate()
+
+    def test_generator_deterministic(self):
+        """
+        Генератор синтетических данных: одинаковый seed дает одинаковые данные
+        """
+        self._generate()
+        first = list(
+            ThesaurusItem.objects.order_by("pk").values_list(
+                "thesaurus_version__start_date", "code", "value"
+            )
+        )
+        ThesaurusItem.objects.all().delete()
+        ThesaurusVersion.objects.all().delete()
+        Thesaurus.objects.all().delete()
+
+        thesaurus = self._generate()
+        second = list(
+            ThesaurusItem.objects.order_by("pk").values_list(
+                "thesaurus_version__start_date", "code", "value"
+            )
+        )
+        self.assertEqual(first, second)
+        self.assertEqual(len(first), 2 * 2 * 5 + 2 * 20)
+        self.assertEqual(thesaurus.slug, "thesaurus-2")
+
+    def test_runner_compare_with_baseline(self):
+        """
+        Замер сценариев и поиск регрессий относительно базовых результатов
+        """
+        thesaurus = self._generate()
+        results = BenchmarkRunner(iterations=2, warmup=0).run(thesaurus)
+
+        names = [result.name for result in results]
+        self.assertIn("service.get_thesaurus_list_actual_to", names)
+        self.assertIn("api.thesaurus-version-item-validate", names)
+
+        baseline = {result.name: result for result in results}
+        self.assertEqual(compare_with_baseline(results, baseline), [])
+
+        slow = replace(results[0], p50_ms=results[0].p50_ms * 2 + 1, queries=99)
+        self.assertEqual(len(compare_with_baseline([slow], baseline)), 2)
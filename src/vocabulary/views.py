@@ -1,17 +1,197 @@
-from datetime import date
+from datetime import date, datetime, time, timezone
 
+from django.conf import settings
+from django.db.models import QuerySet
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, quote_etag
 from django.utils.dateparse import parse_date
+from django.utils.http import http_date
 from django.shortcuts import get_object_or_404
 
-from rest_framework import viewsets
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 
-from .models import Thesaurus, ThesaurusVersion
-from .serializers import ThesaurusSerializer, ThesaurusItemSerializer
+from . import export, search
+from .instrumentation import timed
+from .models import Revision, Thesaurus, ThesaurusVersion
+from .pagination import (
+    ThesaurusItemCursorPagination,
+    ThesaurusItemLimitOffsetPagination,
+)
+from .response_cache import THESAURUS_SCOPE, response_cache, version_scope
+from .serializers import (
+    ThesaurusSerializer,
+    ThesaurusItemSerializer,
+    ThesaurusItemBulkValidationSerializer,
+    ThesaurusVersionDiffSerializer,
+    ThesaurusResolveSerializer,
+    ChangeLogQuerySerializer,
+    change_log_data,
+    THESAURUS_ITEM_FIELDS,
+    thesaurus_data,
+    thesaurus_item_data,
+    thesaurus_version_data,
+)
 from .service import ThesaurusService
+from .snapshot import ThesaurusVersionSnapshotItems
 
+MATCH_EXACT = "exact"
+MATCH_NORMALIZED = "normalized"
 
-class ThesaurusAPIView(viewsets.ReadOnlyModelViewSet):
+THESAURUS_VERSION_HEADER = "X-Thesaurus-Version"
+
+
+def current_version_fingerprint(
+    fingerprint: list, last_modified: int
+) -> tuple[list, int]:
+    """
+    Текущая версия справочника может смениться с наступлением даты,
+    поэтому дата добавляется к отпечатку и учитывается в Last-Modified
+    """
+    today = date.today()
+    start_of_day = datetime.combine(today, time.min, tzinfo=timezone.utc)
+    return fingerprint + [today.isoformat()], max(
+        last_modified, int(start_of_day.timestamp())
+    )
+
+
+def is_normalized_match(query_params) -> bool:
+    """
+    Режим сравнения значений элементов (параметр match): exact — точное
+    совпадение, normalized — без учета регистра, лишних пробелов и различий
+    Unicode
+    """
+    match = query_params.get("match", MATCH_EXACT)
+    if match not in (MATCH_EXACT, MATCH_NORMALIZED):
+        raise ValidationError("Parameter 'match' is not valid")
+    return match == MATCH_NORMALIZED
+
+
+def get_as_of_param(query_params) -> date | None:
+    """
+    Дата, на которую выбирается версия справочника (параметр as_of)
+    """
+    as_of = query_params.get("as_of")
+    if not as_of:
+        return None
+
+    try:
+        as_of = parse_date(as_of)
+    except ValueError:
+        as_of = None
+    if as_of is None:
+        raise ValidationError("Parameter 'as_of' is not valid")
+    return as_of
+
+
+class RevisionMixin:
+    """
+    Ревизия данных справочников, прочитанная один раз за запрос
+    """
+
+    def get_revision(self) -> Revision:
+        if not hasattr(self, "_revision"):
+            self._revision = self.thesaurus_service.get_revision()
+        return self._revision
+
+
+class ConditionalListMixin(RevisionMixin):
+    """
+    Условный GET списка: ETag и Last-Modified вычисляются по ревизии данных
+    до выполнения запроса списка, при совпадении If-None-Match
+    (If-Modified-Since) возвращается 304 без обращения к списку.
+    """
+
+    def list(self, request, *args, **kwargs):
+        fingerprint, last_modified = self._get_fingerprint()
+        etag = quote_etag("-".join(str(part) for part in fingerprint))
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def _get_fingerprint(self) -> tuple[list, int]:
+        revision = self.get_revision()
+        fingerprint = [revision.number, self.request.accepted_renderer.format]
+        return fingerprint, int(revision.updated_at.timestamp())
+
+
+class CachedListMixin(RevisionMixin):
+    """
+    Кэширование отрисованного списка в общем кэше ответов
+    (область кэша задается get_response_cache_scope)
+    """
+
+    def list(self, request, *args, **kwargs):
+        key = response_cache.get_key(
+            self.get_response_cache_scope(),
+            self.get_revision().number,
+            request,
+            request.accepted_renderer.format,
+        )
+        response = response_cache.get(key)
+        if response is not None:
+            return response
+
+        response = super().list(request, *args, **kwargs)
+        if key is not None:
+            response.add_post_render_callback(
+                lambda response: response_cache.set(key, response)
+            )
+        return response
+
+    def get_response_cache_scope(self) -> str:
+        raise NotImplementedError
+
+
+class FastListMixin:
+    """
+    Быстрый вывод списка в JSON: строки ответа формируются напрямую
+    (get_fast_rows, get_fast_data) без создания сериализаторов для каждой
+    строки. Ответ побайтно совпадает с ответом через сериализатор.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not self._use_fast_list():
+            return super().list(request, *args, **kwargs)
+
+        rows = self.get_fast_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        with timed("serialize"):
+            data = [self.get_fast_data(row) for row in (rows if page is None else page)]
+
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def get_fast_rows(self, queryset):
+        return queryset
+
+    def get_fast_data(self, row) -> dict:
+        raise NotImplementedError
+
+    def _use_fast_list(self) -> bool:
+        return (
+            getattr(settings, "VOCABULARY_FAST_JSON", True)
+            and self.request.accepted_renderer.format == "json"
+        )
+
+
+class ThesaurusAPIView(
+    ConditionalListMixin,
+    CachedListMixin,
+    FastListMixin,
+    viewsets.ReadOnlyModelViewSet,
+):
     serializer_class = ThesaurusSerializer
     thesaurus_service = ThesaurusService()
 
@@ -23,6 +203,74 @@ class ThesaurusAPIView(viewsets.ReadOnlyModelViewSet):
 
         return self.thesaurus_service.get_thesaurus_list()
 
+    def get_fast_data(self, thesaurus: Thesaurus) -> dict:
+        return thesaurus_data(thesaurus)
+
+    def get_response_cache_scope(self) -> str:
+        return THESAURUS_SCOPE
+
+    @action(detail=True)
+    def diff(self, request, *args, **kwargs):
+        """
+        Изменения элементов между двумя версиями справочника (параметры from и to)
+        """
+        # Справочник задается идентификатором или slug, как в адресах элементов
+        thesaurus_key = self.kwargs["pk"]
+        if thesaurus_key.isdigit():
+            thesaurus_lookup = {"thesaurus_id": thesaurus_key}
+        else:
+            thesaurus_lookup = {"thesaurus__slug": thesaurus_key}
+        from_version, to_version = (
+            get_object_or_404(
+                ThesaurusVersion, pk=self._get_int_param(name), **thesaurus_lookup
+            )
+            for name in ("from", "to")
+        )
+
+        diff = self.thesaurus_service.get_thesaurus_versions_diff(
+            from_version, to_version
+        )
+        return Response(ThesaurusVersionDiffSerializer(diff).data)
+
+    @action(detail=False, methods=["post"])
+    def resolve(self, request, *args, **kwargs):
+        """
+        Версии нескольких справочников, актуальные на дату (по умолчанию
+        текущую), с элементами или только версии (items=false)
+        """
+        serializer = ThesaurusResolveSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        thesaurus_keys = serializer.validated_data["thesauri"]
+        actual_to = serializer.validated_data.get("date") or date.today()
+
+        versions = self.thesaurus_service.get_thesauri_versions_actual_to(
+            thesaurus_keys, actual_to
+        )
+        elements = {}
+        if serializer.validated_data["items"]:
+            elements = self.thesaurus_service.get_thesauri_versions_elements(
+                list({version for version in versions.values() if version})
+            )
+
+        results = []
+        for key, version in versions.items():
+            result = {
+                "thesaurus": key,
+                "thesaurus_id": version.thesaurus_id if version else None,
+                "version": thesaurus_version_data(version) if version else None,
+            }
+            if serializer.validated_data["items"]:
+                result["items"] = elements.get(version.pk, []) if version else []
+            results.append(result)
+
+        return Response({"date": actual_to.isoformat(), "results": results})
+
+    def _get_int_param(self, name: str) -> int:
+        value = self.request.query_params.get(name, "")
+        if not value.isdigit():
+            raise ValidationError(f"Parameter '{name}' is not valid")
+        return int(value)
+
     def _get_date_param(self, name: str) -> date | None:
         date_str = self.request.query_params.get(name)
         if not date_str:
@@ -34,35 +282,233 @@ class ThesaurusAPIView(viewsets.ReadOnlyModelViewSet):
             raise ValidationError(f"Parameter '{name}' is not valid")
 
 
-class ThesaurusItemAPIView(viewsets.ReadOnlyModelViewSet):
+class ThesaurusItemAPIView(
+    ConditionalListMixin,
+    CachedListMixin,
+    FastListMixin,
+    viewsets.ReadOnlyModelViewSet,
+):
     serializer_class = ThesaurusItemSerializer
+    pagination_class = ThesaurusItemLimitOffsetPagination
     thesaurus_service = ThesaurusService()
 
     def get_queryset(self):
-        thesaurus_id = self.kwargs["thesaurus"]
-        thesaurus_version_id = self.kwargs.get("version")
-
         code = self.request.query_params.get("code")
         value = self.request.query_params.get("value")
 
-        thesaurus = get_object_or_404(Thesaurus, pk=thesaurus_id)
-        if thesaurus_version_id:
-            thesaurus_version = get_object_or_404(
-                ThesaurusVersion, thesaurus=thesaurus, pk=thesaurus_version_id
+        thesaurus_version = self._get_thesaurus_version()
+        if code or value:
+            return self.thesaurus_service.validate_elements_thesaurus_version(
+                thesaurus_version,
+                code,
+                value,
+                is_normalized_match(self.request.query_params),
             )
 
-            if code or value:
-                return self.thesaurus_service.validate_elements_thesaurus_version(
-                    thesaurus_version, code, value
-                )
-
-            return self.thesaurus_service.get_thesaurus_version_elements(
+        if self._use_snapshot():
+            snapshot = self.thesaurus_service.get_thesaurus_version_snapshot(
                 thesaurus_version
             )
+            if snapshot is not None:
+                return snapshot.items
 
-        if code or value:
-            return self.thesaurus_service.validate_elements_thesaurus_current_version(
-                thesaurus, code, value
+        return self.thesaurus_service.get_thesaurus_version_elements(thesaurus_version)
+
+    def get_fast_rows(self, queryset):
+        if isinstance(queryset, QuerySet):
+            return queryset.values(*THESAURUS_ITEM_FIELDS)
+        if isinstance(queryset, ThesaurusVersionSnapshotItems):
+            return queryset.snapshot.values
+        return queryset
+
+    def get_fast_data(self, item) -> dict:
+        return thesaurus_item_data(item)
+
+    def get_response_cache_scope(self) -> str:
+        return version_scope(self._get_thesaurus_version().pk)
+
+    @action(detail=False, methods=["post"])
+    def validate(self, request, *args, **kwargs):
+        """
+        Пакетная валидация элементов справочника: на каждую пару (код, значение)
+        возвращается признак ее существования в версии, в порядке запроса.
+        """
+        serializer = ThesaurusItemBulkValidationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data["items"]
+        elements = [(item.get("code"), item.get("value")) for item in items]
+
+        result = self.thesaurus_service.validate_elements_thesaurus_version_bulk(
+            self._get_thesaurus_version(),
+            elements,
+            is_normalized_match(request.query_params),
+        )
+
+        return Response(
+            {
+                "results": [
+                    {**item, "valid": valid} for item, valid in zip(items, result)
+                ]
+            }
+        )
+
+    @action(detail=False)
+    def export(self, request, *args, **kwargs):
+        """
+        Потоковая выгрузка всех элементов версии справочника в формате NDJSON
+        или CSV (параметр type), с необязательным сжатием gzip (параметр gzip)
+        """
+        export_type = request.query_params.get("type", "ndjson")
+        if export_type not in export.EXPORT_FORMATS:
+            raise ValidationError("Parameter 'type' is not valid")
+        use_gzip = request.query_params.get("gzip") in ("1", "true")
+
+        thesaurus_version = self._get_thesaurus_version()
+        rows = self.thesaurus_service.iter_thesaurus_version_elements(
+            thesaurus_version, chunk_size=export.EXPORT_CHUNK_SIZE
+        )
+        lines = (
+            export.csv_lines(rows)
+            if export_type == "csv"
+            else export.ndjson_lines(rows)
+        )
+        content = export.encode_chunks(lines)
+        filename = (
+            f"{thesaurus_version.thesaurus.slug}-{thesaurus_version.slug}.{export_type}"
+        )
+        if use_gzip:
+            content = export.gzip_chunks(content)
+            filename += ".gz"
+
+        response = StreamingHttpResponse(
+            content,
+            content_type=(
+                "application/gzip" if use_gzip else export.EXPORT_FORMATS[export_type]
+            ),
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(detail=False)
+    def bloom(self, request, *args, **kwargs):
+        """
+        Выгрузка фильтра Блума по кодам и значениям элементов версии
+        справочника для проверки на стороне клиента
+        """
+        thesaurus_version = self._get_thesaurus_version()
+        bloom_filter = self.thesaurus_service.get_thesaurus_version_bloom_filter(
+            thesaurus_version
+        )
+        filename = f"{thesaurus_version.thesaurus.slug}-{thesaurus_version.slug}.bloom"
+
+        response = HttpResponse(
+            bloom_filter.to_bytes(), content_type="application/octet-stream"
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(detail=False)
+    def search(self, request, *args, **kwargs):
+        """
+        Поиск элементов версии справочника по подстроке значения (параметр q),
+        не более limit наиболее релевантных элементов
+        """
+        query = request.query_params.get("q", "")
+        limit = self._get_limit_param()
+
+        items = self.thesaurus_service.search_elements_thesaurus_version(
+            self._get_thesaurus_version(), query, limit
+        )
+
+        return Response({"results": self.get_serializer(items, many=True).data})
+
+    def perform_content_negotiation(self, request, force=False):
+        # Формат выгрузки задается параметром type, заголовок Accept не учитывается
+        return super().perform_content_negotiation(
+            request, force=force or self.action in ("export", "bloom")
+        )
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, "_thesaurus_version", None) is not None:
+            response[THESAURUS_VERSION_HEADER] = self._thesaurus_version.pk
+        return response
+
+    @property
+    def paginator(self):
+        """
+        Постраничный вывод по ключу включается параметром pagination=cursor
+        (для валидации по коду и значению не применяется)
+        """
+        if not hasattr(self, "_paginator") and self._is_cursor_pagination():
+            self._paginator = ThesaurusItemCursorPagination()
+        return super().paginator
+
+    def _is_cursor_pagination(self) -> bool:
+        query_params = self.request.query_params
+        return (
+            query_params.get("pagination") == "cursor"
+            and not query_params.get("code")
+            and not query_params.get("value")
+        )
+
+    def _use_snapshot(self) -> bool:
+        return self.action == "list" and not self._is_cursor_pagination()
+
+    def _get_fingerprint(self) -> tuple[list, int]:
+        fingerprint, last_modified = super()._get_fingerprint()
+        if self.kwargs.get("version") or get_as_of_param(self.request.query_params):
+            return fingerprint, last_modified
+
+        return current_version_fingerprint(fingerprint, last_modified)
+
+    def _get_limit_param(self) -> int:
+        limit = self.request.query_params.get("limit")
+        if not limit:
+            return search.SEARCH_LIMIT
+        if not limit.isdigit() or not 0 < int(limit) <= search.SEARCH_MAX_LIMIT:
+            raise ValidationError("Parameter 'limit' is not valid")
+        return int(limit)
+
+    def _get_thesaurus_version(self) -> ThesaurusVersion:
+        """
+        Версия справочника из адреса (если версия не указана — актуальная
+        на дату as_of или текущая) вместе со справочником, одним запросом
+        по идентификаторам или slug
+        """
+        if not hasattr(self, "_thesaurus_version"):
+            as_of = get_as_of_param(self.request.query_params)
+            if as_of and self.kwargs.get("version"):
+                raise ValidationError("Parameter 'as_of' is not valid")
+
+            self._thesaurus_version = (
+                self.thesaurus_service.get_thesaurus_version_by_key(
+                    self.kwargs["thesaurus"], self.kwargs.get("version"), as_of
+                )
             )
+        return self._thesaurus_version
+
+
+class ChangeLogAPIView(viewsets.ViewSet):
+    thesaurus_service = ThesaurusService()
+
+    def list(self, request, *args, **kwargs):
+        """
+        Изменения справочников, версий и элементов после токена since
+        (по одному последнему изменению каждого объекта, не более limit)
+        и новый токен. Без since возвращается только текущий токен.
+        """
+        serializer = ChangeLogQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        since = serializer.validated_data.get("since")
+        if since is None:
+            token = self.thesaurus_service.get_changes_token()
+            return Response({"changes": [], "token": token, "has_more": False})
 
-        return self.thesaurus_service.get_thesaurus_current_version_elements(thesaurus)
+        changes, has_more = self.thesaurus_service.get_changes(
+            since, serializer.validated_data["limit"]
+        )
+        with timed("serialize"):
+            data = [change_log_data(entry, obj) for entry, obj in changes]
+        token = data[-1]["token"] if data else since
+        return Response({"changes": data, "token": token, "has_more": has_more})